@@ -31,11 +31,68 @@ import pandas as pd
 
 # InfluxDB Connection (reads from parent config/devices.yaml)
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'gui'))
-from config_loader import get_influx_params, load_sensor_labels
+from config_loader import get_influx_params, load_sensor_labels, get_rollup_resolutions
 
 
 # Removed convert_mA_to_eng - not needed for raw data export
 
+MAX_GAP_SPANS = 20  # raw fallback queries per sensor group before falling back to one covering span
+
+
+def pick_rollup(window_s):
+    """Coarsest bridge rollup resolution that evenly divides the export window.
+    
+    Args:
+        window_s: Export window in seconds (e.g., 0.1 for 10 Hz)
+        
+    Returns:
+        tuple: (label, seconds) or None if no resolution fits
+    """
+    best = None
+    for label, seconds in get_rollup_resolutions():
+        ratio = window_s / seconds
+        if seconds <= window_s and abs(ratio - round(ratio)) < 1e-9:
+            best = (label, seconds)
+    return best
+
+
+def format_utc(timestamp):
+    """Timestamp as an RFC3339 UTC string for Flux range()"""
+    return pd.Timestamp(timestamp).tz_convert('UTC').isoformat().replace('+00:00', 'Z')
+
+
+def find_gaps(times, start, stop, step_s, max_spans=MAX_GAP_SPANS):
+    """Spans of [start, stop) with no row every step_s (uncovered by a rollup query).
+    
+    Args:
+        times: Row timestamps (tz-aware) returned by the rollup query
+        start, stop: Export time range (tz-aware datetimes)
+        step_s: Expected row spacing in seconds
+        max_spans: Above this many spans, return one span covering all of them
+        
+    Returns:
+        list: (gap_start, gap_stop) UTC Timestamps, oldest first
+    """
+    step = pd.Timedelta(seconds=step_s)
+    start = pd.Timestamp(start).tz_convert('UTC')
+    stop = pd.Timestamp(stop).tz_convert('UTC')
+    times = pd.Series(pd.to_datetime(times, utc=True)).drop_duplicates().sort_values().reset_index(drop=True)
+    if times.empty:
+        return [(start, stop)]
+    
+    gaps = []
+    if times.iloc[0] - start >= step:
+        gaps.append((start, times.iloc[0]))
+    missing = times.diff() > step * 1.5
+    for i in missing[missing].index:
+        gaps.append((times.iloc[i - 1] + step, times.iloc[i]))
+    if stop - times.iloc[-1] > step * 1.5:
+        gaps.append((times.iloc[-1] + step, stop))
+    
+    if len(gaps) > max_spans:
+        gaps = [(gaps[0][0], gaps[-1][1])]
+    return gaps
+
 
 def export_sensor_group(client, influx_params, output_dir, date_str, 
                         measurement, channels, filename_suffix, 
@@ -49,7 +106,9 @@ def export_sensor_group(client, influx_params, output_dir, date_str,
         field_name: Field to extract (if using channel tags), e.g., 'raw_ma', 'temp_c'
         use_channel_tag: If True, filter by channel tag instead of field name
         use_labels: If True, rename columns using sensor_labels.yaml
-        downsample: If True, downsample to MAX_EXPORT_RATE_HZ (10 Hz) using mean aggregation
+        downsample: If True, downsample to MAX_EXPORT_RATE_HZ (10 Hz) using mean aggregation.
+            Reads the <measurement>_<resolution> bridge rollups and aggregates the
+            raw points only for the spans the rollups do not cover.
     """
     
     ds_info = f" (downsampled to {MAX_EXPORT_RATE_HZ} Hz)" if downsample else " (full resolution)"
@@ -60,36 +119,64 @@ def export_sensor_group(client, influx_params, output_dir, date_str,
         start_utc = START_TIME.astimezone(ZoneInfo('UTC')).isoformat().replace('+00:00', 'Z')
         stop_utc = STOP_TIME.astimezone(ZoneInfo('UTC')).isoformat().replace('+00:00', 'Z')
         
-        # Build aggregateWindow line if downsampling
-        agg_line = f'  |> aggregateWindow(every: {DOWNSAMPLE_WINDOW}, fn: mean, createEmpty: false)\n' if downsample else ''
+        # Build aggregateWindow line if downsampling (windows stamped at their start, like rollup buckets)
+        agg_line = f'  |> aggregateWindow(every: {DOWNSAMPLE_WINDOW}, fn: mean, createEmpty: false, timeSrc: "_start")\n' if downsample else ''
         
-        if use_channel_tag and field_name:
-            # For measurements like ni_analog, tc08 that use channel tags
-            channel_filter = ' or '.join([f'r.channel == "{ch}"' for ch in channels])
-            query = f'''
+        def run_query(source_measurement, suffix, source_agg_line, range_start, range_stop):
+            """Query one source into a DataFrame with plain channel column names"""
+            if use_channel_tag and field_name:
+                # For measurements like ni_analog, tc08 that use channel tags
+                channel_filter = ' or '.join([f'r.channel == "{ch}"' for ch in channels])
+                query = f'''
 from(bucket: "{influx_params['bucket']}")
-  |> range(start: {start_utc}, stop: {stop_utc})
-  |> filter(fn: (r) => r._measurement == "{measurement}")
-  |> filter(fn: (r) => r._field == "{field_name}")
+  |> range(start: {range_start}, stop: {range_stop})
+  |> filter(fn: (r) => r._measurement == "{source_measurement}")
+  |> filter(fn: (r) => r._field == "{field_name}{suffix}")
   |> filter(fn: (r) => {channel_filter})
-{agg_line}  |> pivot(rowKey:["_time"], columnKey: ["channel"], valueColumn: "_value")
+{source_agg_line}  |> pivot(rowKey:["_time"], columnKey: ["channel"], valueColumn: "_value")
 '''
-        else:
-            # For measurements like ni_relays, psu that use field names directly
-            field_filter = ' or '.join([f'r._field == "{f}"' for f in channels])
-            query = f'''
+            else:
+                # For measurements like ni_relays, psu that use field names directly
+                field_filter = ' or '.join([f'r._field == "{f}{suffix}"' for f in channels])
+                query = f'''
 from(bucket: "{influx_params['bucket']}")
-  |> range(start: {start_utc}, stop: {stop_utc})
-  |> filter(fn: (r) => r._measurement == "{measurement}")
+  |> range(start: {range_start}, stop: {range_stop})
+  |> filter(fn: (r) => r._measurement == "{source_measurement}")
   |> filter(fn: (r) => {field_filter})
-{agg_line}  |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
+{source_agg_line}  |> pivot(rowKey:["_time"], columnKey: ["_field"], valueColumn: "_value")
 '''
+            
+            result = client.query_api().query_data_frame(query)
+            
+            # Handle case where query returns list of DataFrames
+            if isinstance(result, list):
+                result = pd.concat(result, ignore_index=True) if result else pd.DataFrame()
+            if suffix and not result.empty:
+                result = result.rename(columns={f"{f}{suffix}": f for f in channels})
+            return result
         
-        df = client.query_api().query_data_frame(query)
-        
-        # Handle case where query returns list of DataFrames
-        if isinstance(df, list):
-            df = pd.concat(df, ignore_index=True)
+        rollup = pick_rollup(1.0 / MAX_EXPORT_RATE_HZ) if downsample else None
+        if rollup:
+            # Rollups first; raw points only for the spans they do not cover
+            # (before rollups were enabled, bridge running with them off, ...)
+            label, seconds = rollup
+            window_s = 1.0 / MAX_EXPORT_RATE_HZ
+            df = run_query(f"{measurement}_{label}", "_mean",
+                           '' if abs(seconds - window_s) < 1e-9 else agg_line, start_utc, stop_utc)
+            gaps = find_gaps(df['_time'] if not df.empty else [], START_TIME, STOP_TIME, window_s)
+            if gaps:
+                raw = [run_query(measurement, "", agg_line, format_utc(gap_start), format_utc(gap_stop))
+                       for gap_start, gap_stop in gaps]
+                raw = [part for part in raw if not part.empty]
+                gap_s = sum((gap_stop - gap_start).total_seconds() for gap_start, gap_stop in gaps)
+                print(f"  Source: {label} rollup ({measurement}_{label}), raw for {len(gaps)} "
+                      f"uncovered span(s), {gap_s:.1f} s")
+                if raw:
+                    df = pd.concat([df] + raw, ignore_index=True) if not df.empty else pd.concat(raw, ignore_index=True)
+            else:
+                print(f"  Source: {label} rollup ({measurement}_{label})")
+        else:
+            df = run_query(measurement, "", agg_line, start_utc, stop_utc)
         
         if df.empty:
             print(f"  [!] No data found")
@@ -99,8 +186,8 @@ from(bucket: "{influx_params['bucket']}")
         keep_cols = ['_time'] + [col for col in df.columns if col in channels]
         df = df[keep_cols]
         
-        # Sort by timestamp and remove duplicates
-        df = df.sort_values('_time').drop_duplicates(subset=['_time'])
+        # Sort by timestamp and remove duplicates (stable: rollup rows win over raw)
+        df = df.sort_values('_time', kind='stable').drop_duplicates(subset=['_time'])
         
         # Convert timestamps from UTC to local timezone and format as string
         df['_time'] = df['_time'].dt.tz_convert('America/Los_Angeles')
@@ -8,18 +8,13 @@ except ImportError:
     from config_loader import get_bga_ports
 
 
-def set_primary_gas(bga_id, cas, timeout=1):
-    """Set primary gas on a BGA device.
+def _send_command(bga_id, command, timeout):
+    """POST a command to a BGA bridge and wait for its gas readback.
     
-    Args:
-        bga_id: BGA identifier ("BGA01" or "BGA02")
-        cas: CAS number of gas (e.g., "1333-74-0" for H2)
-        timeout: HTTP timeout in seconds (default 1)
-        
     Raises:
         ValueError: If bga_id is invalid
         ConnectionError: If HTTP bridge is unreachable
-        IOError: If command fails
+        IOError: If command fails or the readback does not match
     """
     ports = get_bga_ports()
     if bga_id not in ports:
@@ -27,14 +22,36 @@ def set_primary_gas(bga_id, cas, timeout=1):
     
     port = ports[bga_id]
     url = f"http://localhost:{port}/command"
-    command = f"GASP {cas}"
     
     try:
-        requests.post(url, data=command, timeout=timeout)
+        response = requests.post(url, data=command, params={'wait': timeout}, timeout=timeout + 1)
     except requests.exceptions.ConnectionError:
         raise ConnectionError(f"Failed to connect to {bga_id} bridge at port {port}")
     except requests.exceptions.Timeout:
         raise ConnectionError(f"Timeout connecting to {bga_id} bridge at port {port}")
+    
+    if response.status_code != 200:
+        raise IOError(f"{bga_id} command '{command}' failed: {response.text.strip()}")
+    result = response.json()
+    if result.get('verified') is False:
+        raise IOError(f"{bga_id} command '{command}' not applied (readback {result.get('result')})")
+    return result
+
+
+def set_primary_gas(bga_id, cas, timeout=1):
+    """Set primary gas on a BGA device.
+    
+    Args:
+        bga_id: BGA identifier ("BGA01" or "BGA02")
+        cas: CAS number of gas (e.g., "1333-74-0" for H2)
+        timeout: HTTP timeout in seconds (default 1)
+        
+    Raises:
+        ValueError: If bga_id is invalid
+        ConnectionError: If HTTP bridge is unreachable
+        IOError: If command fails
+    """
+    _send_command(bga_id, f"GASP {cas}", timeout)
 
 
 def set_secondary_gas(bga_id, cas, timeout=1):
@@ -50,20 +67,7 @@ def set_secondary_gas(bga_id, cas, timeout=1):
         ConnectionError: If HTTP bridge is unreachable
         IOError: If command fails
     """
-    ports = get_bga_ports()
-    if bga_id not in ports:
-        raise ValueError(f"Invalid BGA ID: {bga_id}. Must be BGA01, BGA02, or BGA03")
-    
-    port = ports[bga_id]
-    url = f"http://localhost:{port}/command"
-    command = f"GASS {cas}"
-    
-    try:
-        requests.post(url, data=command, timeout=timeout)
-    except requests.exceptions.ConnectionError:
-        raise ConnectionError(f"Failed to connect to {bga_id} bridge at port {port}")
-    except requests.exceptions.Timeout:
-        raise ConnectionError(f"Timeout connecting to {bga_id} bridge at port {port}")
+    _send_command(bga_id, f"GASS {cas}", timeout)
 
 
 def is_bridge_available(port, timeout=0.5):
@@ -77,7 +81,7 @@ def is_bridge_available(port, timeout=0.5):
         bool: True if bridge has valid data (status 200), False otherwise
     """
     try:
-        response = requests.get(f"http://localhost:{port}/metrics", timeout=timeout)
+        response = requests.get(f"http://localhost:{port}/latest", timeout=timeout)
         return response.status_code == 200
     except requests.exceptions.RequestException:
         return False
@@ -1,6 +1,7 @@
 """Configuration loader for MK1_AWE devices.yaml"""
 
 import os
+import re
 import yaml
 
 
@@ -47,13 +48,13 @@ def get_bga_ports():
     """Get BGA HTTP bridge ports.
     
     Returns:
-        dict: {device_id: http_port} for BGA01/02/03
+        dict: {device_id: http_port} for every BGA244 analyzer (BGA01, BGA02, ...)
     """
     config = load_config()
     return {
-        'BGA01': config['devices']['BGA01']['http_port'],
-        'BGA02': config['devices']['BGA02']['http_port'],
-        'BGA03': config['devices']['BGA03']['http_port']
+        name: device['http_port']
+        for name, device in config['devices'].items()
+        if device.get('protocol') == 'rs422_usb' and 'http_port' in device
     }
 
 
@@ -88,6 +89,40 @@ def get_influx_params():
     }
 
 
+def get_influx_token():
+    """Get the InfluxDB token from the environment, falling back to the repo .env file.
+    
+    Returns:
+        str: INFLUXDB_ADMIN_TOKEN, or '' if not set
+    """
+    influx_token = os.environ.get('INFLUXDB_ADMIN_TOKEN', '')
+    
+    env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '.env')
+    if not influx_token and os.path.exists(env_path):
+        with open(env_path) as f:
+            for line in f:
+                if line.startswith('INFLUXDB_ADMIN_TOKEN='):
+                    influx_token = line.strip().split('=', 1)[1]
+                    break
+    return influx_token
+
+
+def get_rollup_resolutions():
+    """Get bridge rollup resolutions from the rollups section.
+    
+    Returns:
+        list: (label, seconds) tuples, finest first, e.g. [("100ms", 0.1), ("1s", 1.0), ("1m", 60.0)]
+    """
+    config = load_config()
+    units = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+    resolutions = []
+    for label in config.get('rollups', {}).get('resolutions', []):
+        match = re.fullmatch(r'(\d+)(ms|s|m|h)', str(label))
+        if match:
+            resolutions.append((label, int(match.group(1)) * units[match.group(2)]))
+    return sorted(resolutions, key=lambda resolution: resolution[1])
+
+
 def get_psu_config():
     """Get PSU control configuration.
     
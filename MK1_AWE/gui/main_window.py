@@ -282,6 +282,20 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 print(f"Error closing purge valves on shutdown: {e}")
         
+        # Release relay task and flush relay telemetry
+        try:
+            from ni_relay_client import close_client
+            close_client()
+        except Exception as e:
+            print(f"Error closing relay client: {e}")
+        
+        # Close pooled Modbus TCP connections
+        try:
+            from modbus_client import close_all
+            close_all()
+        except Exception as e:
+            print(f"Error closing Modbus connections: {e}")
+        
         print("Safe shutdown complete")
         event.accept()
     
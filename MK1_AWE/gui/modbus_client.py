@@ -1,62 +1,257 @@
-"""Modbus TCP client for MK1_AWE hardware control"""
+"""Modbus TCP client for MK1_AWE hardware control
 
+Writes go through a process-wide pool of persistent connections (one
+ModbusTcpClient per host:port) instead of a connect/disconnect per call,
+and fan-out writes to many devices share one executor.
+"""
+
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pymodbus.client import ModbusTcpClient
+from pymodbus.exceptions import ModbusException, ModbusIOException
+
+# Pool settings
+MAX_IDLE = 30.0       # seconds - idle connections are reopened (devices drop idle sockets)
+FANOUT_WORKERS = 10   # shared executor threads (one per PSU for MK1 broadcasts)
 
 
 def connect(host, port=502, timeout=1):
     """Connect to a Modbus TCP device.
-    
+
     Args:
         host: IP address of Modbus device
         port: Modbus TCP port (default 502)
         timeout: Connection timeout in seconds (default 1)
-        
+
     Returns:
         ModbusTcpClient: Connected client instance
-        
+
     Raises:
         ConnectionError: If connection fails
     """
     client = ModbusTcpClient(host=host, port=port, timeout=timeout)
-    
+
     if not client.connect():
         raise ConnectionError(f"Failed to connect to Modbus device at {host}:{port}")
-    
+
     return client
 
 
+class PooledConnection:
+    """One persistent connection; requests on it are serialized by its lock"""
+
+    def __init__(self, host, port, timeout):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.client = None
+        self.last_used = 0.0
+
+        # Counters
+        self.connects = 0
+        self.requests = 0
+        self.failures = 0
+
+    def ensure_connected(self):
+        """Return (client, reused): a connected client, reopened if closed, broken or idle too long
+
+        reused is True if the client is an already-open socket (which may
+        have gone stale without us noticing), False if it was just opened.
+        """
+        if self.client is not None:
+            idle = time.monotonic() - self.last_used
+            if self.client.connected and idle < MAX_IDLE:
+                return self.client, True
+            self.close()
+
+        self.client = connect(self.host, self.port, self.timeout)
+        self.connects += 1
+        return self.client, False
+
+    def close(self):
+        """Drop the socket (next request reconnects)"""
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+
+class ConnectionPool:
+    """Process-wide persistent Modbus TCP connections keyed by host:port"""
+
+    def __init__(self):
+        self._connections = {}
+        self._lock = threading.Lock()
+
+    def _get(self, host, port, timeout):
+        key = (host, port)
+        with self._lock:
+            conn = self._connections.get(key)
+            if conn is None:
+                conn = self._connections[key] = PooledConnection(host, port, timeout)
+            return conn
+
+    def request(self, host, port, timeout, func):
+        """Run func(client) on the pooled connection to host:port.
+
+        A request that fails on an already-open socket (device closed it,
+        cable pulled and replugged) is retried once on a new connection.
+        A failed connect or a failure on a just-opened connection is not
+        retried, so an unreachable device costs one timeout. Modbus exception
+        responses are returned to the caller, not retried.
+
+        Args:
+            host: IP address of Modbus device
+            port: Modbus TCP port
+            timeout: Connect / response timeout in seconds
+            func: Callable taking the connected ModbusTcpClient
+
+        Returns:
+            Result of func
+
+        Raises:
+            ConnectionError: If the device cannot be reached
+        """
+        conn = self._get(host, port, timeout)
+        with conn.lock:
+            for attempt in range(2):
+                reused = False
+                try:
+                    client, reused = conn.ensure_connected()
+                    result = func(client)
+                    if isinstance(result, ModbusIOException):
+                        raise result  # returned, not raised, when the socket was closed under us
+                    conn.requests += 1
+                    conn.last_used = time.monotonic()
+                    return result
+                except (ModbusException, OSError) as e:
+                    conn.failures += 1
+                    conn.close()
+                    if attempt or not reused:
+                        raise ConnectionError(f"Modbus device at {host}:{port} unreachable: {e}")
+
+    def close_all(self):
+        """Close every pooled connection"""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+        for conn in connections:
+            with conn.lock:
+                conn.close()
+
+    def stats(self):
+        """Per-connection counters, keyed 'host:port'"""
+        with self._lock:
+            return {
+                f"{conn.host}:{conn.port}": {
+                    'connected': conn.client is not None and conn.client.connected,
+                    'connects': conn.connects,
+                    'requests': conn.requests,
+                    'failures': conn.failures
+                }
+                for conn in self._connections.values()
+            }
+
+
+_pool = ConnectionPool()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_pool():
+    """Get the process-wide connection pool."""
+    return _pool
+
+
+def get_executor():
+    """Get the shared executor for fan-out writes (created on first use)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="modbus")
+        return _executor
+
+
+def close_all():
+    """Close pooled connections and shut down the shared executor."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+    _pool.close_all()
+
+
+atexit.register(close_all)
+
+
 def write_coil(host, address, value, port=502, timeout=1):
     """Write a single coil (relay) on a Modbus device.
-    
+
     Args:
         host: IP address of Modbus device
         address: Coil address (0-29 for RL01-RL30)
         value: True for ON, False for OFF
         port: Modbus TCP port (default 502)
         timeout: Connection timeout in seconds (default 1)
-        
+
     Raises:
         ConnectionError: If connection fails
         IOError: If write operation fails
     """
-    client = connect(host, port, timeout)
-    
-    try:
-        response = client.write_coil(address, value)
-        if response.isError():
-            raise IOError(f"Failed to write coil {address} on {host}:{port}")
-    finally:
-        client.close()
+    response = _pool.request(host, port, timeout, lambda client: client.write_coil(address, value))
+    if response.isError():
+        raise IOError(f"Failed to write coil {address} on {host}:{port}")
+
+
+def write_register(host, address, value, port=502, timeout=1):
+    """Write a single holding register on a Modbus device.
+
+    Args:
+        host: IP address of Modbus device
+        address: Register address
+        value: 16-bit register value
+        port: Modbus TCP port (default 502)
+        timeout: Connection timeout in seconds (default 1)
+
+    Raises:
+        ConnectionError: If connection fails
+        IOError: If write operation fails
+    """
+    response = _pool.request(host, port, timeout, lambda client: client.write_register(address, value))
+    if response.isError():
+        raise IOError(f"Failed to write register {address} on {host}:{port}")
+
+
+def write_registers(host, address, values, port=502, timeout=1):
+    """Write consecutive holding registers on a Modbus device.
+
+    Args:
+        host: IP address of Modbus device
+        address: First register address
+        values: List of 16-bit register values
+        port: Modbus TCP port (default 502)
+        timeout: Connection timeout in seconds (default 1)
+
+    Raises:
+        ConnectionError: If connection fails
+        IOError: If write operation fails
+    """
+    response = _pool.request(host, port, timeout, lambda client: client.write_registers(address, values))
+    if response.isError():
+        raise IOError(f"Failed to write registers {address}-{address + len(values) - 1} on {host}:{port}")
 
 
 def ping(host, port=502, timeout=0.5):
     """Check if a Modbus device is reachable.
-    
+
     Args:
         host: IP address of Modbus device
         port: Modbus TCP port (default 502)
         timeout: Connection timeout in seconds (default 0.5)
-        
+
     Returns:
         bool: True if device is reachable, False otherwise
     """
@@ -69,4 +264,3 @@ def ping(host, port=502, timeout=0.5):
     finally:
         if client:
             client.close()
-
@@ -5,11 +5,18 @@ Controls 16 relays on 2x NI-9485 modules (Slots 2 & 3)
 """
 
 import nidaqmx
+from nidaqmx.constants import LineGrouping
 import yaml
+import time
 import threading
 from pathlib import Path
 from typing import Optional, Dict
 
+try:
+    from .relay_telemetry import RelayTelemetry
+except ImportError:
+    from relay_telemetry import RelayTelemetry
+
 # Configuration
 CONFIG_PATH = Path(__file__).parent.parent / "config" / "devices.yaml"
 
@@ -18,14 +25,32 @@ relay_lock = threading.Lock()
 
 
 class RelayClient:
-    """Client for controlling NI-9485 relays"""
+    """Client for controlling NI-9485 relays
+    
+    Holds one long-lived DO task with a port-wide channel per NI-9485 module.
+    Relay states are kept as one bitmask per slot; every write (single relay,
+    multi-relay transaction or all relays) is a single task.write() of all
+    ports. The task is recreated on the next call after a hardware error.
     
-    def __init__(self):
+    With telemetry enabled every write is logged to the ni_relays measurement
+    (see relay_telemetry.py).
+    """
+    
+    def __init__(self, telemetry: bool = False):
         self.config = self._load_config()
         self.device_name = self.config['devices']['NI_cDAQ']['name']
         self.slot2_config = self.config['modules']['NI_cDAQ_Relays']['slot_2']
         self.slot3_config = self.config['modules']['NI_cDAQ_Relays']['slot_3']
         self._build_relay_map()
+        self.slots = sorted({slot for slot, _ in self.relay_map.values()})
+        self._task = None
+        self._masks = None  # slot -> cached port bitmask (bit n = line n ON)
+        self.telemetry = None
+        
+        telemetry_config = self.config.get('relay_telemetry', {})
+        if telemetry and telemetry_config.get('enabled', True):
+            self.telemetry = RelayTelemetry(self.relay_map, self.device_name,
+                                            self.config.get('system', {}), telemetry_config).start()
     
     def _load_config(self):
         """Load configuration from devices.yaml"""
@@ -44,6 +69,91 @@ class RelayClient:
         for relay_name, relay_config in self.slot3_config.items():
             self.relay_map[relay_name] = (3, relay_config['channel'])
     
+    def _ensure_task(self):
+        """Create and start the DO task (one port channel per slot), seeding the bitmask cache from hardware"""
+        if self._task is not None:
+            return
+        
+        task = nidaqmx.Task()
+        try:
+            for slot in self.slots:
+                task.do_channels.add_do_chan(f"{self.device_name}Mod{slot}/port0/line0:7",
+                                             line_grouping=LineGrouping.CHAN_FOR_ALL_LINES)
+            task.start()
+            masks = task.read()
+            if len(self.slots) == 1:
+                masks = [masks]
+        except Exception:
+            task.close()
+            raise
+        
+        self._task = task
+        self._masks = {slot: int(mask) for slot, mask in zip(self.slots, masks)}
+        if self.telemetry:
+            self.telemetry.record(None, self._masks)
+    
+    def _drop_task(self):
+        """Close the task after an error (recreated on the next call)"""
+        if self._task is not None:
+            try:
+                self._task.close()
+            except Exception:
+                pass
+        self._task = None
+        self._masks = None
+    
+    def _write_masks(self, masks):
+        """Write every slot's bitmask in one call; cache updated only on success"""
+        values = [masks[slot] for slot in self.slots]
+        self._task.write(values if len(values) > 1 else values[0])
+        if self.telemetry:
+            self.telemetry.record(self._masks, masks, time.time_ns())
+        self._masks = masks
+    
+    def close(self):
+        """Release the DO task and flush relay telemetry"""
+        with relay_lock:
+            self._drop_task()
+        if self.telemetry:
+            self.telemetry.stop()
+            self.telemetry = None
+    
+    def set_relays(self, states: Dict[str, bool]) -> bool:
+        """
+        Set several relays in one write (atomic transaction, e.g. RL04 + RL06 purge pair)
+        
+        Args:
+            states: Relay name -> True=ON, False=OFF
+        
+        Returns:
+            True if successful, False otherwise (no relay is changed)
+        """
+        unknown = [name for name in states if name not in self.relay_map]
+        if unknown:
+            print(f"✗ Unknown relay: {', '.join(unknown)}")
+            return False
+        
+        return self._set_lines([(*self.relay_map[name], state) for name, state in states.items()])
+    
+    def _set_lines(self, lines):
+        """Apply (slot, channel, state) changes to the cached bitmasks and write once"""
+        with relay_lock:
+            try:
+                self._ensure_task()
+                masks = dict(self._masks)
+                for slot, channel, state in lines:
+                    if state:
+                        masks[slot] |= 1 << channel
+                    else:
+                        masks[slot] &= ~(1 << channel)
+                self._write_masks(masks)
+                return True
+            
+            except Exception as e:
+                print(f"✗ Failed to set relays {lines}: {e}")
+                self._drop_task()
+                return False
+    
     def set_relay(self, relay_name: str, state: bool) -> bool:
         """
         Set relay state by name
@@ -55,12 +165,7 @@ class RelayClient:
         Returns:
             True if successful, False otherwise
         """
-        if relay_name not in self.relay_map:
-            print(f"✗ Unknown relay: {relay_name}")
-            return False
-        
-        slot, channel = self.relay_map[relay_name]
-        return self.set_relay_by_slot_channel(slot, channel, state)
+        return self.set_relays({relay_name: state})
     
     def set_relay_by_slot_channel(self, slot: int, channel: int, state: bool) -> bool:
         """
@@ -74,21 +179,26 @@ class RelayClient:
         Returns:
             True if successful, False otherwise
         """
+        if slot not in self.slots:
+            print(f"✗ Unknown relay slot: {slot}")
+            return False
+        return self._set_lines([(slot, channel, state)])
+    
+    def _read_masks(self):
+        """Read every slot's port bitmask from hardware in one call (refreshes the cache)"""
         with relay_lock:
             try:
-                # Build channel name
-                channel_name = f"{self.device_name}Mod{slot}/port0/line{channel}"
-                
-                # Create task and write
-                with nidaqmx.Task() as task:
-                    task.do_channels.add_do_chan(channel_name)
-                    task.write(state)
-                
-                return True
+                self._ensure_task()
+                masks = self._task.read()
+                if len(self.slots) == 1:
+                    masks = [masks]
+                self._masks = {slot: int(mask) for slot, mask in zip(self.slots, masks)}
+                return dict(self._masks)
             
             except Exception as e:
-                print(f"✗ Failed to set relay (slot={slot}, ch={channel}): {e}")
-                return False
+                print(f"✗ Failed to read relays: {e}")
+                self._drop_task()
+                return None
     
     def get_relay_state(self, relay_name: str) -> Optional[bool]:
         """
@@ -103,38 +213,26 @@ class RelayClient:
         if relay_name not in self.relay_map:
             return None
         
+        masks = self._read_masks()
+        if masks is None:
+            return None
         slot, channel = self.relay_map[relay_name]
-        
-        with relay_lock:
-            try:
-                channel_name = f"{self.device_name}Mod{slot}/port0/line{channel}"
-                
-                with nidaqmx.Task() as task:
-                    task.do_channels.add_do_chan(channel_name)
-                    # Read the current state
-                    state = task.read()
-                
-                return state
-            
-            except Exception as e:
-                print(f"✗ Failed to read relay {relay_name}: {e}")
-                return None
+        return bool(masks[slot] >> channel & 1)
     
     def get_all_relay_states(self) -> Dict[str, Optional[bool]]:
         """
-        Read all relay states
+        Read all relay states (one hardware read)
         
         Returns:
             Dictionary mapping relay names to states
         """
-        states = {}
-        for relay_name in self.relay_map.keys():
-            states[relay_name] = self.get_relay_state(relay_name)
-        return states
+        masks = self._read_masks()
+        return {relay_name: bool(masks[slot] >> channel & 1) if masks is not None else None
+                for relay_name, (slot, channel) in self.relay_map.items()}
     
     def set_all_relays(self, state: bool) -> bool:
         """
-        Set all relays to same state
+        Set all relays to same state (one write)
         
         Args:
             state: True=ON, False=OFF
@@ -142,11 +240,7 @@ class RelayClient:
         Returns:
             True if all successful
         """
-        success = True
-        for relay_name in self.relay_map.keys():
-            if not self.set_relay(relay_name, state):
-                success = False
-        return success
+        return self.set_relays({relay_name: state for relay_name in self.relay_map})
     
     def safe_shutdown(self) -> bool:
         """
@@ -177,18 +271,31 @@ class RelayClient:
 _client = None
 
 def get_client() -> RelayClient:
-    """Get or create relay client instance"""
+    """Get or create relay client instance (logs relay states to InfluxDB)"""
     global _client
     if _client is None:
-        _client = RelayClient()
+        _client = RelayClient(telemetry=True)
     return _client
 
 
+def close_client():
+    """Release the shared client's DO task and flush its telemetry"""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
 def set_relay(relay_name: str, state: bool) -> bool:
     """Set relay state (convenience function)"""
     return get_client().set_relay(relay_name, state)
 
 
+def set_relays(states: Dict[str, bool]) -> bool:
+    """Set several relays in one write (convenience function)"""
+    return get_client().set_relays(states)
+
+
 def get_relay_state(relay_name: str) -> Optional[bool]:
     """Get relay state (convenience function)"""
     return get_client().get_relay_state(relay_name)
@@ -3,13 +3,14 @@
 import struct
 import os
 import csv
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from pymodbus.client import ModbusTcpClient
+from concurrent.futures import as_completed
 
 try:
     from .config_loader import get_psu_config, load_config, get_psu_ips
+    from .modbus_client import get_executor, write_register, write_registers
 except ImportError:
     from config_loader import get_psu_config, load_config, get_psu_ips
+    from modbus_client import get_executor, write_register, write_registers
 
 
 def set_current(amps, voltage=None):
@@ -197,30 +198,22 @@ def _set_current_gen2(amps):
     port = lbjk_device['port']
     register = gen2_config['dac_register']
     
-    # Connect and write float as 2 registers (FLOAT32_BE)
-    client = None
+    # Pack float to bytes, then to 2x 16-bit registers (big-endian)
+    bytes_data = struct.pack('>f', voltage)
+    regs = [
+        struct.unpack('>H', bytes_data[0:2])[0],
+        struct.unpack('>H', bytes_data[2:4])[0]
+    ]
+    
+    # Write registers on the pooled LabJack connection
     try:
-        client = ModbusTcpClient(host=host, port=port, timeout=1)
-        if not client.connect():
-            raise ConnectionError(f"Failed to connect to LabJack at {host}:{port}")
-        
-        # Pack float to bytes, then to 2x 16-bit registers (big-endian)
-        bytes_data = struct.pack('>f', voltage)
-        regs = [
-            struct.unpack('>H', bytes_data[0:2])[0],
-            struct.unpack('>H', bytes_data[2:4])[0]
-        ]
-        
-        # Write registers
-        response = client.write_registers(register, regs)
-        if response.isError():
-            raise IOError(f"Failed to write to LabJack register {register}")
-        
-        print(f"Gen2: Set current to {amps}A ({gen2_config['dac_channel']} output: {voltage:.2f}V)")
-        
-    finally:
-        if client:
-            client.close()
+        write_registers(host, register, regs, port=port, timeout=1)
+    except ConnectionError:
+        raise ConnectionError(f"Failed to connect to LabJack at {host}:{port}")
+    except IOError:
+        raise IOError(f"Failed to write to LabJack register {register}")
+    
+    print(f"Gen2: Set current to {amps}A ({gen2_config['dac_channel']} output: {voltage:.2f}V)")
 
 
 def _set_voltage_mk1(volts):
@@ -242,21 +235,7 @@ def _set_voltage_mk1(volts):
     
     # Write to all PSUs in parallel
     psu_ips = get_psu_ips()
-    successes = 0
-    failures = 0
-    
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(_write_psu_register, ip, reg_addr, reg_value): ip for ip in psu_ips}
-        
-        for future in as_completed(futures):
-            ip = futures[future]
-            try:
-                if future.result():
-                    successes += 1
-                else:
-                    failures += 1
-            except Exception:
-                failures += 1
+    successes = _write_all_psus(psu_ips, reg_addr, reg_value)
     
     if successes == 0:
         raise ConnectionError("Failed to set voltage on any PSU")
@@ -287,21 +266,7 @@ def _set_current_mk1(amps, voltage=None):
     
     # Write to all PSUs in parallel
     psu_ips = get_psu_ips()
-    successes = 0
-    failures = 0
-    
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(_write_psu_register, ip, reg_addr, reg_value): ip for ip in psu_ips}
-        
-        for future in as_completed(futures):
-            ip = futures[future]
-            try:
-                if future.result():
-                    successes += 1
-                else:
-                    failures += 1
-            except Exception:
-                failures += 1
+    successes = _write_all_psus(psu_ips, reg_addr, reg_value)
     
     if successes == 0:
         raise ConnectionError("Failed to set current on any PSU")
@@ -320,21 +285,7 @@ def _enable_output_mk1(enabled):
     
     # Write to all PSUs in parallel
     psu_ips = get_psu_ips()
-    successes = 0
-    failures = 0
-    
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(_write_psu_register, ip, reg_addr, reg_value): ip for ip in psu_ips}
-        
-        for future in as_completed(futures):
-            ip = futures[future]
-            try:
-                if future.result():
-                    successes += 1
-                else:
-                    failures += 1
-            except Exception:
-                failures += 1
+    successes = _write_all_psus(psu_ips, reg_addr, reg_value)
     
     if successes == 0:
         raise ConnectionError("Failed to enable/disable any PSU")
@@ -343,20 +294,21 @@ def _enable_output_mk1(enabled):
     print(f"MK1: Output {action} ({successes}/{len(psu_ips)} PSUs)")
 
 
+def _write_all_psus(psu_ips, register, value):
+    """Write one register to every PSU in parallel (shared executor, pooled connections).
+    
+    Returns:
+        int: Number of PSUs written successfully
+    """
+    executor = get_executor()
+    futures = [executor.submit(_write_psu_register, ip, register, value) for ip in psu_ips]
+    return sum(1 for future in as_completed(futures) if future.result())
+
+
 def _write_psu_register(ip, register, value):
     """Write a single register to one PSU."""
-    client = None
     try:
-        client = ModbusTcpClient(host=ip, port=502, timeout=0.5)
-        if not client.connect():
-            return False
-        
-        response = client.write_register(register, value)
-        return not response.isError()
-        
+        write_register(ip, register, value, timeout=0.5)
+        return True
     except Exception:
         return False
-    finally:
-        if client:
-            client.close()
-
@@ -13,6 +13,7 @@ from typing import Optional, Dict
 # Configuration
 CONFIG_PATH = Path(__file__).parent.parent / "config" / "devices.yaml"
 PSU_BRIDGE_URL = "http://localhost:8883"
+COMMAND_WAIT = 1.5  # seconds the bridge holds /command open for execution + readback
 
 # Safety limits
 VOLTAGE_MIN = 100.0  # V
@@ -29,21 +30,34 @@ class PSUClient:
     
     def __init__(self):
         self.bridge_url = PSU_BRIDGE_URL
+        self._status_etag = None
+        self._status_cache = None
     
     def _send_command(self, cmd_data):
-        """Send command to PSU bridge"""
+        """Send command to PSU bridge and wait for its acknowledgement
+        
+        Returns:
+            True once the bridge has executed the command and the setpoint
+            readback matched (or the command is still in flight at COMMAND_WAIT)
+        """
         try:
             response = requests.post(
                 f"{self.bridge_url}/command",
+                params={'wait': COMMAND_WAIT},
                 json=cmd_data,
-                timeout=2.0
+                timeout=COMMAND_WAIT + 1.0
             )
-            if response.status_code == 200:
-                return True
-            else:
-                data = response.json()
+            data = response.json()
+            if response.status_code != 200:
                 print(f"✗ Command failed: {data.get('error', 'Unknown error')}")
                 return False
+            if data.get('status') != 'done':
+                print(f"⚠ Command {data.get('id')} still {data.get('status')} after {COMMAND_WAIT}s")
+                return True
+            if data.get('verified') is False:
+                print(f"✗ Command readback mismatch: {data.get('result')}")
+                return False
+            return True
         except requests.exceptions.Timeout:
             print("✗ Command timeout")
             return False
@@ -52,9 +66,12 @@ class PSUClient:
             return False
     
     def _read_status(self):
-        """Read current PSU status from bridge"""
+        """Read latest PSU status from bridge (cached by ETag - 304 means unchanged)"""
         try:
-            response = requests.get(f"{self.bridge_url}/metrics", timeout=1.0)
+            headers = {'If-None-Match': self._status_etag} if self._status_etag else {}
+            response = requests.get(f"{self.bridge_url}/latest", headers=headers, timeout=1.0)
+            if response.status_code == 304:
+                return dict(self._status_cache) if self._status_cache else None
             if response.status_code == 200:
                 # Parse InfluxDB line protocol (simple extraction)
                 text = response.text.strip()
@@ -72,7 +89,9 @@ class PSUClient:
                             data[key] = float(val)
                         except:
                             data[key] = val
-                    return data
+                    self._status_etag = response.headers.get('ETag')
+                    self._status_cache = data
+                    return dict(data)
             return None
         except Exception:
             return None
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Relay State Telemetry
+Writes the ni_relays measurement (RL01-RL16, integer 1/0) for RelayClient:
+    - change events: one point with only the relays that changed, stamped
+      the moment the DO write completed
+    - snapshots: one point with all 16 fields from the cached bitmasks
+      every snapshot_interval seconds (no hardware access)
+Points are queued without blocking and written in batches by a background
+thread, so relay clicks never wait on InfluxDB.
+"""
+
+import queue
+import threading
+import time
+from influxdb_client import InfluxDBClient, WritePrecision
+from influxdb_client.client.write_api import SYNCHRONOUS
+
+try:
+    from .config_loader import get_influx_token
+except ImportError:
+    from config_loader import get_influx_token
+
+MEASUREMENT = "ni_relays"
+
+# Defaults (override in devices.yaml relay_telemetry)
+DEFAULT_SNAPSHOT_INTERVAL = 10.0  # seconds between full-state points
+DEFAULT_FLUSH_INTERVAL = 1.0      # seconds - max wait before writing queued points
+DEFAULT_QUEUE_SIZE = 10000        # points queued before new points are dropped
+
+
+class RelayTelemetry:
+    """Batched, non-blocking ni_relays writer"""
+
+    def __init__(self, relay_map, device_name, system_config, telemetry_config=None):
+        """
+        Args:
+            relay_map: Relay name -> (slot, channel), as RelayClient.relay_map
+            device_name: cDAQ name for the device tag
+            system_config: devices.yaml system section (InfluxDB url/org/bucket)
+            telemetry_config: devices.yaml relay_telemetry section
+        """
+        telemetry_config = telemetry_config or {}
+        self.relay_map = relay_map
+        self.prefix = f"{MEASUREMENT},device={device_name}"
+        self.snapshot_interval = telemetry_config.get('snapshot_interval', DEFAULT_SNAPSHOT_INTERVAL)
+        self.flush_interval = telemetry_config.get('flush_interval', DEFAULT_FLUSH_INTERVAL)
+        self.bucket = system_config.get('influxdb_bucket', 'electrolyzer_data')
+
+        self.client = InfluxDBClient(url=system_config.get('influxdb_url', 'http://localhost:8086'),
+                                     token=get_influx_token(),
+                                     org=system_config.get('influxdb_org', 'electrolyzer'))
+        self.write_api = self.client.write_api(write_options=SYNCHRONOUS)
+
+        self._queue = queue.Queue(maxsize=telemetry_config.get('queue_size', DEFAULT_QUEUE_SIZE))
+        self._stop = threading.Event()
+        self._thread = None
+        self._masks = None  # latest slot -> bitmask seen by record()
+
+        # Counters
+        self.points_written = 0
+        self.dropped_points = 0
+        self.failed_writes = 0
+        self.last_error = None
+
+    def start(self):
+        """Start the writer / snapshot thread"""
+        self._thread = threading.Thread(target=self._run, name="relay_telemetry", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        """Write a final snapshot and flush queued points"""
+        if self._thread is None:
+            return
+        self.snapshot()
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.client.close()
+
+    def _fields(self, masks, relays):
+        """Line protocol field set for the given relays"""
+        return ','.join(f"{name}={masks[slot] >> channel & 1}i"
+                        for name, (slot, channel) in relays)
+
+    def _put(self, line):
+        """Queue one point without blocking (dropped if the queue is full)"""
+        try:
+            self._queue.put_nowait(line)
+        except queue.Full:
+            self.dropped_points += 1
+
+    def record(self, old_masks, new_masks, timestamp_ns=None):
+        """Queue a change event for the relays that differ between two bitmask sets
+
+        Args:
+            old_masks: Slot -> bitmask before the write (None = unknown, all relays logged)
+            new_masks: Slot -> bitmask after the write
+            timestamp_ns: Write completion time (defaults to now)
+        """
+        timestamp_ns = timestamp_ns or time.time_ns()
+        self._masks = dict(new_masks)
+        changed = [(name, (slot, channel)) for name, (slot, channel) in self.relay_map.items()
+                   if old_masks is None or (old_masks[slot] ^ new_masks[slot]) >> channel & 1]
+        if changed:
+            self._put(f"{self.prefix} {self._fields(new_masks, changed)} {timestamp_ns}")
+
+    def snapshot(self):
+        """Queue one point with every relay's cached state"""
+        if self._masks is not None:
+            self._put(f"{self.prefix} {self._fields(self._masks, self.relay_map.items())} {time.time_ns()}")
+
+    def _flush(self):
+        """Write everything queued in one request"""
+        lines = []
+        while True:
+            try:
+                lines.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not lines:
+            return
+        try:
+            self.write_api.write(bucket=self.bucket, record='\n'.join(lines),
+                                 write_precision=WritePrecision.NS)
+            self.points_written += len(lines)
+        except Exception as e:
+            self.failed_writes += 1
+            self.dropped_points += len(lines)
+            self.last_error = str(e)
+            print(f"✗ Relay telemetry write failed: {e}")
+
+    def _run(self):
+        next_snapshot = time.monotonic() + self.snapshot_interval
+        while not self._stop.wait(self.flush_interval):
+            if time.monotonic() >= next_snapshot:
+                self.snapshot()
+                next_snapshot += self.snapshot_interval
+            self._flush()
+        self._flush()
+
+    def stats(self):
+        """Writer counters"""
+        return {
+            'queued': self._queue.qsize(),
+            'points_written': self.points_written,
+            'dropped_points': self.dropped_points,
+            'failed_writes': self.failed_writes,
+            'last_error': self.last_error
+        }
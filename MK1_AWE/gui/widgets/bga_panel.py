@@ -71,14 +71,14 @@ class BGAPanel(QWidget):
         """Toggle purge relays (RL04 O2 Purge, RL06 H2 Purge)"""
         # Import relay client
         try:
-            from ..ni_relay_client import set_relay
+            from ..ni_relay_client import set_relays
         except ImportError:
-            from ni_relay_client import set_relay
+            from ni_relay_client import set_relays
         
         try:
-            # Control purge relays
-            set_relay('RL04', checked)  # O2 Purge
-            set_relay('RL06', checked)  # H2 Purge
+            # Control purge relays together (RL04 O2 Purge, RL06 H2 Purge)
+            if not set_relays({'RL04': checked, 'RL06': checked}):
+                raise IOError("relay write failed")
             
             # Emit signal so relay panel can update button states
             self.purge_relays_changed.emit(checked)
@@ -144,13 +144,12 @@ class BGAPanel(QWidget):
         try:
             # Import relay client
             try:
-                from ..ni_relay_client import set_relay
+                from ..ni_relay_client import set_relays
             except ImportError:
-                from ni_relay_client import set_relay
+                from ni_relay_client import set_relays
             
-            # Close purge valves
-            set_relay('RL04', False)  # O2 Purge closed
-            set_relay('RL06', False)  # H2 Purge closed
+            # Close purge valves (RL04 O2 Purge, RL06 H2 Purge) in one write
+            set_relays({'RL04': False, 'RL06': False})
             
             # Reset button to unchecked
             self.purge_button.setChecked(False)
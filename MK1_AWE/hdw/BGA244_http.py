@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+HTTP bridge for all BGA244 gas analyzers - writes directly to InfluxDB
+One BGA244 driver instance per analyzer in devices.yaml, each polling its
+own serial port in its own thread. All analyzers share one InfluxDB writer
+and one HTTP server:
+    /<bga_id>/metrics, /latest, /health, /command   (e.g. /bga01/latest)
+    /<bga_id>/command/<id>                           command status / readback
+    /health                                          all analyzers + throughput
+With legacy_ports enabled each analyzer is also served on its own
+devices.<BGA>.http_port with unprefixed routes (GUI, Telegraf).
+"""
+import serial
+import time
+import json
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+import threading
+from bridge_common import CONFIG_PATH, load_config, get_influx_writer
+from line_protocol import LineProtocolBuffer, tag_prefix
+from metrics_cursor import parse_cursor, etag_matches, select_samples, cursor_headers
+from bga_protocol import BGAProtocol, DEFAULT_MODE, DEFAULT_TIMEOUT
+from poll_scheduler import DeadlineScheduler
+from command_lane import CommandLane
+
+# Configuration
+RECONNECT_DELAY = 5
+GASES = {"7782-44-7": "O2", "1333-74-0": "H2", "7727-37-9": "N2"}
+OVERLOAD = 9.9E37
+BGA_PROTOCOL = "rs422_usb"
+DEFAULT_PORT = 8887
+LATENCY_WINDOW = 64  # polls kept for latency percentiles / throughput
+GAS_QUERIES = ("GASP?", "GASS?")
+MEASUREMENT_QUERIES = ("RATO? 1%", "UNCT?%", "TCEL? C", "PRES?")
+GAS_COMMANDS = ("GASP", "GASS", "*RST")  # commands that invalidate the cached gas pair
+GAS_QUERIES_BY_COMMAND = {"GASP": "GASP?", "GASS": "GASS?"}  # readback for gas commands
+DEFAULT_GAS_VERIFY_INTERVAL = 30.0  # seconds between gas re-checks without a gas command
+
+# Global state
+analyzers = {}  # route name (bga01) -> BGA244
+influx_writer = None
+influx_bucket = None
+
+
+def setup_influxdb():
+    """Setup InfluxDB writer for direct writes (shared writer when run by bridge_daemon.py)"""
+    global influx_writer, influx_bucket
+
+    influx_writer, influx_bucket = get_influx_writer("bga244_writer")
+    return influx_writer is not None
+
+
+def get_num(text):
+    """Extract number from response, handle overload values"""
+    if not text:
+        return None
+    for part in text.replace('%', '').split():
+        try:
+            val = float(part)
+            if val >= OVERLOAD:
+                return 0.0
+            return val
+        except:
+            pass
+    return None
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list (None if empty)"""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+class BGA244:
+    """One BGA244 analyzer: serial poll loop, sample buffer and HTTP routes"""
+
+    def __init__(self, bga_id, device_config, bridge_config, protocol_config=None,
+                 gas_verify_interval=DEFAULT_GAS_VERIFY_INTERVAL):
+        self.bga_id = bga_id
+        self.com_port = device_config['com_port']
+        self.baud_rate = device_config['baud_rate']
+        self.http_port = device_config.get('http_port')
+        self.sample_rate = bridge_config.get('sample_rate', 2)
+        self.buffer_seconds = bridge_config.get('buffer_seconds', 2)
+        self.hw_max_rate = bridge_config.get('hw_max_rate', 5)
+        protocol_config = protocol_config or {}
+        self.protocol_mode = protocol_config.get('mode', DEFAULT_MODE)
+        self.reply_timeout = protocol_config.get('timeout', DEFAULT_TIMEOUT)
+        self.protocol = None  # BGAProtocol for the open serial port
+
+        self.sample_buffer = deque(maxlen=self.sample_rate * self.buffer_seconds)
+        self.device_online = False
+        self.data_lock = threading.Lock()
+        self.sample_seq = 0  # Sequence number of newest buffered sample (cursor for /metrics?since=)
+        self.line_buffer = LineProtocolBuffer()
+        self.gas_prefixes = {}  # (primary_gas, secondary_gas) -> line protocol tag prefix
+
+        # Command lane for external control - wakes the poll loop, acks with readback
+        self.command_lane = CommandLane(self.bga_id.lower())
+
+        # Cached gas pair - re-queried only after a gas command, reconnect or verify interval
+        self.gas_verify_interval = gas_verify_interval
+        self.gas_pair = None  # (primary_gas, secondary_gas) or None = refresh on next poll
+        self._gas_checked = 0.0
+        self.gas_cache_hits = 0
+        self.gas_refreshes = 0
+
+        # Poll timing
+        self.scheduler = DeadlineScheduler(self.sample_rate)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._poll_times = deque(maxlen=LATENCY_WINDOW)
+        self._measurement_times = deque(maxlen=LATENCY_WINDOW)
+        self.polls = 0
+        self.queries_sent = 0
+
+    def get_gas_prefix(self, primary_gas, secondary_gas):
+        """Get (cached) line protocol tag prefix for the current gas pair"""
+        key = (primary_gas, secondary_gas)
+        prefix = self.gas_prefixes.get(key)
+        if prefix is None:
+            prefix = tag_prefix("bga_metrics", {
+                'bga_id': self.bga_id,
+                'hardware': "bga244",
+                'location': "gen3_test_rig",
+                'primary_gas': primary_gas,
+                'secondary_gas': secondary_gas
+            })
+            self.gas_prefixes[key] = prefix
+        return prefix
+
+    def write_to_influxdb(self, samples):
+        """Write batch of samples directly to InfluxDB"""
+        if not influx_writer:
+            return False
+
+        try:
+            self.line_buffer.clear()
+            for sample in samples:
+                self.line_buffer.add_point(
+                    self.get_gas_prefix(sample['primary_gas'], sample['secondary_gas']),
+                    {
+                        'purity': sample['purity'],
+                        'uncertainty': sample['uncertainty'],
+                        'temperature': sample['temperature'],
+                        'pressure': sample['pressure']
+                    },
+                    sample['timestamp_ns']
+                )
+
+            if self.line_buffer.points:
+                influx_writer.submit(self.line_buffer.getvalue(), self.line_buffer.points)
+            return True
+        except Exception as e:
+            print(f"[ERROR] {self.bga_id} InfluxDB write failed: {e}")
+            return False
+
+    def poll(self):
+        """Continuously poll this BGA and write to InfluxDB"""
+        write_batch_size = self.sample_rate  # Write every ~1 second
+        pending_samples = []
+
+        print(f"{self.bga_id}: {self.com_port} at {self.baud_rate} baud, {self.sample_rate} Hz, "
+              f"buffer {self.sample_rate * self.buffer_seconds} samples ({self.buffer_seconds}s)")
+
+        ser = None
+        while True:
+            try:
+                ser = serial.Serial(self.com_port, self.baud_rate, timeout=self.reply_timeout)
+                self.protocol = BGAProtocol(ser, self.protocol_mode, self.reply_timeout)
+                print(f"[OK] Connected to {self.bga_id} on {self.com_port} ({self.protocol_mode} protocol)")
+                self.device_online = True
+                self.gas_pair = None  # gases may have changed while disconnected
+                self.scheduler.reset()
+
+                while True:
+                    # Commands wake the wait and run now instead of at the next slot
+                    if not self.scheduler.wait(self.command_lane.pending):
+                        self.command_lane.run_pending(self.execute_command)
+                        continue
+                    self.command_lane.run_pending(self.execute_command)
+                    poll_start = time.perf_counter()
+
+                    # Gas pair only when stale - serial budget goes to measurements
+                    refresh_gas = (self.gas_pair is None or
+                                   time.monotonic() - self._gas_checked >= self.gas_verify_interval)
+                    queries = GAS_QUERIES + MEASUREMENT_QUERIES if refresh_gas else MEASUREMENT_QUERIES
+                    self.scheduler.begin_io()
+                    replies = self.protocol.transaction(queries)
+                    timestamp_ns = self.scheduler.end_io()
+                    self.queries_sent += len(queries)
+                    if refresh_gas:
+                        self.gas_refreshes += 1
+                        self.update_gas_pair(*replies[:2])
+                    else:
+                        self.gas_cache_hits += 1
+                    pur, unc, tc, ps = (get_num(reply) for reply in replies[-len(MEASUREMENT_QUERIES):])
+
+                    now = time.monotonic()
+                    self._latencies.append(time.perf_counter() - poll_start)
+                    self._poll_times.append(now)
+                    self.polls += 1
+
+                    # Check if we have valid data
+                    if all(reply is None for reply in replies):
+                        self.device_online = False
+                    else:
+                        self.device_online = True
+                        self._measurement_times.append(now)
+                        primary_gas, secondary_gas = self.gas_pair or ("NA", "NA")
+                        sample = {
+                            'timestamp_ns': timestamp_ns,
+                            'primary_gas': primary_gas,
+                            'secondary_gas': secondary_gas,
+                            'purity': pur,
+                            'uncertainty': unc,
+                            'temperature': tc,
+                            'pressure': ps
+                        }
+
+                        # Add to pending samples for InfluxDB write
+                        pending_samples.append(sample)
+
+                        # Add to buffer for /metrics endpoint
+                        with self.data_lock:
+                            self.sample_seq += 1
+                            sample['seq'] = self.sample_seq
+                            self.sample_buffer.append(sample)
+
+                        # Write to InfluxDB when we have enough samples
+                        if len(pending_samples) >= write_batch_size:
+                            self.write_to_influxdb(pending_samples)
+                            pending_samples = []
+
+            except Exception as e:
+                self.device_online = False
+                self.command_lane.fail_pending(f"{self.bga_id} offline: {e}")
+                if ser is not None:
+                    ser.close()
+                    ser = None
+                print(f"[ERROR] {self.bga_id} offline: {e}")
+                print(f"  Retrying in {RECONNECT_DELAY}s...")
+                time.sleep(RECONNECT_DELAY)
+
+    def execute_command(self, command):
+        """Send one /command line on the poll thread
+
+        Queries (e.g. "PRES?") return their reply. Gas commands (GASP/GASS <cas>)
+        are read back with GASP?/GASS?, which also refreshes the cached gas pair.
+
+        Returns:
+            (result dict or None, verified) - verified is None without a readback
+        """
+        print(f"  {self.bga_id} sending command: {command}")
+        name, _, value = command.partition(' ')
+        name = name.upper()
+
+        if '?' in name:
+            reply = self.protocol.query(command)
+            if reply is None:
+                raise TimeoutError(f"No reply to {command}")
+            return {'reply': reply}, None
+
+        self.protocol.write(command)
+        if not name.startswith(GAS_COMMANDS):
+            return None, None
+
+        self.gas_pair = None
+        if name not in GAS_QUERIES_BY_COMMAND:
+            return None, None  # *RST - gases re-queried on the next poll
+
+        replies = self.protocol.transaction(GAS_QUERIES)
+        self.queries_sent += len(GAS_QUERIES)
+        self.update_gas_pair(*replies)
+        readback = replies[GAS_QUERIES.index(GAS_QUERIES_BY_COMMAND[name])]
+        verified = readback is not None and readback.strip() == value.strip()
+        if not verified:
+            print(f"[WARN] {self.bga_id} {name} readback {readback!r} != {value.strip()!r}")
+        return {'readback': readback}, verified
+
+    def update_gas_pair(self, pg, sg):
+        """Store freshly queried gases (left stale if the analyzer did not answer)"""
+        if pg is None and sg is None:
+            return
+        gas_pair = (pg if pg else "NA", sg if sg else "NA")
+        if self.gas_pair is not None and gas_pair != self.gas_pair:
+            print(f"[WARN] {self.bga_id} gases changed outside /command: {self.gas_pair} -> {gas_pair}")
+        self.gas_pair = gas_pair
+        self._gas_checked = time.monotonic()
+
+    def handle_request(self, method, path, headers, body=b''):
+        """Route one HTTP request for this analyzer (path without /<bga_id> prefix)
+
+        Args:
+            method: 'GET' or 'POST'
+            path: Request path including query string
+            headers: Request headers (anything with .get)
+            body: Request body bytes
+
+        Returns:
+            (status, headers dict, body bytes)
+        """
+        url = urlparse(path)
+        if method == 'GET' and url.path == '/metrics':
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                since_seq, since_ns = parse_cursor(params)
+            except ValueError:
+                return 400, {'Content-Type': 'text/plain'}, b"since/since_ns must be integers"
+            return self.metrics_response(headers.get('If-None-Match'), since_seq, since_ns)
+        if method == 'GET' and url.path == '/latest':
+            return self.metrics_response(headers.get('If-None-Match'), latest_only=True)
+        if method == 'GET' and url.path == '/health':
+            return 200, {'Content-Type': 'application/json'}, json.dumps(self.health(), indent=2).encode()
+        if method == 'POST' and url.path == '/command':
+            if not self.device_online:
+                return 503, {'Content-Type': 'text/plain'}, f"{self.bga_id} offline".encode()
+            command = body.decode().strip()
+            if not command:
+                return 400, {'Content-Type': 'text/plain'}, b"Empty command"
+            entry = self.command_lane.submit(command)
+            wait = parse_qs(url.query).get('wait')
+            if wait:
+                try:
+                    self.command_lane.wait(entry, float(wait[0]))
+                except ValueError:
+                    pass
+            return self.command_response(entry)
+        if method == 'GET' and url.path.startswith('/command/'):
+            entry = self.command_lane.get(url.path[len('/command/'):])
+            if entry is None:
+                return 404, {'Content-Type': 'text/plain'}, b"Unknown command"
+            return self.command_response(entry)
+        return 404, {'Content-Type': 'text/plain'}, b"Not found"
+
+    @staticmethod
+    def command_response(entry):
+        """JSON status of a command record (500 if it failed)"""
+        status = 500 if entry.status == "failed" else 200
+        return status, {'Content-Type': 'application/json'}, json.dumps(entry.to_dict()).encode()
+
+    def metrics_response(self, if_none_match, since_seq=None, since_ns=None, latest_only=False):
+        """Buffered samples as line protocol (204 if none, 304 if unchanged)"""
+        with self.data_lock:
+            if not self.device_online or len(self.sample_buffer) == 0:
+                return 204, {}, b''
+
+            headers = cursor_headers(self.sample_buffer[-1]['seq'])
+            samples = [self.sample_buffer[-1]] if latest_only else list(self.sample_buffer)
+
+        if etag_matches(if_none_match, headers['ETag']):
+            return 304, headers, b''
+
+        samples = select_samples(samples, since_seq, since_ns)
+
+        lines = []
+        for sample in samples:
+            gas_tags = f'primary_gas={sample["primary_gas"]},secondary_gas={sample["secondary_gas"]}'
+
+            fields = []
+            if sample["purity"] is not None:
+                fields.append(f'purity={sample["purity"]:.3f}')
+            if sample["uncertainty"] is not None:
+                fields.append(f'uncertainty={sample["uncertainty"]:.3f}')
+            if sample["temperature"] is not None:
+                fields.append(f'temperature={sample["temperature"]:.3f}')
+            if sample["pressure"] is not None:
+                fields.append(f'pressure={sample["pressure"]:.3f}')
+
+            if fields:
+                line = f'bga_metrics,{gas_tags} {",".join(fields)} {sample["timestamp_ns"]}'
+                lines.append(line)
+
+        headers['Content-Type'] = 'text/plain'
+        return 200, headers, '\n'.join(lines).encode() + b'\n' if lines else b''
+
+    @staticmethod
+    def _rate(event_times):
+        """Events per second over a window of monotonic times"""
+        times = list(event_times)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return None
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def poll_rate(self):
+        """Measured polls per second over the latency window"""
+        return self._rate(self._poll_times)
+
+    def measurement_rate(self):
+        """Polls per second that produced a sample"""
+        return self._rate(self._measurement_times)
+
+    def health(self):
+        """Analyzer status, poll latency and writer stats"""
+        with self.data_lock:
+            buffer_size = len(self.sample_buffer)
+            buffer_max = self.sample_buffer.maxlen
+        latencies = sorted(self._latencies)
+        rate = self.poll_rate()
+        measurement_rate = self.measurement_rate()
+        gas_lookups = self.gas_cache_hits + self.gas_refreshes
+
+        return {
+            'bga_id': self.bga_id,
+            'status': 'online' if self.device_online else 'offline',
+            'device_online': self.device_online,
+            'com_port': self.com_port,
+            'sample_rate': self.sample_rate,
+            'measured_rate': round(rate, 2) if rate else None,
+            'buffer_seconds': self.buffer_seconds,
+            'buffer_size': buffer_size,
+            'buffer_max': buffer_max,
+            'buffer_pct': round(100 * buffer_size / buffer_max, 1) if buffer_max > 0 else 0,
+            'measurement_rate': round(measurement_rate, 2) if measurement_rate else None,
+            'polls': self.polls,
+            'queries_per_poll': round(self.queries_sent / self.polls, 2) if self.polls else None,
+            'gas_pair': list(self.gas_pair) if self.gas_pair else None,
+            'gas_cache_hits': self.gas_cache_hits,
+            'gas_refreshes': self.gas_refreshes,
+            'gas_cache_hit_ratio': round(self.gas_cache_hits / gas_lookups, 3) if gas_lookups else None,
+            'gas_verify_interval': self.gas_verify_interval,
+            'poll_latency_p50_ms': round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+            'poll_latency_p95_ms': round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+            'protocol': self.protocol.stats() if self.protocol else None,
+            'scheduler': self.scheduler.stats(),
+            'command_lane': self.command_lane.stats(),
+            'influxdb_enabled': influx_writer is not None,
+            'points_written': influx_writer.points_written if influx_writer else 0,
+            'influxdb_writer': influx_writer.stats() if influx_writer else None
+        }
+
+
+def create_analyzers():
+    """Create one BGA244 driver per configured analyzer
+
+    Analyzers come from bridges.bga.analyzers, or every device with
+    protocol rs422_usb; per-analyzer rates from bridges.<bga_id>.
+
+    Returns:
+        Dict of route name (bga01) -> BGA244
+    """
+    config = load_config()
+    devices = config.get('devices', {})
+    bridges = config.get('bridges', {})
+    protocol_config = bridges.get('bga', {}).get('protocol', {})
+    gas_verify_interval = bridges.get('bga', {}).get('gas_verify_interval', DEFAULT_GAS_VERIFY_INTERVAL)
+
+    bga_ids = bridges.get('bga', {}).get('analyzers') or [
+        name for name, device in devices.items() if device.get('protocol') == BGA_PROTOCOL
+    ]
+    for bga_id in bga_ids:
+        analyzers[bga_id.lower()] = BGA244(bga_id, devices[bga_id], bridges.get(bga_id.lower(), {}),
+                                              protocol_config, gas_verify_interval)
+    return analyzers
+
+
+def handle_request(method, path, headers, body=b''):
+    """Shared HTTP surface: /health plus /<bga_id>/... routed to each analyzer"""
+    url = urlparse(path)
+    if method == 'GET' and url.path == '/health':
+        return 200, {'Content-Type': 'application/json'}, json.dumps(health(), indent=2).encode()
+
+    name, _, rest = url.path.lstrip('/').partition('/')
+    analyzer = analyzers.get(name.lower())
+    if analyzer is None:
+        return 404, {'Content-Type': 'text/plain'}, b"Not found"
+    sub_path = '/' + rest + (f"?{url.query}" if url.query else '')
+    return analyzer.handle_request(method, sub_path, headers, body)
+
+
+def health():
+    """All analyzers plus combined throughput"""
+    per_analyzer = {name: analyzer.health() for name, analyzer in analyzers.items()}
+    for stats in per_analyzer.values():
+        stats.pop('influxdb_writer')
+    rates = [analyzer.measurement_rate() for analyzer in analyzers.values()]
+
+    return {
+        'status': 'online' if any(a.device_online for a in analyzers.values()) else 'offline',
+        'analyzers': per_analyzer,
+        'online': sum(1 for a in analyzers.values() if a.device_online),
+        'combined_samples_per_s': round(sum(r for r in rates if r), 2),
+        'influxdb_enabled': influx_writer is not None,
+        'influxdb_writer': influx_writer.stats() if influx_writer else None
+    }
+
+
+def make_handler(handle):
+    """BaseHTTPRequestHandler class that routes every request to handle()"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """HTTP request handler for metrics endpoint"""
+
+        def do_GET(self):
+            self.send(*handle('GET', self.path, self.headers))
+
+        def do_POST(self):
+            content_length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(content_length)
+            self.send(*handle('POST', self.path, self.headers, body))
+
+        def send(self, status, headers, body):
+            self.send_response(status)
+            for key, value in headers.items():
+                self.send_header(key, value)
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def serve(port, handle):
+    """Run an HTTP server for handle() in a daemon thread"""
+    server = ThreadingHTTPServer(('0.0.0.0', port), make_handler(handle))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    config = load_config()
+    bga_config = config.get('bridges', {}).get('bga', {})
+    port = bga_config.get('port', DEFAULT_PORT)
+
+    print("BGA244 HTTP Bridge (Direct InfluxDB)")
+    print(f"Config: {CONFIG_PATH}")
+    create_analyzers()
+    for name, analyzer in analyzers.items():
+        print(f"  {analyzer.bga_id}: {analyzer.com_port}, {analyzer.sample_rate} Hz "
+              f"(hardware max: {analyzer.hw_max_rate} Hz)")
+    print(f"Endpoints: http://localhost:{port}/health, /<bga_id>/metrics, /latest, /health, /command")
+    print()
+
+    # Setup InfluxDB direct writes (one writer for all analyzers)
+    setup_influxdb()
+
+    # One serial worker per analyzer
+    for analyzer in analyzers.values():
+        threading.Thread(target=analyzer.poll, name=analyzer.bga_id, daemon=True).start()
+
+    # Per-analyzer ports for existing clients
+    if bga_config.get('legacy_ports', True):
+        for analyzer in analyzers.values():
+            if analyzer.http_port:
+                serve(analyzer.http_port, analyzer.handle_request)
+                print(f"  {analyzer.bga_id} also on http://localhost:{analyzer.http_port}/metrics")
+
+    # Shared HTTP surface
+    server = ThreadingHTTPServer(('0.0.0.0', port), make_handler(handle_request))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down...")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+BGA244 Serial Protocol Engine
+Terminator-driven request/response over an open pyserial port. Replies are
+read up to the line terminator instead of sleeping a fixed delay, and a
+poll's queries go out as one transaction:
+    pipeline    all queries written back-to-back, replies read in order (FIFO)
+    concat      one line "Q1;Q2;..." - one reply line split on ';'
+    sequential  one query, one reply at a time
+Latency is recorded for /health per command and per transaction. A
+command's latency is the time its own reply took: from the write in
+sequential mode, from the previous reply (the first from the write) in
+pipeline mode, and the whole reply line in concat mode, where all queries
+share one reply.
+"""
+
+import threading
+import time
+from collections import deque
+
+# Defaults (override in devices.yaml bridges.bga.protocol)
+DEFAULT_MODE = "pipeline"
+DEFAULT_TIMEOUT = 0.5       # seconds to wait for one reply line
+TERMINATOR = b"\n"          # BGA244 replies end in CR LF
+LATENCY_WINDOW = 256        # replies kept per command for latency percentiles
+MODES = ("pipeline", "concat", "sequential")
+
+
+class BGAProtocol:
+    """Query/response transactions with one BGA244"""
+
+    def __init__(self, ser, mode=DEFAULT_MODE, timeout=DEFAULT_TIMEOUT):
+        if mode not in MODES:
+            raise ValueError(f"BGA protocol mode must be one of {MODES}, got '{mode}'")
+        self.ser = ser
+        self.mode = mode
+        self.ser.timeout = timeout
+
+        # Per-command latency (s) and counters; latencies are recorded on the
+        # device thread and read by /health, so both sides hold _stats_lock
+        self._stats_lock = threading.Lock()
+        self._latencies = {}
+        self._transaction_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.transactions = 0
+        self.timeouts = 0
+        self.resyncs = 0
+
+    def write(self, command):
+        """Send a command that has no reply (setters)"""
+        self.ser.write((command + "\r").encode())
+
+    def _read_line(self):
+        """One reply line without terminator, or None on timeout"""
+        data = self.ser.read_until(TERMINATOR)
+        if not data.endswith(TERMINATOR):
+            self.timeouts += 1
+            return None
+        return data.decode(errors='replace').strip()
+
+    def _record(self, command, elapsed):
+        with self._stats_lock:
+            latencies = self._latencies.get(command)
+            if latencies is None:
+                latencies = self._latencies[command] = deque(maxlen=LATENCY_WINDOW)
+            latencies.append(elapsed)
+
+    def _record_transaction(self, elapsed):
+        with self._stats_lock:
+            self._transaction_latencies.append(elapsed)
+
+    def query(self, command):
+        """Single query round trip"""
+        return self.transaction((command,))[0]
+
+    def transaction(self, commands):
+        """Send queries as one transaction and match replies to requests
+
+        Args:
+            commands: Query strings, e.g. ("GASP?", "RATO? 1%")
+
+        Returns:
+            List of reply strings (None where no reply arrived), same order as commands
+        """
+        self.transactions += 1
+        transaction_start = time.perf_counter()
+
+        # Drop stale bytes so replies line up with this transaction
+        if self.ser.in_waiting:
+            self.ser.reset_input_buffer()
+            self.resyncs += 1
+
+        if self.mode == "concat":
+            replies = self._concat(commands)
+            if replies[0] is not None:
+                self._record_transaction(time.perf_counter() - transaction_start)
+            return replies
+
+        replies = []
+        if self.mode == "pipeline":
+            start = time.perf_counter()
+            self.ser.write(b"".join((command + "\r").encode() for command in commands))
+            for command in commands:
+                reply = self._read_line()
+                if reply is None:
+                    break
+                # Time since the previous reply, not since the write (that would be cumulative)
+                now = time.perf_counter()
+                self._record(command, now - start)
+                start = now
+                replies.append(reply)
+        else:
+            for command in commands:
+                start = time.perf_counter()
+                self.write(command)
+                reply = self._read_line()
+                if reply is None:
+                    break
+                self._record(command, time.perf_counter() - start)
+                replies.append(reply)
+
+        if len(replies) < len(commands):
+            # A missing reply breaks FIFO matching - discard the rest and resync
+            self.ser.reset_input_buffer()
+            self.resyncs += 1
+            replies += [None] * (len(commands) - len(replies))
+        else:
+            self._record_transaction(time.perf_counter() - transaction_start)
+        return replies
+
+    def _concat(self, commands):
+        """All queries on one line, one ';'-separated reply line"""
+        start = time.perf_counter()
+        self.write(";".join(commands))
+        reply = self._read_line()
+        parts = reply.split(";") if reply is not None else []
+        if len(parts) != len(commands):
+            if reply is not None:
+                # Wrong part count: the reply may belong to an earlier line - drop anything queued behind it
+                self.ser.reset_input_buffer()
+                self.resyncs += 1
+            return [None] * len(commands)
+
+        elapsed = time.perf_counter() - start
+        for command in commands:
+            self._record(command, elapsed)
+        return [part.strip() for part in parts]
+
+    def stats(self):
+        """Per-command and per-transaction latency percentiles and error counters for /health"""
+        def percentiles(latencies):
+            ordered = sorted(latencies)
+            return {
+                'count': len(ordered),
+                'p50_ms': round(ordered[len(ordered) // 2] * 1000, 1),
+                'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1)
+            }
+
+        # Snapshot under the lock; sorting happens outside it
+        with self._stats_lock:
+            command_latencies = {command: list(latencies) for command, latencies in self._latencies.items()}
+            transaction_latencies = list(self._transaction_latencies)
+
+        commands = {command: percentiles(latencies) for command, latencies in command_latencies.items()}
+        return {
+            'mode': self.mode,
+            'transactions': self.transactions,
+            'transaction_latency': percentiles(transaction_latencies) if transaction_latencies else None,
+            'timeouts': self.timeouts,
+            'resyncs': self.resyncs,
+            'commands': commands
+        }
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Shared Bridge Setup
+Config and InfluxDB writer setup used by every hardware bridge. When the
+bridges run inside bridge_daemon.py they share one parsed devices.yaml and
+one InfluxDB writer; run standalone, each bridge still gets its own.
+"""
+
+import sys
+import threading
+import yaml
+from pathlib import Path
+from influxdb_client import InfluxDBClient
+from influxdb_client.client.write_api import SYNCHRONOUS
+from influx_writer import InfluxWriter
+
+# InfluxDB token lookup is shared with the GUI (gui/config_loader.py)
+sys.path.append(str(Path(__file__).parent.parent / "gui"))
+from config_loader import get_influx_token
+
+CONFIG_PATH = Path(__file__).parent.parent / "config" / "devices.yaml"
+
+# Process-wide cache
+_config = None
+_config_lock = threading.Lock()
+_shared_writer = None  # (InfluxWriter, bucket) set by bridge_daemon.py
+
+
+def load_config():
+    """Load configuration from devices.yaml (parsed once per process)"""
+    global _config
+
+    with _config_lock:
+        if _config is None:
+            with open(CONFIG_PATH, 'r') as f:
+                _config = yaml.safe_load(f)
+        return _config
+
+
+def create_influx_writer(name):
+    """Create and start a background InfluxDB writer
+
+    Args:
+        name: Writer name (thread name and spool subfolder)
+
+    Returns:
+        (InfluxWriter or None if writes are disabled, bucket)
+    """
+    system_config = load_config().get('system', {})
+    influx_url = system_config.get('influxdb_url', 'http://localhost:8086')
+    influx_org = system_config.get('influxdb_org', 'electrolyzer')
+    influx_bucket = system_config.get('influxdb_bucket', 'electrolyzer_data')
+
+    influx_token = get_influx_token()
+    if not influx_token:
+        print("[WARN] INFLUXDB_ADMIN_TOKEN not set - direct writes disabled")
+        return None, influx_bucket
+
+    writer_config = system_config.get('influxdb_writer', {})
+    spool_config = system_config.get('influxdb_spool', {})
+
+    try:
+        client = InfluxDBClient(url=influx_url, token=influx_token, org=influx_org,
+                                enable_gzip=writer_config.get('gzip', True))
+        # Writer thread owns the write API - acquisition loops only queue batches
+        writer = InfluxWriter(client.write_api(write_options=SYNCHRONOUS),
+                              influx_bucket, writer_config, name=name,
+                              spool_config=spool_config).start()
+        print(f"[OK] Connected to InfluxDB at {influx_url}")
+        print(f"     Bucket: {influx_bucket}, Org: {influx_org}")
+        return writer, influx_bucket
+    except Exception as e:
+        print(f"[ERROR] Failed to connect to InfluxDB: {e}")
+        return None, influx_bucket
+
+
+def share_influx_writer(writer, bucket):
+    """Make every bridge in this process use one writer (bridge_daemon.py)"""
+    global _shared_writer
+    _shared_writer = (writer, bucket)
+
+
+def get_influx_writer(name):
+    """Shared writer if the daemon installed one, otherwise a new per-bridge writer"""
+    if _shared_writer is not None:
+        return _shared_writer
+    return create_influx_writer(name)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Gen3 Bridge Daemon
+Runs every hardware bridge in one supervised process instead of six:
+devices.yaml is parsed once, all drivers share one batched InfluxDB writer,
+and one HTTP port serves per-device routes:
+    /<device>/metrics, /latest, /health, ...   (e.g. /psu/latest, /bga01/health)
+    /health                                    daemon, driver and writer status
+Each driver runs in its own thread and is restarted on its own if it dies.
+Drivers listed under `subprocess` (the GIL-heavy NI path) run as supervised
+child processes on their standalone ports instead.
+With standalone_ports enabled, in-process drivers are also served unprefixed
+on their own bridges.<device>.port (and BGA legacy_ports on each analyzer's
+http_port), so the GUI, Telegraf and Grafana reach them exactly as they
+reach the standalone bridges.
+"""
+
+import importlib
+import json
+import subprocess
+import sys
+import threading
+import time
+from http import HTTPStatus
+from pathlib import Path
+from flask import Flask, Response
+from werkzeug.middleware.dispatcher import DispatcherMiddleware
+from werkzeug.serving import make_server, run_simple
+from bridge_common import CONFIG_PATH, load_config, create_influx_writer, share_influx_writer
+
+# Device name -> (bridge module, acquisition loop or None for per-instance drivers)
+DRIVERS = {
+    'ni_analog': ('ni_analog_http', 'read_analog_inputs'),
+    'pico_tc08': ('pico_tc08_http', 'read_thermocouples'),
+    'psu': ('psu_http', 'read_psu_data'),
+    'cvm24p': ('cvm24p_http', 'read_cell_voltages'),
+    'modbus_tcp': ('modbus_tcp_http', 'poll_devices'),
+    'labjack': ('labjack_http', 'read_labjack'),
+    'bga': ('BGA244_http', None),  # one driver per configured analyzer
+}
+
+# Defaults (override in devices.yaml bridges.daemon)
+DEFAULT_PORT = 8880
+DEFAULT_RESTART_DELAY = 5  # seconds
+
+app = Flask(__name__)
+drivers = {}  # device name -> DriverThread / DriverProcess
+influx_writer = None
+started_at = time.time()
+
+
+class DriverThread:
+    """Acquisition loop in a daemon thread, restarted if it raises or returns"""
+
+    def __init__(self, name, target, restart_delay=DEFAULT_RESTART_DELAY):
+        self.name = name
+        self.target = target
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.last_error = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                self.target()
+                self.last_error = "driver loop returned"
+            except Exception as e:
+                self.last_error = str(e)
+            print(f"[ERROR] {self.name} driver stopped: {self.last_error}")
+            print(f"  Restarting in {self.restart_delay}s...")
+            time.sleep(self.restart_delay)
+            self.restarts += 1
+
+    def stats(self):
+        return {
+            'mode': 'thread',
+            'alive': self._thread is not None and self._thread.is_alive(),
+            'restarts': self.restarts,
+            'last_error': self.last_error
+        }
+
+
+class DriverProcess:
+    """Standalone bridge script as a child process, restarted when it exits"""
+
+    def __init__(self, name, script, restart_delay=DEFAULT_RESTART_DELAY):
+        self.name = name
+        self.script = script
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self.last_error = None
+        self._process = None
+
+    def start(self):
+        threading.Thread(target=self._run, name=self.name, daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            self._process = subprocess.Popen([sys.executable, str(self.script)],
+                                             cwd=str(self.script.parent))
+            code = self._process.wait()
+            self.last_error = f"exited with code {code}"
+            print(f"[ERROR] {self.name} process {self.last_error}")
+            print(f"  Restarting in {self.restart_delay}s...")
+            time.sleep(self.restart_delay)
+            self.restarts += 1
+
+    def stop(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+    def stats(self):
+        return {
+            'mode': 'subprocess',
+            'alive': self._process is not None and self._process.poll() is None,
+            'pid': self._process.pid if self._process else None,
+            'restarts': self.restarts,
+            'last_error': self.last_error
+        }
+
+
+def handler_app(handle_request):
+    """WSGI adapter for http.server bridges that expose handle_request()"""
+    def wsgi_app(environ, start_response):
+        path = environ.get('PATH_INFO', '/')
+        if environ.get('QUERY_STRING'):
+            path += '?' + environ['QUERY_STRING']
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        body = environ['wsgi.input'].read(length) if length else b''
+        headers = {'If-None-Match': environ.get('HTTP_IF_NONE_MATCH')}
+
+        status, response_headers, payload = handle_request(environ['REQUEST_METHOD'], path, headers, body)
+        start_response(f"{status} {HTTPStatus(status).phrase}", list(response_headers.items()))
+        return [payload]
+    return wsgi_app
+
+
+def serve_port(port, wsgi_app, label):
+    """Serve a WSGI app on an extra port in a background thread"""
+    try:
+        server = make_server('0.0.0.0', port, wsgi_app, threaded=True)
+    except OSError as e:
+        print(f"[WARN] {label}: cannot bind port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name=f"http_{port}", daemon=True).start()
+    print(f"  {label} also on http://localhost:{port}/")
+    return server
+
+
+def start_drivers(config, daemon_config):
+    """Import, wire and start every configured driver
+
+    Returns:
+        (mounts, ports): URL prefix -> WSGI app for in-process drivers, and
+        standalone port -> (label, WSGI app) to serve them on as well
+    """
+    bridges_config = config.get('bridges', {})
+    restart_delay = daemon_config.get('restart_delay', DEFAULT_RESTART_DELAY)
+    subprocess_devices = daemon_config.get('subprocess', [])
+    mounts = {}
+    ports = {}
+
+    for name in daemon_config.get('devices', list(DRIVERS)):
+        if name not in DRIVERS:
+            print(f"[WARN] Unknown device '{name}' in bridges.daemon.devices - skipped")
+            continue
+        module_name, loop_name = DRIVERS[name]
+
+        if name in subprocess_devices:
+            script = Path(__file__).parent / f"{module_name}.py"
+            drivers[name] = DriverProcess(name, script, restart_delay).start()
+            print(f"[OK] {name}: subprocess ({script.name}, standalone port)")
+            continue
+
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            # Missing driver library only takes this device out
+            print(f"[ERROR] {name}: import failed: {e}")
+            continue
+
+        module.setup_influxdb()  # picks up the shared writer
+        if loop_name is None:
+            # BGA244: one thread and route prefix per analyzer, combined status under /<name>/
+            analyzers = module.create_analyzers()
+            entries = [(sub_name, analyzer.poll, handler_app(analyzer.handle_request))
+                       for sub_name, analyzer in analyzers.items()]
+            mounts[f'/{name}'] = handler_app(module.handle_request)
+            if bridges_config.get(name, {}).get('legacy_ports', True):
+                for sub_name, analyzer in analyzers.items():
+                    if analyzer.http_port:
+                        ports[analyzer.http_port] = (sub_name, handler_app(analyzer.handle_request))
+        else:
+            entries = [(name, getattr(module, loop_name), module.app)]
+
+        # Same app, unprefixed, on the bridge's standalone port
+        standalone_port = bridges_config.get(name, {}).get('port')
+        if standalone_port:
+            ports.setdefault(standalone_port, (name, mounts.get(f'/{name}') or entries[0][2]))
+
+        for driver_name, loop, wsgi_app in entries:
+            drivers[driver_name] = DriverThread(driver_name, loop, restart_delay).start()
+            mounts[f'/{driver_name}'] = wsgi_app
+            print(f"[OK] {driver_name}: thread, routes under /{driver_name}/")
+
+    return mounts, ports
+
+
+@app.route('/health')
+def health():
+    """Daemon, driver and shared writer status"""
+    response = {
+        'status': 'online',
+        'uptime_s': round(time.time() - started_at),
+        'drivers': {name: driver.stats() for name, driver in drivers.items()},
+        'influxdb_enabled': influx_writer is not None,
+        'influxdb_writer': influx_writer.stats() if influx_writer else None
+    }
+    return Response(json.dumps(response, indent=2), mimetype='application/json')
+
+
+def main():
+    """Main entry point"""
+    global influx_writer
+
+    config = load_config()
+    daemon_config = config.get('bridges', {}).get('daemon', {})
+    port = daemon_config.get('port', DEFAULT_PORT)
+
+    print("Gen3 Bridge Daemon (Direct InfluxDB)")
+    print(f"Config: {CONFIG_PATH}")
+    print()
+
+    # One client and writer for every in-process driver
+    influx_writer, influx_bucket = create_influx_writer("bridge_daemon_writer")
+    share_influx_writer(influx_writer, influx_bucket)
+
+    mounts, ports = start_drivers(config, daemon_config)
+    print(f"Endpoints: http://localhost:{port}/health, /<device>/metrics, /<device>/latest, /<device>/health")
+    if daemon_config.get('standalone_ports', True):
+        for extra_port, (label, wsgi_app) in sorted(ports.items()):
+            if extra_port != port:
+                serve_port(extra_port, wsgi_app, label)
+    print()
+
+    try:
+        run_simple('0.0.0.0', port, DispatcherMiddleware(app, mounts), threaded=True)
+    finally:
+        for driver in drivers.values():
+            if isinstance(driver, DriverProcess):
+                driver.stop()
+
+
+if __name__ == "__main__":
+    main()
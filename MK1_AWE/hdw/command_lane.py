@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Priority Command Lane for Polled Bridges
+Commands posted to /command get an ID and are executed by the device
+thread ahead of the next poll - the poll loop's scheduler wait is woken
+as soon as a command arrives. Each command records its completion status,
+readback verification and end-to-end latency:
+    POST /command              -> {"id": ..., "status": "queued"}
+    POST /command?wait=<s>     -> blocks until done/failed (or timeout)
+    GET  /command/<id>         -> status of a recent command
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Defaults
+HISTORY = 256           # completed commands kept for GET /command/<id>
+MAX_WAIT = 10.0         # seconds - cap for ?wait=
+LATENCY_WINDOW = 256    # commands kept for latency percentiles
+
+
+class Command:
+    """One queued device command and its outcome"""
+
+    def __init__(self, command_id, payload):
+        self.id = command_id
+        self.payload = payload
+        self.status = "queued"      # queued -> running -> done / failed
+        self.result = None          # executor result (readback etc.)
+        self.verified = None        # True/False if readback was checked
+        self.error = None
+        self.submitted = time.perf_counter()
+        self.submitted_ns = time.time_ns()
+        self.started = None
+        self.completed = None
+        self.finished = threading.Event()
+
+    def to_dict(self):
+        def ms(start, end):
+            return round((end - start) * 1000, 1) if start is not None and end is not None else None
+
+        return {
+            'id': self.id,
+            'status': self.status,
+            'command': self.payload,
+            'verified': self.verified,
+            'result': self.result,
+            'error': self.error,
+            'submitted_ns': self.submitted_ns,
+            'queue_ms': ms(self.submitted, self.started),
+            'exec_ms': ms(self.started, self.completed),
+            'latency_ms': ms(self.submitted, self.completed)
+        }
+
+
+class CommandLane:
+    """Thread-safe FIFO of commands for one device thread"""
+
+    def __init__(self, name, history=HISTORY):
+        self.name = name
+        self.pending = threading.Event()  # set while commands are queued - wakes the poll loop
+        self._lock = threading.Lock()
+        self._queue = deque()
+        self._history = OrderedDict()
+        self._history_size = history
+        self._ids = itertools.count(1)
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+
+        # Counters
+        self.completed = 0
+        self.failed = 0
+        self.verify_failed = 0
+
+    def submit(self, payload):
+        """Queue a command; returns its Command record"""
+        with self._lock:
+            command = Command(f"{self.name}-{next(self._ids)}", payload)
+            self._queue.append(command)
+            self._history[command.id] = command
+            while len(self._history) > self._history_size:
+                self._history.popitem(last=False)
+            self.pending.set()
+        return command
+
+    def get(self, command_id):
+        with self._lock:
+            return self._history.get(command_id)
+
+    def pop(self):
+        """Next queued command or None (clears pending when empty)"""
+        with self._lock:
+            if not self._queue:
+                self.pending.clear()
+                return None
+            return self._queue.popleft()
+
+    def run_pending(self, execute):
+        """Execute every queued command in order (device thread only)
+
+        Args:
+            execute: Callable(payload) -> (result dict, verified bool or None);
+                     raises on failure
+        """
+        while True:
+            command = self.pop()
+            if command is None:
+                return
+            command.status = "running"
+            command.started = time.perf_counter()
+            try:
+                command.result, command.verified = execute(command.payload)
+                command.status = "done"
+            except Exception as e:
+                command.error = str(e)
+                command.status = "failed"
+            command.completed = time.perf_counter()
+
+            with self._lock:
+                self._latencies.append(command.completed - command.submitted)
+                if command.status == "done":
+                    self.completed += 1
+                    if command.verified is False:
+                        self.verify_failed += 1
+                else:
+                    self.failed += 1
+            command.finished.set()
+
+    def fail_pending(self, reason):
+        """Fail everything queued (device offline)"""
+        while True:
+            command = self.pop()
+            if command is None:
+                return
+            command.status = "failed"
+            command.error = reason
+            command.completed = time.perf_counter()
+            with self._lock:
+                self.failed += 1
+            command.finished.set()
+
+    def wait(self, command, timeout):
+        """Block until the command finishes; True if it did"""
+        return command.finished.wait(min(max(timeout, 0.0), MAX_WAIT))
+
+    def stats(self):
+        """Lane depth, counters and end-to-end latency for /health"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            depth = len(self._queue)
+
+        def pct_ms(pct):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000, 1)
+
+        return {
+            'queued': depth,
+            'completed': self.completed,
+            'failed': self.failed,
+            'verify_failed': self.verify_failed,
+            'latency_p50_ms': pct_ms(50),
+            'latency_p95_ms': pct_ms(95)
+        }
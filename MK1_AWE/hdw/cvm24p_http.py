@@ -1,79 +1,347 @@
 #!/usr/bin/env python3
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from pymodbus.client import ModbusTcpClient
-from struct import pack, unpack
-import threading, time, json
+"""
+CVM-24P Cell Voltage HTTP Bridge
+Reads 24 cell voltages from each CVM-24P unit through the Modbus TCP gateway
+and writes directly to InfluxDB (cell_voltages measurement, CV001-CVnnn)
+Also exposes /metrics endpoint for debugging
+
+All unit requests of a scan are in flight at once on one pipelined Modbus
+TCP connection (modbus_pipeline.py, replies matched by transaction id), and
+each scan is decoded with a single NumPy view instead of one struct.unpack
+per channel. A unit that does not answer only loses its own channels for
+that scan; the connection stays open for the others.
+"""
+
+import asyncio
+import time
+import threading
+from collections import deque
+import numpy as np
+from flask import Flask, Response, request
+from bridge_common import CONFIG_PATH, load_config, get_influx_writer
+from line_protocol import LineProtocolBuffer, tag_prefix
+from metrics_cursor import parse_cursor, etag_matches, select_samples, cursor_headers
+from modbus_pipeline import PipelinedModbusTcp
+from poll_scheduler import DeadlineScheduler
 
 # Configuration
-GATEWAY_IP = '192.168.10.15'
-PORT = 502
-UNITS = [0xA1, 0xA4, 0xA6, 0xA7, 0xA9]
-TIMEOUT = 0.5
-
-class CVM:
-    def __init__(self):
-        self.data = None
-        self.lock = threading.Lock()
-        self.client = None
-        
-    def f32_wordlittle_bytebig(self, w0, w1):
-        """Convert two Modbus registers to float32 (word-swapped big-endian)"""
-        return unpack(">f", pack(">HH", w1, w0))[0]
-    
-    def run(self):
+RECONNECT_DELAY = 1  # seconds
+UNIT_RETRY_INTERVAL = 1.0  # seconds between background probes of a unit that stopped answering
+CHANNELS_PER_UNIT = 24
+CH1_START = 192  # first voltage register (2 registers per channel)
+
+app = Flask(__name__)
+
+# Global state
+sample_buffer = None  # Will be initialized as deque
+device_online = False
+data_lock = threading.Lock()
+sample_seq = 0  # Sequence number of newest buffered sample (cursor for /metrics?since=)
+scheduler = None  # DeadlineScheduler pacing the scan loop
+units = []  # Modbus unit ids, in channel order
+field_names = ()  # CV001 ... one per channel
+unit_errors = {}  # unit id -> failed reads
+unit_retry_at = {}  # unit id -> next probe time (monotonic) while the unit is not answering
+gateway = None  # PipelinedModbusTcp of the current connection
+influx_writer = None
+influx_bucket = None
+line_buffer = LineProtocolBuffer()
+CVM_PREFIX = tag_prefix("cell_voltages", {'hardware': "cvm24p", 'location': "gen3_test_rig"})
+
+# Config values loaded at startup
+SAMPLE_RATE = 20
+BUFFER_SECONDS = 2
+
+
+def setup_influxdb():
+    """Setup InfluxDB writer for direct writes (shared writer when run by bridge_daemon.py)"""
+    global influx_writer, influx_bucket
+
+    influx_writer, influx_bucket = get_influx_writer("cvm24p_writer")
+    return influx_writer is not None
+
+
+def decode_voltages(registers):
+    """Decode float32 channels from Modbus registers in one pass
+
+    The CVM-24P sends each float as two registers, low word first with
+    big-endian bytes inside each word. Laying the registers out as
+    little-endian uint16 and viewing the buffer as little-endian float32
+    puts the words in the right order without copying.
+
+    Args:
+        registers: Register values (2 per channel)
+
+    Returns:
+        float32 array, one value per channel
+    """
+    return np.asarray(registers, dtype='<u2').view('<f4')
+
+
+def sample_fields(voltages):
+    """Field dict for one scan (channels of failed units are skipped)"""
+    return {name: value for name, value in zip(field_names, voltages.tolist()) if value == value}
+
+
+def write_to_influxdb(samples):
+    """Write batch of samples directly to InfluxDB"""
+    if not influx_writer:
+        return False
+
+    try:
+        line_buffer.clear()
+        for sample in samples:
+            line_buffer.add_point(CVM_PREFIX, sample_fields(sample['voltages']), sample['timestamp_ns'])
+
+        if line_buffer.points:
+            influx_writer.submit(line_buffer.getvalue(), line_buffer.points)
+        return True
+    except Exception as e:
+        print(f"[ERROR] InfluxDB write failed: {e}")
+        return False
+
+
+async def read_unit(client, unit):
+    """Read all channels of one unit (single attempt); returns registers or None"""
+    try:
+        return await client.read_holding_registers(unit, CH1_START, CHANNELS_PER_UNIT * 2)
+    except Exception:
+        unit_errors[unit] += 1
+        return None
+
+
+async def probe_unit(client, unit):
+    """Background read of a failed unit; it rejoins the scan once it answers"""
+    if await read_unit(client, unit) is None:
+        unit_retry_at[unit] = time.monotonic() + UNIT_RETRY_INTERVAL
+    else:
+        unit_retry_at.pop(unit, None)
+        print(f"[OK] CVM unit 0x{unit:02X} answering again")
+
+
+async def scan_unit(client, unit):
+    """Scan read of one answering unit; a failure moves it to background probing"""
+    result = await read_unit(client, unit)
+    if result is None:
+        unit_retry_at[unit] = time.monotonic() + UNIT_RETRY_INTERVAL
+        print(f"[WARN] CVM unit 0x{unit:02X} not answering - probing every {UNIT_RETRY_INTERVAL}s")
+    return result
+
+
+async def scan_loop(gateway_ip, port, timeout, pending_samples, write_batch_size):
+    """Connect and scan all units until the connection fails"""
+    global sample_seq, device_online, gateway
+
+    client = gateway = PipelinedModbusTcp(gateway_ip, port=port, timeout=timeout,
+                                          max_in_flight=max(len(units), 1))
+    try:
+        try:
+            await client.connect()
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ConnectionError(f"Cannot connect to CVM gateway {gateway_ip}:{port}: {e}")
+        print(f"[OK] Connected to CVM gateway at {gateway_ip}:{port}")
+
+        # Registers of failed units stay NaN so channel numbering never shifts
+        registers = np.zeros(len(units) * CHANNELS_PER_UNIT * 2, dtype='<u2')
+        nan_words = np.full(CHANNELS_PER_UNIT, np.nan, dtype='<f4').view('<u2')
+        unit_words = CHANNELS_PER_UNIT * 2
+
+        # A unit that stops answering would hold every scan for the full
+        # timeout; it is dropped from the scan (channels NaN) and probed in the
+        # background until it answers again
+        unit_retry_at.clear()
+        probes = {}
+
+        scheduler.reset()
         while True:
-            try:
-                self.client = ModbusTcpClient(GATEWAY_IP, port=PORT, timeout=TIMEOUT)
-                if self.client.connect():
-                    print(f"Connected to CVM at {GATEWAY_IP}:{PORT}")
-                    
-                    while True:
-                        readings = {}
-                        channel = 1
-                        
-                        for unit in UNITS:
-                            # Read all 24 channels for this unit (48 registers)
-                            result = self.client.read_holding_registers(192, count=48, device_id=unit)  # device_id like in test script
-                            
-                            if hasattr(result, 'registers') and len(result.registers) == 48:
-                                # Process 24 channels
-                                for ch in range(24):
-                                    reg_idx = ch * 2
-                                    voltage = self.f32_wordlittle_bytebig(
-                                        result.registers[reg_idx], 
-                                        result.registers[reg_idx + 1]
-                                    )
-                                    readings[f"CV{channel:03d}"] = voltage
-                                    channel += 1
-                        
-                        # Format for InfluxDB
-                        if readings:
-                            fields = ','.join(f'{k}={v}' for k, v in readings.items())
-                            with self.lock:
-                                self.data = f"cell_voltages {fields} {int(time.time()*1e9)}"
-                        
-                        time.sleep(0.1)  # 10Hz update rate
-                        
-            except Exception as e:
-                print(f"Error: {e}")
-                if self.client:
-                    self.client.close()
-                time.sleep(1)
-
-class Handler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/metrics':
-            with cvm.lock:
-                data = cvm.data
-            if data:
-                self.send_response(200)
-                self.end_headers()
-                self.wfile.write(data.encode())
-            else:
-                self.send_error(503)
-                
-    def log_message(self, *args): pass
-
-cvm = CVM()
-threading.Thread(target=cvm.run, daemon=True).start()
-HTTPServer(('0.0.0.0', 8890), Handler).serve_forever()
\ No newline at end of file
+            await asyncio.to_thread(scheduler.wait)
+            now = time.monotonic()
+            for unit, retry_at in list(unit_retry_at.items()):
+                if now >= retry_at and (unit not in probes or probes[unit].done()):
+                    probes[unit] = asyncio.create_task(probe_unit(client, unit))
+
+            scan_units = [unit for unit in units if unit not in unit_retry_at]
+            scheduler.begin_io()
+            scanned = await asyncio.gather(*(scan_unit(client, unit) for unit in scan_units))
+            timestamp_ns = scheduler.end_io()
+            by_unit = dict(zip(scan_units, scanned))
+            results = [by_unit.get(unit) for unit in units]
+
+            if all(result is None for result in results):
+                if not client.connected:
+                    raise ConnectionError("CVM gateway connection lost")
+                device_online = False
+                continue
+
+            for i, result in enumerate(results):
+                registers[i * unit_words:(i + 1) * unit_words] = nan_words if result is None else result
+            device_online = True
+
+            sample = {
+                'timestamp_ns': timestamp_ns,
+                'voltages': decode_voltages(registers).copy()
+            }
+
+            # Add to pending samples for InfluxDB write
+            pending_samples.append(sample)
+
+            # Add to buffer for /metrics endpoint
+            with data_lock:
+                sample_seq += 1
+                sample['seq'] = sample_seq
+                sample_buffer.append(sample)
+
+            # Write to InfluxDB when we have enough samples
+            if len(pending_samples) >= write_batch_size:
+                write_to_influxdb(pending_samples)
+                pending_samples.clear()
+    finally:
+        client.close()
+
+
+def read_cell_voltages():
+    """Continuously scan CVM-24P units and write to InfluxDB"""
+    global sample_buffer, device_online, scheduler, units, field_names, SAMPLE_RATE, BUFFER_SECONDS
+
+    config = load_config()
+    cvm_config = config['devices']['CVM24P']
+
+    # Load bridge config
+    bridge_config = config.get('bridges', {}).get('cvm24p', {})
+    SAMPLE_RATE = bridge_config.get('sample_rate', 20)
+    BUFFER_SECONDS = bridge_config.get('buffer_seconds', 2)
+
+    units = list(cvm_config['units'])
+    field_names = tuple(f"CV{i:03d}" for i in range(1, len(units) * CHANNELS_PER_UNIT + 1))
+    for unit in units:
+        unit_errors[unit] = 0
+
+    # Initialize ring buffer with max size
+    max_samples = SAMPLE_RATE * BUFFER_SECONDS
+    sample_buffer = deque(maxlen=max_samples)
+    scheduler = DeadlineScheduler(SAMPLE_RATE)
+
+    # Write batch size (write to InfluxDB every N samples)
+    write_batch_size = SAMPLE_RATE  # Write every ~1 second
+    pending_samples = []
+
+    print(f"Units: {', '.join(f'0x{unit:02X}' for unit in units)} ({len(field_names)} channels)")
+    print(f"Sample rate: {SAMPLE_RATE} Hz")
+    print(f"Buffer size: {max_samples} samples ({BUFFER_SECONDS}s)")
+
+    while True:
+        try:
+            asyncio.run(scan_loop(cvm_config['ip'], cvm_config.get('port', 502),
+                                  cvm_config.get('timeout', 0.5), pending_samples, write_batch_size))
+        except Exception as e:
+            device_online = False
+            print(f"[ERROR] CVM offline: {e}")
+            print(f"  Retrying in {RECONNECT_DELAY}s...")
+            time.sleep(RECONNECT_DELAY)
+
+
+def format_metrics(samples):
+    """Format samples as InfluxDB line protocol - one line per scan"""
+    lines = []
+    for sample in samples:
+        fields = ','.join(f"{name}={value:.4f}" for name, value in sample_fields(sample['voltages']).items())
+        if fields:
+            lines.append(f"cell_voltages {fields} {sample['timestamp_ns']}")
+    return lines
+
+
+def cursor_response(since_seq=None, since_ns=None, latest_only=False):
+    """Build /metrics or /latest response from the sample buffer"""
+    if not device_online:
+        return Response("# Device offline\n", status=503, mimetype='text/plain')
+
+    with data_lock:
+        if sample_buffer is None or len(sample_buffer) == 0:
+            return Response("# No data yet\n", status=503, mimetype='text/plain')
+
+        headers = cursor_headers(sample_buffer[-1]['seq'])
+        if etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+            return Response(status=304, headers=headers)
+
+        samples = [sample_buffer[-1]] if latest_only else list(sample_buffer)
+
+    lines = format_metrics(select_samples(samples, since_seq, since_ns))
+    output = '\n'.join(lines) + '\n' if lines else ''
+    return Response(output, mimetype='text/plain', headers=headers)
+
+
+@app.route('/metrics')
+def metrics():
+    """Return buffered metrics in InfluxDB line protocol format (?since=<seq> / ?since_ns=<ns> for new samples only)"""
+    try:
+        since_seq, since_ns = parse_cursor(request.args)
+    except ValueError:
+        return Response("# since/since_ns must be integers\n", status=400, mimetype='text/plain')
+
+    return cursor_response(since_seq, since_ns)
+
+
+@app.route('/latest')
+def latest():
+    """Return only the most recent scan in InfluxDB line protocol format"""
+    return cursor_response(latest_only=True)
+
+
+@app.route('/health')
+def health():
+    """Health check endpoint with buffer and scan stats"""
+    status = "online" if device_online else "offline"
+
+    with data_lock:
+        buffer_size = len(sample_buffer) if sample_buffer else 0
+        buffer_max = sample_buffer.maxlen if sample_buffer else 0
+
+    response = {
+        'status': status,
+        'device_online': device_online,
+        'sample_rate': SAMPLE_RATE,
+        'channels': len(field_names),
+        'unit_errors': {f"0x{unit:02X}": count for unit, count in unit_errors.items()},
+        'units_not_answering': [f"0x{unit:02X}" for unit in unit_retry_at],
+        'gateway': gateway.stats() if gateway else None,
+        'buffer_seconds': BUFFER_SECONDS,
+        'buffer_size': buffer_size,
+        'buffer_max': buffer_max,
+        'buffer_pct': round(100 * buffer_size / buffer_max, 1) if buffer_max > 0 else 0,
+        'scheduler': scheduler.stats() if scheduler else None,
+        'influxdb_enabled': influx_writer is not None,
+        'points_written': influx_writer.points_written if influx_writer else 0,
+        'influxdb_writer': influx_writer.stats() if influx_writer else None
+    }
+
+    import json
+    return Response(json.dumps(response, indent=2), mimetype='application/json')
+
+
+def main():
+    """Main entry point"""
+    config = load_config()
+    bridge_config = config.get('bridges', {}).get('cvm24p', {})
+    port = bridge_config.get('port', 8884)
+    sample_rate = bridge_config.get('sample_rate', 20)
+    hw_max = bridge_config.get('hw_max_rate', 50)
+
+    print("CVM-24P Cell Voltage HTTP Bridge (Direct InfluxDB)")
+    print(f"Config: {CONFIG_PATH}")
+    print(f"Configured rate: {sample_rate} Hz (hardware max: {hw_max} Hz)")
+    print(f"Endpoints: http://localhost:{port}/metrics, /latest, /health")
+    print()
+
+    # Setup InfluxDB direct writes
+    setup_influxdb()
+
+    # Start reader thread
+    reader_thread = threading.Thread(target=read_cell_voltages, daemon=True)
+    reader_thread.start()
+
+    # Start HTTP server
+    app.run(host='0.0.0.0', port=port, debug=False)
+
+
+if __name__ == "__main__":
+    main()
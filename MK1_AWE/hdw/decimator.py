@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Anti-Alias Decimation for Bridge Output Rates
+Low-pass FIR + keep every Nth sample, for channels stored at a lower rate
+than they are acquired. The filter is only evaluated at the kept output
+positions (polyphase-equivalent cost), for all channels of a group in one
+matrix product, with filter history carried across reads.
+
+Filter design (Kaiser-windowed sinc, numpy only):
+    passband edge  = PASSBAND x output Nyquist
+    stopband edge  = output rate - passband edge (aliases land outside the passband)
+    attenuation    = ATTENUATION_DB in the stopband
+Output samples sit on the output-rate grid of the input sample index and
+are stamped with the timestamp of the input sample at the filter centre,
+so the filter delay never shifts the data in time.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Defaults
+ATTENUATION_DB = 60.0  # stopband attenuation
+PASSBAND = 0.8         # fraction of output Nyquist passed flat
+
+
+def design_lowpass(factor, attenuation_db=ATTENUATION_DB, passband=PASSBAND):
+    """Kaiser-windowed sinc low-pass for decimation by `factor`
+
+    Args:
+        factor: Decimation factor (input rate / output rate)
+        attenuation_db: Stopband attenuation (dB)
+        passband: Passband edge as a fraction of the output Nyquist frequency
+
+    Returns:
+        float64 taps (odd length, unity DC gain)
+    """
+    # Frequencies in cycles per input sample
+    pass_edge = passband * 0.5 / factor
+    stop_edge = 1.0 / factor - pass_edge
+    transition = stop_edge - pass_edge
+    cutoff = (pass_edge + stop_edge) / 2
+
+    # Kaiser length / beta estimates
+    n_taps = int(np.ceil((attenuation_db - 8) / (2.285 * 2 * np.pi * transition))) + 1
+    n_taps += 1 - n_taps % 2  # odd -> integer group delay
+    if attenuation_db > 50:
+        beta = 0.1102 * (attenuation_db - 8.7)
+    elif attenuation_db >= 21:
+        beta = 0.5842 * (attenuation_db - 21) ** 0.4 + 0.07886 * (attenuation_db - 21)
+    else:
+        beta = 0.0
+
+    n = np.arange(n_taps) - (n_taps - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(n_taps, beta)
+    return taps / taps.sum()
+
+
+class Decimator:
+    """Streaming FIR decimator for a group of channels sharing one factor"""
+
+    def __init__(self, factor, n_channels, attenuation_db=ATTENUATION_DB, passband=PASSBAND):
+        self.factor = int(factor)
+        self.n_channels = n_channels
+        self.taps = design_lowpass(self.factor, attenuation_db, passband)
+        self.delay = (len(self.taps) - 1) // 2  # input samples between filter start and centre
+        self._kernel = self.taps[::-1].copy()
+        self.reset()
+
+    def reset(self):
+        """Drop filter history (call when the acquisition restarts)"""
+        self._values = np.zeros((self.n_channels, 0), dtype=np.float64)
+        self._timestamps = np.zeros(0, dtype=np.int64)
+        self._first_index = 0  # absolute input index of the oldest buffered sample
+
+    def process(self, timestamps_ns, block):
+        """Filter one read and return the decimated samples it completes
+
+        Args:
+            timestamps_ns: int64 timestamps of the read, shape [n]
+            block: [channel][sample] float array, shape [n_channels, n]
+
+        Returns:
+            (timestamps_ns, [channel][sample] values) - possibly empty
+        """
+        values = np.concatenate((self._values, block), axis=1)
+        timestamps = np.concatenate((self._timestamps, timestamps_ns))
+        n_taps = len(self.taps)
+
+        # Window w covers buffered samples w .. w + n_taps - 1, centred on
+        # absolute index first_index + w + delay; keep centres on the output grid
+        n_windows = values.shape[1] - n_taps + 1
+        if n_windows > 0:
+            first_window = -(self._first_index + self.delay) % self.factor
+            starts = np.arange(first_window, n_windows, self.factor)
+        else:
+            starts = np.arange(0)
+
+        if len(starts):
+            windows = sliding_window_view(values, n_taps, axis=1)[:, starts]
+            out_values = windows @ self._kernel
+            out_timestamps = timestamps[starts + self.delay]
+            consumed = starts[-1] + self.factor  # next window start still needed
+        else:
+            out_values = np.zeros((self.n_channels, 0), dtype=np.float64)
+            out_timestamps = np.zeros(0, dtype=np.int64)
+            consumed = 0
+
+        # Keep only what future windows need
+        consumed = min(consumed, max(values.shape[1] - n_taps + 1, 0))
+        self._values = values[:, consumed:]
+        self._timestamps = timestamps[consumed:]
+        self._first_index += consumed
+        return out_timestamps, out_values
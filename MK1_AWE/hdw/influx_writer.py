@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Non-blocking InfluxDB Writer
+Dedicated writer thread per bridge fed by a bounded queue, so InfluxDB
+stalls never delay the acquisition loop. Batches that cannot be written
+because InfluxDB is down or overloaded (connection errors, 5xx, 429) go to
+a disk spool (spool.py) and are replayed once InfluxDB recovers. Batches
+InfluxDB rejects outright (other 4xx: bad line, field type conflict) are
+never retried or spooled - they are quarantined and counted.
+"""
+
+import queue
+import random
+import threading
+import time
+from collections import deque
+from influxdb_client import WritePrecision
+from influxdb_client.rest import ApiException
+from spool import WriteSpool, read_segment
+
+# Defaults (override in devices.yaml system.influxdb_writer)
+DEFAULT_QUEUE_SIZE = 64         # batches - bridges submit ~1 batch per second
+DEFAULT_BATCH_POINTS = 20000    # flush once this many points are queued
+DEFAULT_FLUSH_INTERVAL = 1.0    # seconds - max wait before flushing a partial batch
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_DELAY = 0.5       # seconds - base delay, doubled per attempt with jitter
+LATENCY_WINDOW = 256            # writes kept for latency percentiles
+DEFAULT_REPLAY_INTERVAL = 5.0   # seconds between spool replay attempts
+DEFAULT_REPLAY_BATCH_BYTES = 4 * 1024 * 1024  # max request size while replaying
+
+# _write() outcomes
+WRITE_OK = "ok"
+WRITE_FAILED = "failed"       # transient - spool and replay later
+WRITE_REJECTED = "rejected"   # permanent - retrying or replaying cannot help
+
+
+def is_rejection(error):
+    """True if InfluxDB refused the request itself (4xx other than 429 Too Many Requests)"""
+    status = getattr(error, 'status', None) if isinstance(error, ApiException) else None
+    return status is not None and 400 <= status < 500 and status != 429
+
+
+class InfluxWriter:
+    """Background writer for line protocol payloads"""
+
+    def __init__(self, write_api, bucket, writer_config=None, name="influx_writer", spool_config=None):
+        writer_config = writer_config or {}
+        spool_config = spool_config or {}
+        self.write_api = write_api
+        self.bucket = bucket
+        self.name = name
+        self.batch_points = writer_config.get('batch_points', DEFAULT_BATCH_POINTS)
+        self.flush_interval = writer_config.get('flush_interval', DEFAULT_FLUSH_INTERVAL)
+        self.max_retries = writer_config.get('max_retries', DEFAULT_MAX_RETRIES)
+        self.retry_delay = writer_config.get('retry_delay', DEFAULT_RETRY_DELAY)
+        self.queue_size = writer_config.get('queue_size', DEFAULT_QUEUE_SIZE)
+
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._thread = None
+        self._replay_thread = None
+
+        # Disk spool for batches InfluxDB did not accept
+        self.spool = WriteSpool(name, spool_config) if spool_config.get('enabled', True) else None
+        self.replay_interval = spool_config.get('replay_interval', DEFAULT_REPLAY_INTERVAL)
+        self.replay_batch_bytes = spool_config.get('replay_batch_bytes', DEFAULT_REPLAY_BATCH_BYTES)
+        self.sink_down = False  # True while InfluxDB is failing - new batches go straight to spool
+
+        # Counters
+        self.points_written = 0
+        self.batches_written = 0
+        self.dropped_batches = 0
+        self.dropped_points = 0
+        self.failed_batches = 0
+        self.rejected_batches = 0
+        self.rejected_points = 0
+        self.retries = 0
+        self.last_error = None
+        self.replayed_points = 0
+        self.replayed_bytes = 0
+        self.replay_points_per_s = None
+
+    def start(self):
+        """Start the writer thread"""
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        if self.spool:
+            self._replay_thread = threading.Thread(target=self._replay_loop,
+                                                   name=f"{self.name}_replay", daemon=True)
+            self._replay_thread.start()
+        return self
+
+    def submit(self, payload, points):
+        """Queue a line protocol payload without blocking
+
+        Args:
+            payload: Line protocol bytes
+            points: Number of points in payload
+
+        Returns:
+            True if queued, False if dropped because the queue is full
+        """
+        if not payload:
+            return True
+        try:
+            self._queue.put_nowait((payload, points))
+            return True
+        except queue.Full:
+            # Dropped rather than spooled here: spool appends can fsync, and
+            # this runs on the acquisition thread
+            with self._stats_lock:
+                self.dropped_batches += 1
+                self.dropped_points += points
+            return False
+
+    def _run(self):
+        """Writer loop: coalesce queued payloads into batches and write"""
+        while True:
+            payload, points = self._queue.get()
+            batch = [payload]
+            batch_points = points
+
+            # Coalesce more payloads until batch is full or flush interval expires
+            deadline = time.monotonic() + self.flush_interval
+            while batch_points < self.batch_points:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    payload, points = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(payload)
+                batch_points += points
+
+            payload = b''.join(batch)
+            if self.sink_down:
+                # Keep ordering: nothing goes live until the spool has drained
+                self.spool.append(payload, batch_points)
+            elif self._write(payload, batch_points) == WRITE_FAILED and self.spool:
+                self.spool.append(payload, batch_points)
+                self.sink_down = True
+                print(f"[WARN] InfluxDB unreachable - spooling to {self.spool.path}")
+
+    def _write(self, payload, points):
+        """Write one batch with retry and jittered exponential backoff
+
+        Returns:
+            WRITE_OK, WRITE_FAILED (transient, retries exhausted) or
+            WRITE_REJECTED (InfluxDB refused the batch, not retried)
+        """
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                self.write_api.write(bucket=self.bucket, record=payload,
+                                     write_precision=WritePrecision.NS)
+                elapsed = time.perf_counter() - start
+                with self._stats_lock:
+                    self._latencies.append(elapsed)
+                    self.points_written += points
+                    self.batches_written += 1
+                return WRITE_OK
+            except Exception as e:
+                self.last_error = str(e)
+                if is_rejection(e):
+                    self._reject(payload, points, e)
+                    return WRITE_REJECTED
+                if attempt < self.max_retries:
+                    with self._stats_lock:
+                        self.retries += 1
+                    delay = self.retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    time.sleep(delay)
+
+        with self._stats_lock:
+            self.failed_batches += 1
+        print(f"[ERROR] InfluxDB write failed after {self.max_retries + 1} attempts "
+              f"({points} points): {self.last_error}")
+        return WRITE_FAILED
+
+    def _reject(self, payload, points, error):
+        """Count a batch InfluxDB refused and quarantine it (never spooled or retried)"""
+        kept = self.spool.quarantine(payload, f"HTTP {error.status}: {error.body or error.reason}") \
+            if self.spool else False
+        with self._stats_lock:
+            self.rejected_batches += 1
+            self.rejected_points += points
+        print(f"[ERROR] InfluxDB rejected batch ({points} points, HTTP {error.status}) - "
+              f"{'quarantined to ' + str(self.spool.rejected_path) if kept else 'dropped'}")
+
+    def _replay_loop(self):
+        """Drain spool segments oldest-first whenever InfluxDB accepts writes"""
+        while True:
+            time.sleep(self.replay_interval)
+            if self.spool.is_empty():
+                continue
+
+            if self._drain_spool() and self.sink_down:
+                # The writer keeps spooling while sink_down is set, so only
+                # clear it if no segment arrived since the last seal()
+                if self.spool.run_if_empty(self._clear_sink_down):
+                    print(f"[OK] InfluxDB recovered - spool drained ({self.replayed_points} points replayed)")
+
+    def _drain_spool(self):
+        """Replay sealed segments until none remain; False if InfluxDB failed again"""
+        while True:
+            segments = self.spool.seal()
+            if not segments:
+                return True
+            for segment in segments:
+                if not self._replay_segment(segment):
+                    return False
+
+    def _clear_sink_down(self):
+        self.sink_down = False
+
+    def _replay_segment(self, segment):
+        """Replay one segment; single attempt per chunk (re-sent points overwrite)
+
+        A chunk InfluxDB rejects is quarantined and skipped, so it cannot hold
+        the rest of the spool (and sink_down) hostage.
+        """
+        start = time.perf_counter()
+        segment_points = 0
+        segment_bytes = 0
+        try:
+            for payload, points in read_segment(segment, self.replay_batch_bytes):
+                try:
+                    self.write_api.write(bucket=self.bucket, record=payload,
+                                         write_precision=WritePrecision.NS)
+                except ApiException as e:
+                    if not is_rejection(e):
+                        raise
+                    self.last_error = str(e)
+                    self._reject(payload, points, e)
+                    continue
+                segment_points += points
+                segment_bytes += len(payload)
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+        self.spool.remove(segment)
+        elapsed = time.perf_counter() - start
+        with self._stats_lock:
+            self.replayed_points += segment_points
+            self.replayed_bytes += segment_bytes
+            if elapsed > 0:
+                self.replay_points_per_s = round(segment_points / elapsed)
+        return True
+
+    def stats(self):
+        """Writer back-pressure and latency stats for /health"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                'queue_depth': self._queue.qsize(),
+                'queue_max': self.queue_size,
+                'points_written': self.points_written,
+                'batches_written': self.batches_written,
+                'dropped_batches': self.dropped_batches,
+                'dropped_points': self.dropped_points,
+                'failed_batches': self.failed_batches,
+                'rejected_batches': self.rejected_batches,
+                'rejected_points': self.rejected_points,
+                'retries': self.retries,
+                'last_error': self.last_error,
+                'sink_down': self.sink_down
+            }
+            if self.spool:
+                stats['spool'] = self.spool.stats()
+                stats['spool'].update({
+                    'replayed_points': self.replayed_points,
+                    'replayed_bytes': self.replayed_bytes,
+                    'replay_points_per_s': self.replay_points_per_s
+                })
+
+        for label, pct in (('p50', 50), ('p95', 95), ('p99', 99)):
+            if latencies:
+                idx = min(len(latencies) - 1, int(len(latencies) * pct / 100))
+                stats[f'write_latency_{label}_ms'] = round(latencies[idx] * 1000, 1)
+            else:
+                stats[f'write_latency_{label}_ms'] = None
+        return stats
@@ -1,109 +1,417 @@
 #!/usr/bin/env python3
-"""HTTP server for LabJack AIN0 (PSU control voltage feedback) on port 8891"""
+"""
+LabJack T7 Analog Input HTTP Bridge
+Reads AIN channels (AIN0 = PSU control voltage feedback) and writes directly
+to InfluxDB (labjack measurement, AIN0_voltage, ...)
+Also exposes /metrics endpoint for debugging
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from pymodbus.client import ModbusTcpClient
-import struct
-import threading
+Two acquisition modes (devices.yaml bridges.labjack.mode):
+    - stream: T7 hardware-timed stream (LJM library), hundreds of Hz to kHz.
+      Timestamps come from the scan index at the device scan clock.
+    - modbus: one multi-register Modbus TCP read of every channel per poll on
+      a persistent connection. Used automatically if LJM is not installed.
+"""
+
+import inspect
 import time
+import threading
+import numpy as np
+from flask import Flask, Response, request
+from pymodbus.client import ModbusTcpClient
+from bridge_common import CONFIG_PATH, load_config, get_influx_writer
+from line_protocol import LineProtocolBuffer, tag_prefix
+from metrics_cursor import parse_cursor, etag_matches, cursor_headers
+from poll_scheduler import DeadlineScheduler
+from rollups import Rollups, DEFAULT_RESOLUTIONS
+from sample_clock import SampleClock
+from sample_ring import SampleRing
+
+try:
+    from labjack import ljm
+except ImportError:
+    ljm = None  # LJM library not installed - Modbus polling only
+
+# Configuration
+RECONNECT_DELAY = 5  # seconds
+DEFAULT_PORT = 8891
+AIN_RANGE_REGISTER = 40000  # AIN0_RANGE (float32, 2 registers per channel)
+STREAM_DUMMY_VALUE = -9999.0  # LJM placeholder for scans skipped by the device
+
+# pymodbus renamed slave= to device_id= in 3.9
+UNIT_KWARG = ('device_id' if 'device_id' in
+              inspect.signature(ModbusTcpClient.read_input_registers).parameters else 'slave')
+
+app = Flask(__name__)
+
+# Global state
+sample_ring = None  # SampleRing: [scan][voltage per channel]
+channel_names = ()  # AIN0, AIN1, ...
+field_names = ()  # AIN0_voltage, ...
+sample_clock = None  # Stream scan index -> wall-clock timestamps
+scheduler = None  # DeadlineScheduler pacing Modbus polls
+acquisition_mode = None
+rollups = None  # Rollups of every channel (labjack_100ms, _1s, _1m)
+device_online = False
+influx_writer = None
+influx_bucket = None
+line_buffer = LineProtocolBuffer()
+LABJACK_PREFIX = tag_prefix("labjack", {'device': "LabJack_T7", 'location': "gen3_test_rig"})
+
+# Stream counters
+stream_stats = {
+    'scans': 0,
+    'skipped_scans': 0,
+    'device_backlog': 0,
+    'ljm_backlog': 0,
+    'max_device_backlog': 0
+}
+
+# Config values loaded at startup
+SAMPLE_RATE = 1000
+BUFFER_SECONDS = 2
+
+
+def setup_influxdb():
+    """Setup InfluxDB writer for direct writes (shared writer when run by bridge_daemon.py)"""
+    global influx_writer, influx_bucket
+
+    influx_writer, influx_bucket = get_influx_writer("labjack_writer")
+    return influx_writer is not None
+
+
+def channel_index(name):
+    """AIN channel number from its name ('AIN3' -> 3)"""
+    if not name.upper().startswith('AIN'):
+        raise ValueError(f"Not an AIN channel: {name}")
+    return int(name[3:])
+
+
+def decode_ain(registers, indices, first):
+    """Decode float32 AIN values (big-endian words) from one register block
+
+    Args:
+        registers: Registers starting at AIN<first> (2 per channel)
+        indices: AIN numbers to return, in channel order
+        first: AIN number of the first register pair
+
+    Returns:
+        float64 array, one voltage per channel
+    """
+    values = np.asarray(registers, dtype='>u2').view('>f4')
+    return values[[index - first for index in indices]].astype(np.float64)
+
+
+def write_to_influxdb(chunks):
+    """Write batch of (timestamps, [scan][channel] voltages) chunks directly to InfluxDB"""
+    if not influx_writer:
+        return False
+
+    try:
+        line_buffer.clear()
+        for timestamps_ns, voltages in chunks:
+            line_buffer.add_columns(
+                (LABJACK_PREFIX,),
+                field_names,
+                [voltages[:, i][np.newaxis] for i in range(len(field_names))],
+                timestamps_ns
+            )
+
+        # Include any rollup buckets closed since the last write
+        data, points = line_buffer.getvalue(), line_buffer.points
+        if rollups:
+            rollup_data, rollup_points = rollups.take()
+            data, points = data + rollup_data, points + rollup_points
+
+        if points:
+            influx_writer.submit(data, points)
+        return True
+    except Exception as e:
+        print(f"[ERROR] InfluxDB write failed: {e}")
+        return False
+
+
+class ChunkWriter:
+    """Buffers acquired chunks for /metrics and batched InfluxDB writes"""
+
+    def __init__(self, write_batch_size):
+        self.write_batch_size = write_batch_size
+        self.pending_chunks = []
+        self.pending_count = 0
+
+    def add(self, timestamps_ns, voltages, valid=None):
+        """Add one chunk; rows where valid is False go to the ring as NaN but are not written"""
+        # Ring for /metrics endpoint (lock-free single writer)
+        sample_ring.append(timestamps_ns, voltages)
+
+        if valid is not None and not valid.all():
+            timestamps_ns, voltages = timestamps_ns[valid], voltages[valid]
+        if len(timestamps_ns):
+            self.pending_chunks.append((timestamps_ns, voltages))
+            self.pending_count += len(timestamps_ns)
+            if rollups:
+                rollups.add(timestamps_ns, np.split(voltages.T, voltages.shape[1]))
+
+        # Write to InfluxDB when we have enough samples
+        if self.pending_count >= self.write_batch_size:
+            write_to_influxdb(self.pending_chunks)
+            self.pending_chunks = []
+            self.pending_count = 0
+
+
+def stream_acquire(device_config, bridge_config, writer):
+    """Hardware-timed stream until the device or LJM reports an error"""
+    global sample_clock, device_online
+
+    n_channels = len(channel_names)
+    reads_per_second = bridge_config.get('reads_per_second', 10)
+    scans_per_read = max(1, int(SAMPLE_RATE // reads_per_second))
+
+    handle = ljm.openS("T7", "ETHERNET", device_config['ip'])
+    try:
+        # Stream config: internal clock, no trigger, single-ended inputs
+        names = ["STREAM_TRIGGER_INDEX", "STREAM_CLOCK_SOURCE", "STREAM_SETTLING_US",
+                 "STREAM_RESOLUTION_INDEX"]
+        values = [0, 0, bridge_config.get('settling_us', 0), bridge_config.get('resolution_index', 0)]
+        for name in channel_names:
+            names.append(f"{name}_NEGATIVE_CH")
+            values.append(199)  # GND
+            if bridge_config.get('ain_range') is not None:
+                names.append(f"{name}_RANGE")
+                values.append(bridge_config['ain_range'])
+        ljm.eWriteNames(handle, len(names), names, values)
+
+        scan_list = ljm.namesToAddresses(n_channels, list(channel_names))[0]
+        scan_rate = ljm.eStreamStart(handle, scans_per_read, n_channels, scan_list, SAMPLE_RATE)
+        print(f"[OK] Streaming from LabJack T7 at {device_config['ip']}")
+        print(f"  Scan clock: {scan_rate} Hz, {scans_per_read} scans per read")
+
+        # Timestamps come from the scan index at the actual (coerced) scan rate
+        sample_clock = SampleClock(scan_rate,
+                                   correction_interval=bridge_config.get('drift_correction_interval', 10.0))
+        scans_read = 0
+        device_online = True
+
+        try:
+            while True:
+                data, device_backlog, ljm_backlog = ljm.eStreamRead(handle)
 
-# LabJack Configuration
-HOST = "192.168.10.21"
-PORT = 502
+                # Anchor/drift-check against host clock, then stamp by scan index
+                sample_clock.observe(scans_read + scans_per_read + device_backlog + ljm_backlog)
+                timestamps_ns = sample_clock.timestamps(scans_read, scans_per_read)
+                scans_read += scans_per_read
 
-# Global variables
-latest_voltage = None
-data_lock = threading.Lock()
+                voltages = np.asarray(data, dtype=np.float64).reshape(scans_per_read, n_channels)
+                skipped = (voltages == STREAM_DUMMY_VALUE).any(axis=1)
+                voltages[voltages == STREAM_DUMMY_VALUE] = np.nan
 
+                stream_stats['scans'] = scans_read
+                stream_stats['skipped_scans'] += int(skipped.sum())
+                stream_stats['device_backlog'] = device_backlog
+                stream_stats['ljm_backlog'] = ljm_backlog
+                stream_stats['max_device_backlog'] = max(stream_stats['max_device_backlog'], device_backlog)
 
-def read_ain0():
-    """Read AIN0 as FLOAT32 from LabJack"""
-    client = None
+                writer.add(timestamps_ns, voltages, ~skipped)
+        finally:
+            ljm.eStreamStop(handle)
+    finally:
+        ljm.close(handle)
+
+
+def modbus_acquire(device_config, bridge_config, writer):
+    """Poll every channel with one Modbus read per scan until the connection fails"""
+    global device_online
+
+    ip = device_config['ip']
+    port = device_config.get('port', 502)
+    unit = device_config.get('unit', 1)
+    indices = [channel_index(name) for name in channel_names]
+    first = min(indices)
+    count = 2 * (max(indices) - first + 1)
+
+    client = ModbusTcpClient(ip, port=port, timeout=device_config.get('timeout', 1.0))
     try:
-        client = ModbusTcpClient(HOST, port=PORT, timeout=1)
         if not client.connect():
-            return None
-        
-        # Read input registers 0 and 1 (AIN0 as FLOAT32)
-        result = client.read_input_registers(address=0, count=2)
-        
-        if hasattr(result, 'registers') and len(result.registers) >= 2:
-            # Convert to float (big-endian word order, big-endian bytes)
-            bytes_data = struct.pack('>HH', result.registers[0], result.registers[1])
-            voltage = struct.unpack('>f', bytes_data)[0]
-            return voltage
-        
-        return None
-        
-    except Exception:
-        return None
+            raise ConnectionError(f"Cannot connect to LabJack T7 at {ip}:{port}")
+
+        if bridge_config.get('ain_range') is not None:
+            range_words = np.full(1, bridge_config['ain_range'], dtype='>f4').view('>u2').tolist()
+            for index in indices:
+                result = client.write_registers(AIN_RANGE_REGISTER + 2 * index, range_words,
+                                                **{UNIT_KWARG: unit})
+                if result.isError():
+                    raise IOError(f"AIN{index}_RANGE write failed: {result}")
+
+        print(f"[OK] Connected to LabJack T7 at {ip}:{port} (Modbus, {count} registers per scan)")
+
+        scheduler.reset()
+        while True:
+            scheduler.wait()
+            scheduler.begin_io()
+            result = client.read_input_registers(2 * first, count=count, **{UNIT_KWARG: unit})
+            timestamp_ns = scheduler.end_io()
+            if result.isError() or len(result.registers) != count:
+                raise IOError(f"AIN read failed: {result}")
+
+            device_online = True
+            voltages = decode_ain(result.registers, indices, first)
+            writer.add(np.array([timestamp_ns], dtype=np.int64), voltages[np.newaxis])
     finally:
-        if client:
-            client.close()
+        client.close()
+
+
+def read_labjack():
+    """Continuously acquire LabJack AIN channels and write to InfluxDB"""
+    global sample_ring, scheduler, channel_names, field_names, acquisition_mode, rollups, device_online
+    global SAMPLE_RATE, BUFFER_SECONDS
 
+    config = load_config()
+    device_config = config['devices']['LabJack_T7']
+
+    # Load bridge config
+    bridge_config = config.get('bridges', {}).get('labjack', {})
+    BUFFER_SECONDS = bridge_config.get('buffer_seconds', 2)
+    channel_names = tuple(bridge_config.get('channels', ['AIN0']))
+    field_names = tuple(f"{name}_voltage" for name in channel_names)
+    if bridge_config.get('rollups', False):
+        rollups = Rollups("labjack", [{'device': "LabJack_T7", 'location': "gen3_test_rig"}], field_names,
+                          config.get('rollups', {}).get('resolutions', DEFAULT_RESOLUTIONS))
+
+    acquisition_mode = bridge_config.get('mode', 'stream')
+    if acquisition_mode == 'stream' and ljm is None:
+        print("[WARN] LJM library not installed (pip install labjack-ljm) - using Modbus polling")
+        acquisition_mode = 'modbus'
+
+    if acquisition_mode == 'stream':
+        SAMPLE_RATE = bridge_config.get('scan_rate', 1000)
+        acquire = stream_acquire
+    else:
+        SAMPLE_RATE = bridge_config.get('poll_rate', 100)
+        scheduler = DeadlineScheduler(SAMPLE_RATE)
+        acquire = modbus_acquire
+
+    # Initialize preallocated ring buffer holding BUFFER_SECONDS of scans
+    max_samples = int(SAMPLE_RATE * BUFFER_SECONDS)
+    sample_ring = SampleRing(max_samples, len(channel_names))
+
+    # Write batch size (write to InfluxDB every N scans)
+    writer = ChunkWriter(max(1, int(SAMPLE_RATE)))  # Write every ~1 second
+
+    print(f"Mode: {acquisition_mode}, channels: {', '.join(channel_names)}")
+    print(f"Sample rate: {SAMPLE_RATE} Hz")
+    print(f"Buffer size: {max_samples} scans ({BUFFER_SECONDS}s)")
+    if rollups:
+        print(f"Rollups: {', '.join(rollups.resolutions)}")
 
-def poll_labjack():
-    """Continuously poll LabJack AIN0"""
-    global latest_voltage
-    
     while True:
         try:
-            voltage = read_ain0()
-            
-            with data_lock:
-                latest_voltage = voltage
-            
-            time.sleep(0.1)  # 1Hz polling
-            
+            acquire(device_config, bridge_config, writer)
         except Exception as e:
-            print(f"Error: {e}")
-            time.sleep(1)
-
-
-class MetricsHandler(BaseHTTPRequestHandler):
-    """HTTP request handler for metrics endpoint"""
-    
-    def do_GET(self):
-        if self.path == '/metrics':
-            with data_lock:
-                voltage = latest_voltage
-            
-            if voltage is not None:
-                # Format for InfluxDB line protocol
-                metric_line = f"labjack AIN0_voltage={voltage:.6f} {int(time.time()*1e9)}"
-                
-                self.send_response(200)
-                self.send_header('Content-Type', 'text/plain')
-                self.end_headers()
-                self.wfile.write(metric_line.encode())
-            else:
-                self.send_error(503, "No data available")
-        else:
-            self.send_error(404)
-    
-    def log_message(self, *args):
-        """Suppress request logging"""
-        pass
+            device_online = False
+            print(f"[ERROR] LabJack offline: {e}")
+            print(f"  Retrying in {RECONNECT_DELAY}s...")
+            time.sleep(RECONNECT_DELAY)
+
+
+def format_metrics(timestamps, values):
+    """Format ring snapshot rows as InfluxDB line protocol - one line per scan"""
+    template = "labjack " + ','.join(f"{name}=%.6f" for name in field_names) + " %d"
+    lines = [template % (*row, timestamp_ns)
+             for row, timestamp_ns in zip(values.tolist(), timestamps.tolist())
+             if row[0] == row[0]]  # skipped scans are NaN
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def cursor_response(start_index=None, since_ns=None):
+    """Build /metrics or /latest response from the ring (seq = absolute scan index)"""
+    if not device_online:
+        return Response("# Device offline\n", status=503, mimetype='text/plain')
+
+    if sample_ring is None or len(sample_ring) == 0:
+        return Response("# No data yet\n", status=503, mimetype='text/plain')
+
+    headers = cursor_headers(sample_ring.total - 1)
+    if etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+        return Response(status=304, headers=headers)
+
+    # Snapshot copy of ring - never blocks the acquisition thread
+    first_index, timestamps, values = sample_ring.snapshot(start_index)
+    headers['X-Last-Seq'] = str(first_index + len(timestamps) - 1)
+    if since_ns is not None:
+        mask = timestamps > since_ns
+        timestamps, values = timestamps[mask], values[mask]
+
+    return Response(format_metrics(timestamps, values), mimetype='text/plain', headers=headers)
+
+
+@app.route('/metrics')
+def metrics():
+    """Return buffered metrics in InfluxDB line protocol format (?since=<seq> / ?since_ns=<ns> for new samples only)"""
+    try:
+        since_seq, since_ns = parse_cursor(request.args)
+    except ValueError:
+        return Response("# since/since_ns must be integers\n", status=400, mimetype='text/plain')
+
+    return cursor_response(since_seq + 1 if since_seq is not None else None, since_ns)
+
+
+@app.route('/latest')
+def latest():
+    """Return only the most recent scan in InfluxDB line protocol format"""
+    return cursor_response(sample_ring.total - 1 if sample_ring else None)
+
+
+@app.route('/health')
+def health():
+    """Health check endpoint with buffer and acquisition stats"""
+    status = "online" if device_online else "offline"
+
+    buffer_size = len(sample_ring) if sample_ring else 0
+    buffer_max = sample_ring.capacity if sample_ring else 0
+
+    response = {
+        'status': status,
+        'device_online': device_online,
+        'mode': acquisition_mode,
+        'channels': list(channel_names),
+        'sample_rate': SAMPLE_RATE,
+        'buffer_seconds': BUFFER_SECONDS,
+        'buffer_size': buffer_size,
+        'buffer_max': buffer_max,
+        'buffer_pct': round(100 * buffer_size / buffer_max, 1) if buffer_max > 0 else 0,
+        'stream': dict(stream_stats) if acquisition_mode == 'stream' else None,
+        'sample_clock': sample_clock.stats() if sample_clock else None,
+        'rollups': rollups.stats() if rollups else None,
+        'scheduler': scheduler.stats() if scheduler else None,
+        'influxdb_enabled': influx_writer is not None,
+        'points_written': influx_writer.points_written if influx_writer else 0,
+        'influxdb_writer': influx_writer.stats() if influx_writer else None
+    }
+
+    import json
+    return Response(json.dumps(response, indent=2), mimetype='application/json')
 
 
 def main():
     """Main entry point"""
-    # Start LabJack polling thread
-    poll_thread = threading.Thread(target=poll_labjack, daemon=True)
-    poll_thread.start()
-    
+    config = load_config()
+    bridge_config = config.get('bridges', {}).get('labjack', {})
+    port = bridge_config.get('port', DEFAULT_PORT)
+
+    print("LabJack T7 Analog Input HTTP Bridge (Direct InfluxDB)")
+    print(f"Config: {CONFIG_PATH}")
+    print(f"Endpoints: http://localhost:{port}/metrics, /latest, /health")
+    print()
+
+    # Setup InfluxDB direct writes
+    setup_influxdb()
+
+    # Start reader thread
+    reader_thread = threading.Thread(target=read_labjack, daemon=True)
+    reader_thread.start()
+
     # Start HTTP server
-    server = HTTPServer(('localhost', 8891), MetricsHandler)
-    print(f"LabJack HTTP server started on port 8891")
-    print(f"Polling AIN0 at {HOST}:{PORT}")
-    
-    try:
-        server.serve_forever()
-    except KeyboardInterrupt:
-        print("\nShutting down...")
-        server.shutdown()
+    app.run(host='0.0.0.0', port=port, debug=False, threaded=True)
 
 
 if __name__ == "__main__":
     main()
-
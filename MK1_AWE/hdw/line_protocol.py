@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+InfluxDB Line Protocol Serializer
+Shared by the hardware bridges - replaces one influxdb_client.Point per value
+with precomputed per-channel tag prefixes and a single reusable buffer.
+Like Point, non-finite floats (NaN, +/-inf) are never written - InfluxDB
+rejects the whole batch for them.
+"""
+
+import math
+import numpy as np
+
+
+def _escape_tag(text):
+    """Escape measurement/tag/field key characters per line protocol spec"""
+    return str(text).replace('\\', '\\\\').replace(',', '\\,').replace('=', '\\=').replace(' ', '\\ ')
+
+
+def tag_prefix(measurement, tags):
+    """Build the 'measurement,tag=value,... ' prefix for one series
+
+    Tags are sorted by key (same canonical order as influxdb_client.Point).
+    The prefix is computed once per channel and reused for every sample.
+
+    Args:
+        measurement: Measurement name (e.g., "ni_analog")
+        tags: Dict of tag key -> value
+
+    Returns:
+        str prefix including trailing space before the field set
+    """
+    parts = [str(measurement).replace(',', '\\,').replace(' ', '\\ ')]
+    for key in sorted(tags):
+        value = tags[key]
+        if value is None or value == '':
+            continue
+        parts.append(f"{_escape_tag(key)}={_escape_tag(value)}")
+    return ','.join(parts) + ' '
+
+
+class LineProtocolBuffer:
+    """Reusable line protocol buffer for batched InfluxDB writes"""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._templates = {}
+        self.points = 0
+
+    def clear(self):
+        """Reset buffer for the next batch (keeps cached templates)"""
+        del self._buf[:]
+        self.points = 0
+
+    def _template(self, prefix, field_names):
+        """Get cached '%r' line template for a prefix + field set"""
+        key = (prefix, field_names)
+        template = self._templates.get(key)
+        if template is None:
+            fields = ','.join(f"{_escape_tag(name)}=%r" for name in field_names)
+            template = prefix + fields + ' %d\n'
+            self._templates[key] = template
+        return template
+
+    def add_columns(self, prefixes, field_names, columns, timestamps_ns):
+        """Append a columnar block of samples
+
+        Args:
+            prefixes: Tag prefix per channel (from tag_prefix)
+            field_names: Tuple of field names, one per column
+            columns: One [channel][sample] array (or nested list) per field
+            timestamps_ns: Sample timestamps (ns), shared by all channels
+        """
+        field_names = tuple(field_names)
+        timestamps = timestamps_ns.tolist() if hasattr(timestamps_ns, 'tolist') else list(timestamps_ns)
+
+        # [channel][sample] mask of rows with a non-finite value in any field
+        bad = np.zeros((len(prefixes), len(timestamps)), dtype=bool)
+        for col in columns:
+            bad |= ~np.isfinite(np.asarray(col, dtype=np.float64))
+        columns = [col.tolist() if hasattr(col, 'tolist') else col for col in columns]
+
+        for ch_idx, prefix in enumerate(prefixes):
+            template = self._template(prefix, field_names)
+            rows = zip(*[col[ch_idx] for col in columns], timestamps)
+            if not bad[ch_idx].any():
+                self._buf += ''.join(map(template.__mod__, rows)).encode()
+                self.points += len(timestamps)
+                continue
+
+            # Slow path for this channel: finite rows as usual, non-finite fields dropped
+            for row, row_bad in zip(rows, bad[ch_idx].tolist()):
+                if not row_bad:
+                    self._buf += (template % row).encode()
+                    self.points += 1
+                else:
+                    self.add_point(prefix, dict(zip(field_names, row[:-1])), row[-1])
+
+    def add_point(self, prefix, fields, timestamp_ns):
+        """Append a single point; fields with None or non-finite values are skipped
+
+        Args:
+            prefix: Tag prefix (from tag_prefix)
+            fields: Dict of field name -> numeric value
+            timestamp_ns: Timestamp (ns)
+
+        Returns:
+            True if a line was written (at least one finite field)
+        """
+        field_set = ','.join(
+            f"{_escape_tag(name)}={value!r}"
+            for name, value in ((name, float(value)) for name, value in fields.items() if value is not None)
+            if math.isfinite(value)
+        )
+        if not field_set:
+            return False
+        self._buf += f"{prefix}{field_set} {int(timestamp_ns)}\n".encode()
+        self.points += 1
+        return True
+
+    def getvalue(self):
+        """Return buffer contents as bytes (ready for write_api.write)"""
+        return bytes(self._buf)
+
+    def __len__(self):
+        return len(self._buf)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Cursor and ETag helpers for bridge /metrics and /latest endpoints
+
+Every buffered sample carries a sequence number (monotonic per bridge run).
+    /metrics                 all buffered samples (unchanged behaviour)
+    /metrics?since=<seq>     only samples with seq > <seq>
+    /metrics?since_ns=<ns>   only samples with timestamp_ns > <ns>
+    /latest                  newest sample only
+Responses carry X-Last-Seq (seq of the newest buffered sample, use as the
+next cursor) and an ETag; a matching If-None-Match returns 304.
+"""
+
+import time
+
+# Distinguishes bridge restarts (sequence numbers start over)
+BRIDGE_EPOCH = time.time_ns() // 1_000_000
+
+
+def parse_cursor(params):
+    """Parse since / since_ns query parameters
+
+    Args:
+        params: Mapping of query parameter name -> string value
+
+    Returns:
+        (since_seq, since_ns) - either may be None
+
+    Raises:
+        ValueError: If a parameter is not an integer
+    """
+    since_seq = params.get('since')
+    since_ns = params.get('since_ns')
+    return (
+        int(since_seq) if since_seq not in (None, '') else None,
+        int(since_ns) if since_ns not in (None, '') else None
+    )
+
+
+def make_etag(last_seq):
+    """ETag for a buffer whose newest sample is last_seq"""
+    return f'"{BRIDGE_EPOCH:x}-{last_seq}"'
+
+
+def etag_matches(if_none_match, etag):
+    """True if an If-None-Match header value matches etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+def select_samples(samples, since_seq=None, since_ns=None):
+    """Filter sample dicts (with 'seq' and 'timestamp_ns') by cursor"""
+    if since_seq is not None:
+        samples = [s for s in samples if s['seq'] > since_seq]
+    if since_ns is not None:
+        samples = [s for s in samples if s['timestamp_ns'] > since_ns]
+    return samples
+
+
+def cursor_headers(last_seq):
+    """Response headers shared by /metrics and /latest"""
+    return {
+        'ETag': make_etag(last_seq),
+        'X-Last-Seq': str(last_seq),
+        'Cache-Control': 'no-cache'
+    }
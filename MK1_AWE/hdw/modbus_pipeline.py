@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Pipelined Modbus TCP Client (asyncio)
+Sends requests on one connection without waiting for earlier responses and
+matches replies by MBAP transaction id, so several unit reads through a
+gateway are in flight at once. (pymodbus 3.6 holds a lock across send and
+response, which serializes gathered requests on one client.)
+
+A request that times out only fails that request: its transaction id is
+forgotten (a late reply is discarded) and the connection stays open for
+the other units. The connection is closed only when the socket itself
+fails. How much of the overlap the gateway turns into parallel bus
+traffic depends on the gateway; the client never adds waits of its own.
+"""
+
+import asyncio
+import struct
+import numpy as np
+
+# Defaults
+DEFAULT_MAX_IN_FLIGHT = 16  # outstanding transactions per connection
+
+READ_HOLDING_REGISTERS = 0x03
+MBAP = struct.Struct('>HHHB')  # transaction id, protocol id (0), length, unit id
+
+
+class ModbusExceptionResponse(Exception):
+    """Device answered with a Modbus exception code"""
+
+    def __init__(self, unit, function, code):
+        super().__init__(f"Unit 0x{unit:02X} function 0x{function:02X} exception code {code}")
+        self.unit = unit
+        self.code = code
+
+
+class PipelinedModbusTcp:
+    """One Modbus TCP connection with transaction-id matched, concurrent requests"""
+
+    def __init__(self, host, port=502, timeout=0.5, max_in_flight=DEFAULT_MAX_IN_FLIGHT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._reader = None
+        self._writer = None
+        self._reader_task = None
+        self._pending = {}  # transaction id -> Future
+        self._next_tid = 0
+        self.connected = False
+
+        # Counters
+        self.requests = 0
+        self.timeouts = 0
+        self.late_replies = 0
+
+    async def connect(self):
+        """Open the connection and start the reply reader"""
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout)
+        self.connected = True
+        self._reader_task = asyncio.create_task(self._read_replies())
+        return True
+
+    def close(self):
+        """Close the socket; outstanding requests fail with ConnectionError"""
+        self.connected = False
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._fail_pending(ConnectionError(f"Modbus connection to {self.host}:{self.port} closed"))
+
+    def _fail_pending(self, error):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending.clear()
+
+    async def _read_replies(self):
+        """Route each reply to the request with the same transaction id"""
+        try:
+            while True:
+                header = await self._reader.readexactly(MBAP.size)
+                tid, _, length, _ = MBAP.unpack(header)
+                pdu = await self._reader.readexactly(length - 1)
+                future = self._pending.pop(tid, None)
+                if future is None or future.done():
+                    self.late_replies += 1  # reply to a request that already timed out
+                    continue
+                future.set_result(pdu)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.connected = False
+            self._fail_pending(ConnectionError(f"Modbus connection to {self.host}:{self.port} lost: {e}"))
+
+    async def request(self, unit, pdu):
+        """Send one request PDU and return the reply PDU
+
+        Raises:
+            TimeoutError: No reply within timeout (connection stays open)
+            ConnectionError: Connection closed or lost
+        """
+        if not self.connected:
+            raise ConnectionError(f"Modbus connection to {self.host}:{self.port} not open")
+
+        async with self._slots:
+            tid = self._next_tid = (self._next_tid + 1) & 0xFFFF
+            future = asyncio.get_running_loop().create_future()
+            self._pending[tid] = future
+            self._writer.write(MBAP.pack(tid, 0, len(pdu) + 1, unit) + pdu)
+            self.requests += 1
+            try:
+                return await asyncio.wait_for(future, self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise TimeoutError(f"Unit 0x{unit:02X} did not reply within {self.timeout}s") from None
+            finally:
+                self._pending.pop(tid, None)
+
+    async def read_holding_registers(self, unit, address, count):
+        """Read holding registers
+
+        Returns:
+            uint16 array of register values
+        """
+        reply = await self.request(unit, struct.pack('>BHH', READ_HOLDING_REGISTERS, address, count))
+        if reply[0] & 0x80:
+            raise ModbusExceptionResponse(unit, reply[0] & 0x7F, reply[1])
+        if reply[0] != READ_HOLDING_REGISTERS or reply[1] != count * 2 or len(reply) != 2 + count * 2:
+            raise ValueError(f"Malformed reply from unit 0x{unit:02X}")
+        return np.frombuffer(reply, dtype='>u2', offset=2, count=count).astype(np.uint16)
+
+    def stats(self):
+        """Connection counters for /health"""
+        return {
+            'connected': self.connected,
+            'requests': self.requests,
+            'timeouts': self.timeouts,
+            'late_replies': self.late_replies,
+            'in_flight': len(self._pending)
+        }
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Persistent Modbus RTU Session
+Keeps the USB serial port open across register reads/writes instead of
+opening and closing it for every call. Adapter failures (SerialException,
+OSError from a stale handle, repeated no-response) close the port; the
+next call reopens it transparently, with bounded exponential backoff
+between reopen attempts.
+"""
+
+import time
+from collections import deque
+import minimalmodbus
+import serial
+
+# Defaults (override in devices.yaml bridges.psu.rtu_session)
+DEFAULT_BACKOFF_MIN = 0.5       # seconds before the first reopen attempt
+DEFAULT_BACKOFF_MAX = 10.0      # seconds - cap for repeated reopen failures
+DEFAULT_MAX_NO_RESPONSE = 3     # consecutive no-response errors before reopening the port
+LATENCY_WINDOW = 256            # transactions kept for latency percentiles
+
+# Port-level failures - the handle is unusable and must be reopened
+# (checked after minimalmodbus errors, which also subclass OSError)
+PORT_ERRORS = (serial.SerialException, OSError)
+
+
+class RTUSession:
+    """Modbus RTU instrument with a reusable port and automatic reopen"""
+
+    def __init__(self, com_port, slave_id, baud_rate=9600, timeout=0.5, reuse_port=True,
+                 session_config=None):
+        session_config = session_config or {}
+        self.com_port = com_port
+        self.slave_id = slave_id
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.reuse_port = reuse_port
+        self.backoff_min = session_config.get('backoff_min', DEFAULT_BACKOFF_MIN)
+        self.backoff_max = session_config.get('backoff_max', DEFAULT_BACKOFF_MAX)
+        self.max_no_response = session_config.get('max_no_response', DEFAULT_MAX_NO_RESPONSE)
+
+        self._instrument = None
+        self._backoff = 0.0
+        self._retry_at = 0.0        # monotonic time before which reopen is not attempted
+        self._no_response = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self.port_down = False      # True from a port failure until the next successful transaction
+
+        # Counters
+        self.opens = 0
+        self.reopens = 0
+        self.transactions = 0
+        self.failures = 0
+        self.last_error = None
+
+    def _open(self):
+        """Create the instrument (port opens on first call)"""
+        now = time.monotonic()
+        if now < self._retry_at:
+            raise ConnectionError(f"{self.com_port} reopen backoff ({self._retry_at - now:.1f}s left): "
+                                  f"{self.last_error}")
+
+        try:
+            # Instrument() opens the port - a missing/unplugged adapter fails here
+            instrument = minimalmodbus.Instrument(self.com_port, self.slave_id,
+                                                  close_port_after_each_call=not self.reuse_port)
+            instrument.serial.baudrate = self.baud_rate
+            instrument.serial.timeout = self.timeout
+        except PORT_ERRORS as e:
+            self.failures += 1
+            self.last_error = str(e)
+            self._fail(e)
+            raise
+        instrument.mode = minimalmodbus.MODE_RTU
+        self._instrument = instrument
+        self.opens += 1
+        if self.opens > 1:
+            self.reopens += 1
+
+    def close(self):
+        """Close the port (next call reopens it)"""
+        if self._instrument is not None:
+            try:
+                self._instrument.serial.close()
+            except Exception:
+                pass
+            self._instrument = None
+
+    def _fail(self, error):
+        """Drop the port and schedule the next reopen with backoff"""
+        self.close()
+        self.port_down = True
+        self._no_response = 0
+        self._backoff = min(self.backoff_max, max(self.backoff_min, self._backoff * 2))
+        self._retry_at = time.monotonic() + self._backoff
+        print(f"[WARN] {self.com_port} port error - reopening in {self._backoff:.1f}s: {error}")
+
+    def _call(self, method, *args):
+        """Run one Modbus transaction on the open port"""
+        if self._instrument is None:
+            self._open()
+
+        start = time.perf_counter()
+        try:
+            result = getattr(self._instrument, method)(*args)
+        except minimalmodbus.NoResponseError as e:
+            self.failures += 1
+            self.last_error = str(e)
+            self._no_response += 1
+            if self._no_response >= self.max_no_response:
+                # Silent adapter - a fresh handle usually recovers it
+                self._fail(e)
+            raise
+        except minimalmodbus.ModbusException as e:
+            # Slave answered with an error - the port itself is fine
+            self.failures += 1
+            self.last_error = str(e)
+            raise
+        except PORT_ERRORS as e:
+            self.failures += 1
+            self.last_error = str(e)
+            self._fail(e)
+            raise
+
+        self._latencies.append(time.perf_counter() - start)
+        self.transactions += 1
+        self._no_response = 0
+        self._backoff = 0.0
+        self.port_down = False
+        return result
+
+    def retry_in(self):
+        """Seconds until the next reopen attempt is allowed (0 if not backing off)"""
+        return max(0.0, self._retry_at - time.monotonic())
+
+    def read_registers(self, address, count):
+        """Read holding registers (function code 3)"""
+        return self._call('read_registers', address, count)
+
+    def write_register(self, address, value):
+        """Write one holding register (function code 16)"""
+        return self._call('write_register', address, value)
+
+    def write_registers(self, address, values):
+        """Write consecutive holding registers in one transaction (function code 16)"""
+        return self._call('write_registers', address, list(values))
+
+    def stats(self):
+        """Session counters and transaction latency for /health"""
+        latencies = sorted(self._latencies)
+
+        def pct_ms(pct):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000, 1)
+
+        return {
+            'com_port': self.com_port,
+            'reuse_port': self.reuse_port,
+            'port_open': self._instrument is not None,
+            'port_down': self.port_down,
+            'opens': self.opens,
+            'reopens': self.reopens,
+            'transactions': self.transactions,
+            'failures': self.failures,
+            'backoff_s': self._backoff,
+            'last_error': self.last_error,
+            'latency_p50_ms': pct_ms(50),
+            'latency_p95_ms': pct_ms(95)
+        }
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Generic Modbus TCP HTTP Bridge
+Polls every Modbus TCP instrument listed in devices.yaml bridges.modbus_tcp
+and writes directly to InfluxDB. Each instrument is a devices.<name> entry
+(ip, port, unit, sample_rate, measurement) pointing at a register map in
+modules.<register_map>:
+    - { prefix: "TC", address: 0x20, count: 16, type: uint16, scale: 0.1 }
+    - { names: [AIN0], table: input, address: 0, type: float32, word_order: big }
+Adjacent registers are coalesced into as few read requests as possible and
+each block is decoded with NumPy. Every instrument is polled by its own
+thread on a persistent connection.
+Also exposes /metrics, /latest and /health
+"""
+
+import inspect
+import time
+import threading
+from collections import deque
+import numpy as np
+from flask import Flask, Response, request
+from pymodbus.client import ModbusTcpClient
+from bridge_common import CONFIG_PATH, load_config, get_influx_writer
+from line_protocol import LineProtocolBuffer, tag_prefix
+from metrics_cursor import parse_cursor, etag_matches, select_samples, cursor_headers
+from poll_scheduler import DeadlineScheduler
+
+# Configuration
+RECONNECT_DELAY = 5  # seconds
+MAX_READ_REGISTERS = 125  # Modbus limit per read request
+DEFAULT_PORT = 8885
+
+# Register type -> (numpy type code, registers per value)
+REGISTER_TYPES = {
+    'uint16': ('u2', 1),
+    'int16': ('i2', 1),
+    'uint32': ('u4', 2),
+    'int32': ('i4', 2),
+    'float32': ('f4', 2),
+}
+TABLES = ('holding', 'input')
+
+# pymodbus renamed slave= to device_id= in 3.9
+UNIT_KWARG = ('device_id' if 'device_id' in
+              inspect.signature(ModbusTcpClient.read_holding_registers).parameters else 'slave')
+
+app = Flask(__name__)
+
+# Global state
+devices = {}  # device name -> ModbusDevice
+sample_buffer = None  # Will be initialized as deque (samples from every device)
+data_lock = threading.Lock()
+sample_seq = 0  # Sequence number of newest buffered sample (cursor for /metrics?since=)
+influx_writer = None
+influx_bucket = None
+
+# Config values loaded at startup
+BUFFER_SECONDS = 2
+
+
+def setup_influxdb():
+    """Setup InfluxDB writer for direct writes (shared writer when run by bridge_daemon.py)"""
+    global influx_writer, influx_bucket
+
+    influx_writer, influx_bucket = get_influx_writer("modbus_tcp_writer")
+    return influx_writer is not None
+
+
+def decode_registers(words, register_type, word_order='big'):
+    """Decode a run of registers into values with one NumPy view
+
+    Args:
+        words: Register values
+        register_type: Key of REGISTER_TYPES
+        word_order: 'big' (high word first) or 'little' (low word first) for 32-bit types
+
+    Returns:
+        numpy array, one value per channel
+    """
+    type_code, width = REGISTER_TYPES[register_type]
+    words = np.asarray(words, dtype='>u2')
+    if width == 2 and word_order == 'little':
+        words = np.ascontiguousarray(words.reshape(-1, 2)[:, ::-1])
+    return words.view('>' + type_code).ravel()
+
+
+class RegisterEntry:
+    """One register map entry: a run of same-typed channels"""
+
+    def __init__(self, entry):
+        self.table = entry.get('table', 'holding')
+        if self.table not in TABLES:
+            raise ValueError(f"Unknown register table: {self.table}")
+        self.type = entry.get('type', 'uint16')
+        if self.type not in REGISTER_TYPES:
+            raise ValueError(f"Unknown register type: {self.type}")
+        self.width = REGISTER_TYPES[self.type][1]
+        self.word_order = entry.get('word_order', 'big')
+        self.address = entry['address']
+
+        if 'names' in entry:
+            self.names = list(entry['names'])
+        else:
+            count = entry.get('count', 1)
+            self.names = [f"{entry['prefix']}{i:02d}" for i in range(1, count + 1)]
+        self.count = len(self.names)
+        self.registers = self.count * self.width
+
+        self.scale = entry.get('scale', 1.0)
+        self.offset = entry.get('offset', 0.0)
+        self.valid_range = entry.get('valid_range')  # [min, max] after scaling; outside -> not written
+
+    def decode(self, words):
+        """Scaled values for this entry's registers (NaN outside valid_range)"""
+        values = decode_registers(words, self.type, self.word_order).astype(np.float64)
+        values = values * self.scale + self.offset
+        if self.valid_range:
+            low, high = self.valid_range
+            values[(values < low) | (values > high)] = np.nan
+        return values
+
+
+class ReadBlock:
+    """One read request covering one or more register entries"""
+
+    def __init__(self, table, start):
+        self.table = table
+        self.start = start
+        self.count = 0
+        self.entries = []  # (entry, register offset within the block)
+
+    def add(self, entry):
+        self.entries.append((entry, entry.address - self.start))
+        self.count = max(self.count, entry.address + entry.registers - self.start)
+
+
+def plan_reads(entries, max_gap=0):
+    """Coalesce register entries into the fewest read requests
+
+    Entries in the same table are merged while the gap between them is at
+    most max_gap registers and the request stays within MAX_READ_REGISTERS.
+
+    Returns:
+        List of ReadBlock
+    """
+    blocks = []
+    for table in TABLES:
+        block = None
+        for entry in sorted((e for e in entries if e.table == table), key=lambda e: e.address):
+            end = entry.address + entry.registers
+            if (block is None or entry.address > block.start + block.count + max_gap or
+                    end - block.start > MAX_READ_REGISTERS):
+                block = ReadBlock(table, entry.address)
+                blocks.append(block)
+            block.add(entry)
+    return blocks
+
+
+class ModbusDevice:
+    """One Modbus TCP instrument polled on a persistent connection"""
+
+    def __init__(self, name, device_config, register_map, bridge_config):
+        self.name = name
+        self.ip = device_config['ip']
+        self.port = device_config.get('port', 502)
+        self.unit = device_config.get('unit', 1)
+        self.timeout = device_config.get('timeout', 0.5)
+        self.sample_rate = device_config.get('sample_rate', bridge_config.get('sample_rate', 1))
+        self.measurement = device_config.get('measurement', name.lower())
+
+        self.entries = [RegisterEntry(entry) for entry in register_map]
+        self.blocks = plan_reads(self.entries, bridge_config.get('max_gap', 0))
+        self.field_names = tuple(name for block in self.blocks for entry, _ in block.entries
+                                 for name in entry.names)
+        self.prefix = tag_prefix(self.measurement, {
+            'device': name,
+            'hardware': "modbus_tcp",
+            'location': "gen3_test_rig"
+        })
+
+        self.client = None
+        self.online = False
+        self.scheduler = DeadlineScheduler(self.sample_rate)
+        self.line_buffer = LineProtocolBuffer()
+
+        # Counters
+        self.scans = 0
+        self.failed_reads = 0
+        self.last_error = None
+
+    def read_block(self, block):
+        """Read one coalesced block; returns register array"""
+        read = (self.client.read_holding_registers if block.table == 'holding'
+                else self.client.read_input_registers)
+        result = read(block.start, count=block.count, **{UNIT_KWARG: self.unit})
+        if result.isError() or len(result.registers) != block.count:
+            raise IOError(f"{self.name}: read of {block.count} {block.table} registers "
+                          f"at {block.start:#06x} failed: {result}")
+        return result.registers
+
+    def scan(self):
+        """Read and decode every block; returns values in field_names order"""
+        values = []
+        for block in self.blocks:
+            words = self.read_block(block)
+            for entry, offset in block.entries:
+                values.append(entry.decode(words[offset:offset + entry.registers]))
+        return np.concatenate(values)
+
+    def fields(self, values):
+        """Field dict for one scan (NaN / out-of-range channels skipped)"""
+        return {name: value for name, value in zip(self.field_names, values.tolist()) if value == value}
+
+    def write_to_influxdb(self, samples):
+        """Write batch of samples directly to InfluxDB"""
+        if not influx_writer:
+            return False
+
+        try:
+            self.line_buffer.clear()
+            for sample in samples:
+                self.line_buffer.add_point(self.prefix, self.fields(sample['values']), sample['timestamp_ns'])
+
+            if self.line_buffer.points:
+                influx_writer.submit(self.line_buffer.getvalue(), self.line_buffer.points)
+            return True
+        except Exception as e:
+            print(f"[ERROR] {self.name} InfluxDB write failed: {e}")
+            return False
+
+    def poll(self):
+        """Continuously poll this instrument and write to InfluxDB"""
+        global sample_seq
+
+        write_batch_size = max(1, int(self.sample_rate))  # Write every ~1 second
+        pending_samples = []
+
+        print(f"{self.name}: {self.ip}:{self.port} unit {self.unit}, {self.sample_rate} Hz, "
+              f"{len(self.field_names)} channels in {len(self.blocks)} read(s)")
+
+        while True:
+            try:
+                self.client = ModbusTcpClient(self.ip, port=self.port, timeout=self.timeout)
+                if not self.client.connect():
+                    raise ConnectionError(f"Cannot connect to {self.ip}:{self.port}")
+                print(f"[OK] Connected to {self.name} at {self.ip}:{self.port}")
+
+                self.scheduler.reset()
+                while True:
+                    self.scheduler.wait()
+                    self.scheduler.begin_io()
+                    values = self.scan()
+                    timestamp_ns = self.scheduler.end_io()
+                    self.online = True
+                    self.scans += 1
+
+                    sample = {
+                        'timestamp_ns': timestamp_ns,
+                        'device': self.name,
+                        'values': values
+                    }
+
+                    # Add to pending samples for InfluxDB write
+                    pending_samples.append(sample)
+
+                    # Add to buffer for /metrics endpoint
+                    with data_lock:
+                        sample_seq += 1
+                        sample['seq'] = sample_seq
+                        sample_buffer.append(sample)
+
+                    # Write to InfluxDB when we have enough samples
+                    if len(pending_samples) >= write_batch_size:
+                        self.write_to_influxdb(pending_samples)
+                        pending_samples = []
+
+            except Exception as e:
+                self.online = False
+                self.failed_reads += 1
+                self.last_error = str(e)
+                if self.client:
+                    self.client.close()
+                print(f"[ERROR] {self.name} offline: {e}")
+                print(f"  Retrying in {RECONNECT_DELAY}s...")
+                time.sleep(RECONNECT_DELAY)
+
+    def health(self):
+        """Instrument status and scan stats"""
+        return {
+            'status': 'online' if self.online else 'offline',
+            'address': f"{self.ip}:{self.port}",
+            'unit': self.unit,
+            'measurement': self.measurement,
+            'sample_rate': self.sample_rate,
+            'channels': len(self.field_names),
+            'reads_per_scan': len(self.blocks),
+            'scans': self.scans,
+            'failed_reads': self.failed_reads,
+            'last_error': self.last_error,
+            'scheduler': self.scheduler.stats()
+        }
+
+
+def create_devices():
+    """Create a ModbusDevice per entry in bridges.modbus_tcp.devices"""
+    global sample_buffer, BUFFER_SECONDS
+
+    config = load_config()
+    bridge_config = config.get('bridges', {}).get('modbus_tcp', {})
+    BUFFER_SECONDS = bridge_config.get('buffer_seconds', 2)
+
+    for name in bridge_config.get('devices', []):
+        device_config = config['devices'][name]
+        register_map = config['modules'][device_config['register_map']]
+        devices[name] = ModbusDevice(name, device_config, register_map, bridge_config)
+
+    # Initialize ring buffer with max size (all devices share it)
+    max_samples = max(1, int(sum(device.sample_rate for device in devices.values()) * BUFFER_SECONDS))
+    sample_buffer = deque(maxlen=max_samples)
+    return devices
+
+
+def poll_devices():
+    """Poll every configured instrument, one thread each"""
+    if not devices:
+        create_devices()
+
+    workers = [threading.Thread(target=device.poll, name=f"modbus_{name}", daemon=True)
+               for name, device in devices.items()]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def format_metrics(samples):
+    """Format samples as InfluxDB line protocol - one line per scan"""
+    lines = []
+    for sample in samples:
+        device = devices[sample['device']]
+        fields = ','.join(f"{name}={value}" for name, value in device.fields(sample['values']).items())
+        if fields:
+            lines.append(f"{device.measurement},device={device.name} {fields} {sample['timestamp_ns']}")
+    return lines
+
+
+def cursor_response(since_seq=None, since_ns=None, latest_only=False):
+    """Build /metrics or /latest response from the sample buffer"""
+    if not any(device.online for device in devices.values()):
+        return Response("# Device offline\n", status=503, mimetype='text/plain')
+
+    with data_lock:
+        if sample_buffer is None or len(sample_buffer) == 0:
+            return Response("# No data yet\n", status=503, mimetype='text/plain')
+
+        headers = cursor_headers(sample_buffer[-1]['seq'])
+        if etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+            return Response(status=304, headers=headers)
+
+        if latest_only:
+            # Newest sample of each device, in buffer order
+            newest = {}
+            for sample in reversed(sample_buffer):
+                newest.setdefault(sample['device'], sample)
+                if len(newest) == len(devices):
+                    break
+            samples = sorted(newest.values(), key=lambda sample: sample['seq'])
+        else:
+            samples = list(sample_buffer)
+
+    lines = format_metrics(select_samples(samples, since_seq, since_ns))
+    output = '\n'.join(lines) + '\n' if lines else ''
+    return Response(output, mimetype='text/plain', headers=headers)
+
+
+@app.route('/metrics')
+def metrics():
+    """Return buffered metrics in InfluxDB line protocol format (?since=<seq> / ?since_ns=<ns> for new samples only)"""
+    try:
+        since_seq, since_ns = parse_cursor(request.args)
+    except ValueError:
+        return Response("# since/since_ns must be integers\n", status=400, mimetype='text/plain')
+
+    return cursor_response(since_seq, since_ns)
+
+
+@app.route('/latest')
+def latest():
+    """Return the most recent scan of each instrument in InfluxDB line protocol format"""
+    return cursor_response(latest_only=True)
+
+
+@app.route('/health')
+def health():
+    """Health check endpoint with per-instrument stats"""
+    online = sum(1 for device in devices.values() if device.online)
+
+    with data_lock:
+        buffer_size = len(sample_buffer) if sample_buffer else 0
+        buffer_max = sample_buffer.maxlen if sample_buffer else 0
+
+    response = {
+        'status': "online" if online else "offline",
+        'device_online': online > 0,
+        'devices_online': online,
+        'buffer_seconds': BUFFER_SECONDS,
+        'buffer_size': buffer_size,
+        'buffer_max': buffer_max,
+        'buffer_pct': round(100 * buffer_size / buffer_max, 1) if buffer_max > 0 else 0,
+        'devices': {name: device.health() for name, device in devices.items()},
+        'influxdb_enabled': influx_writer is not None,
+        'points_written': influx_writer.points_written if influx_writer else 0,
+        'influxdb_writer': influx_writer.stats() if influx_writer else None
+    }
+
+    import json
+    return Response(json.dumps(response, indent=2), mimetype='application/json')
+
+
+def main():
+    """Main entry point"""
+    config = load_config()
+    bridge_config = config.get('bridges', {}).get('modbus_tcp', {})
+    port = bridge_config.get('port', DEFAULT_PORT)
+
+    print("Generic Modbus TCP HTTP Bridge (Direct InfluxDB)")
+    print(f"Config: {CONFIG_PATH}")
+    create_devices()
+    print(f"Instruments: {', '.join(devices) or 'none (set bridges.modbus_tcp.devices)'}")
+    print(f"Endpoints: http://localhost:{port}/metrics, /latest, /health")
+    print()
+
+    # Setup InfluxDB direct writes
+    setup_influxdb()
+
+    # Start poller thread
+    poller_thread = threading.Thread(target=poll_devices, daemon=True)
+    poller_thread.start()
+
+    # Start HTTP server
+    app.run(host='0.0.0.0', port=port, debug=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,126 +2,191 @@
 """
 NI cDAQ-9187 Analog Input HTTP Bridge
 Reads 16 channels (4-20mA) from 2x NI-9253 modules
-Writes directly to InfluxDB for high-frequency data (bypasses Telegraf)
-Also exposes /metrics endpoint for debugging
+Writes directly to InfluxDB for high-frequency data (bypasses Telegraf),
+each channel at its own output_rate (sensor_labels.yaml) after anti-alias decimation
+Also exposes /metrics endpoint for debugging and /stream for live binary frames
 """
 
 import nidaqmx
+import numpy as np
 import yaml
 import time
 import threading
-import os
-from collections import deque
-from flask import Flask, Response
-from pathlib import Path
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
+import struct
+from flask import Flask, Response, request
+from nidaqmx.stream_readers import AnalogMultiChannelReader
+from bridge_common import CONFIG_PATH, load_config, get_influx_writer
+from line_protocol import LineProtocolBuffer, tag_prefix
+from metrics_cursor import parse_cursor, etag_matches, cursor_headers
+from sample_clock import SampleClock
+from decimator import Decimator
+from rollups import Rollups, DEFAULT_RESOLUTIONS
+from sample_ring import SampleRing
 
 # Configuration
-CONFIG_PATH = Path(__file__).parent.parent / "config" / "devices.yaml"
 RECONNECT_DELAY = 5  # seconds
 
 app = Flask(__name__)
 
 # Global state
-sample_buffer = None  # Will be initialized as deque
+sample_ring = None  # SampleRing: [sample][value AI01-16, raw_ma AI01-16]
+channel_names = ()
+sample_clock = None  # Hardware sample index -> wall-clock timestamps
 device_online = False
-data_lock = threading.Lock()
-influx_write_api = None
+influx_writer = None
 influx_bucket = None
-points_written = 0
+line_buffer = LineProtocolBuffer()
+channel_prefixes = {}  # channel name -> line protocol tag prefix
+output_groups = []  # OutputGroup per stored rate (InfluxDB writes)
+rollups = None  # Rollups of every channel at full rate (ni_analog_100ms, _1s, _1m)
 
 # Config values loaded at startup
 SAMPLE_RATE = 100
 BUFFER_SECONDS = 2
 
-
-def load_config():
-    """Load configuration from devices.yaml"""
-    with open(CONFIG_PATH, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
+# /stream binary frame: header + float32 [channel][sample] matrix (little-endian)
+#   magic 'NIA1', n_channels u16, decimation u16, n_samples u32,
+#   first_seq u64, first_timestamp_ns i64, period_ns f64
+STREAM_HEADER = struct.Struct('<4sHHIQqd')
+STREAM_MAGIC = b'NIA1'
+STREAM_POLL_INTERVAL = 0.01  # seconds between ring checks per subscriber
+stream_clients = 0
+stream_lock = threading.Lock()
 
 
 def setup_influxdb():
-    """Setup InfluxDB client for direct writes"""
-    global influx_write_api, influx_bucket
+    """Setup InfluxDB writer for direct writes (shared writer when run by bridge_daemon.py)"""
+    global influx_writer, influx_bucket
     
-    config = load_config()
-    system_config = config.get('system', {})
-    
-    influx_url = system_config.get('influxdb_url', 'http://localhost:8086')
-    influx_org = system_config.get('influxdb_org', 'electrolyzer')
-    influx_bucket = system_config.get('influxdb_bucket', 'electrolyzer_data')
-    
-    # Get token from environment (same as Telegraf uses)
-    influx_token = os.environ.get('INFLUXDB_ADMIN_TOKEN', '')
-    
-    if not influx_token:
-        # Try loading from .env file
-        env_path = CONFIG_PATH.parent.parent.parent / ".env"
-        if env_path.exists():
-            with open(env_path) as f:
-                for line in f:
-                    if line.startswith('INFLUXDB_ADMIN_TOKEN='):
-                        influx_token = line.strip().split('=', 1)[1]
-                        break
-    
-    if not influx_token:
-        print("[WARN] INFLUXDB_ADMIN_TOKEN not set - direct writes disabled")
-        return False
+    influx_writer, influx_bucket = get_influx_writer("ni_analog_writer")
+    return influx_writer is not None
+
+
+def build_scaling(channels, ai_labels):
+    """Precompute per-channel clamp limits and gain/offset vectors
     
-    try:
-        client = InfluxDBClient(url=influx_url, token=influx_token, org=influx_org)
-        influx_write_api = client.write_api(write_options=SYNCHRONOUS)
-        print(f"[OK] Connected to InfluxDB at {influx_url}")
-        print(f"     Bucket: {influx_bucket}, Org: {influx_org}")
-        return True
-    except Exception as e:
-        print(f"[ERROR] Failed to connect to InfluxDB: {e}")
-        return False
+    Args:
+        channels: List of (ch_name, hw_config) in task channel order
+        ai_labels: analog_inputs section of sensor_labels.yaml
+    
+    Returns:
+        dict of column vectors (shape [n_channels, 1]) for broadcasting
+    """
+    range_min = []
+    range_max = []
+    eng_min = []
+    eng_max = []
+    for ch_name, hw_config in channels:
+        label_config = ai_labels.get(ch_name, {})
+        range_min.append(hw_config['range_min'] * 1000)  # Convert to mA
+        range_max.append(hw_config['range_max'] * 1000)
+        eng_min.append(label_config.get('eng_min', 0.0))
+        eng_max.append(label_config.get('eng_max', 100.0))
+    
+    range_min = np.array(range_min, dtype=np.float64)[:, None]
+    range_max = np.array(range_max, dtype=np.float64)[:, None]
+    eng_min = np.array(eng_min, dtype=np.float64)[:, None]
+    eng_max = np.array(eng_max, dtype=np.float64)[:, None]
+    
+    return {
+        'range_min': range_min,
+        'range_max': range_max,
+        'gain': (eng_max - eng_min) / (range_max - range_min),
+        'eng_min': eng_min
+    }
 
 
-def convert_to_engineering_units(current_ma, hw_config, label_config):
-    """Convert 4-20mA reading to engineering units"""
-    range_min = hw_config['range_min'] * 1000  # Convert to mA
-    range_max = hw_config['range_max'] * 1000
-    eng_min = label_config.get('eng_min', 0.0)
-    eng_max = label_config.get('eng_max', 100.0)
+def convert_to_engineering_units(current_ma, scaling):
+    """Convert a [channel][sample] block of 4-20mA readings to engineering units"""
+    # Clamp to valid range, then linear scaling - one pass over the whole block
+    clamped = np.clip(current_ma, scaling['range_min'], scaling['range_max'])
+    return scaling['eng_min'] + (clamped - scaling['range_min']) * scaling['gain']
+
+
+class OutputGroup:
+    """Channels stored at one output rate, decimated from the sample rate"""
     
-    # Clamp to valid range
-    current_ma = max(range_min, min(range_max, current_ma))
+    def __init__(self, indices, names, factor, scaling):
+        self.indices = np.array(indices)
+        self.channels = tuple(names)
+        self.factor = factor
+        self.scaling = {key: vector[self.indices] for key, vector in scaling.items()}
+        self.decimator = Decimator(factor, len(indices)) if factor > 1 else None
     
-    # Linear scaling
-    eng_value = eng_min + (current_ma - range_min) * (eng_max - eng_min) / (range_max - range_min)
-    return eng_value
+    def chunk(self, timestamps_ns, raw_ma):
+        """Chunk of this group's channels (None until a decimated sample is complete)"""
+        raw_ma = raw_ma[self.indices]
+        if self.decimator:
+            # Anti-alias filter the mA readings, then scale (clamp after filtering)
+            timestamps_ns, raw_ma = self.decimator.process(timestamps_ns, raw_ma)
+            if len(timestamps_ns) == 0:
+                return None
+        return {
+            'channels': self.channels,
+            'timestamps_ns': timestamps_ns,
+            'raw_ma': raw_ma,
+            'value': convert_to_engineering_units(raw_ma, self.scaling)
+        }
 
 
-def write_to_influxdb(samples):
-    """Write batch of samples directly to InfluxDB"""
-    global points_written
+def build_output_groups(channel_names, ai_labels, sample_rate, scaling):
+    """Group channels by their stored rate (sensor_labels.yaml analog_inputs.<ch>.output_rate)
     
-    if not influx_write_api or not influx_bucket:
+    Rates must divide the sample rate; others are rounded to the nearest
+    integer decimation factor. Channels without output_rate are stored at
+    the sample rate.
+    """
+    groups = {}
+    for ch_idx, ch_name in enumerate(channel_names):
+        output_rate = ai_labels.get(ch_name, {}).get('output_rate', sample_rate)
+        factor = max(1, int(round(sample_rate / output_rate)))
+        if factor * output_rate != sample_rate and output_rate < sample_rate:
+            print(f"[WARN] {ch_name}: output_rate {output_rate} Hz does not divide {sample_rate} Hz "
+                  f"- storing at {sample_rate / factor:g} Hz")
+        groups.setdefault(factor, []).append(ch_idx)
+    
+    return [OutputGroup(indices, [channel_names[i] for i in indices], factor, scaling)
+            for factor, indices in sorted(groups.items())]
+
+
+def get_channel_prefixes(channel_names):
+    """Get (cached) line protocol tag prefixes for a tuple of channels"""
+    prefixes = channel_prefixes.get(channel_names)
+    if prefixes is None:
+        prefixes = [
+            tag_prefix("ni_analog", {
+                'channel': ch_name,
+                'hardware': "ni_cdaq",
+                'location': "gen3_test_rig"
+            })
+            for ch_name in channel_names
+        ]
+        channel_prefixes[channel_names] = prefixes
+    return prefixes
+
+
+def write_to_influxdb(chunks):
+    """Write batch of sample chunks directly to InfluxDB"""
+    if not influx_writer:
         return False
     
     try:
-        # Build list of points
-        points = []
-        for sample in samples:
-            timestamp_ns = sample['timestamp_ns']
-            for ch_name, data in sample['readings'].items():
-                point = Point("ni_analog") \
-                    .tag("channel", ch_name) \
-                    .tag("hardware", "ni_cdaq") \
-                    .tag("location", "gen3_test_rig") \
-                    .field("value", float(data['value'])) \
-                    .field("raw_ma", float(data['raw_ma'])) \
-                    .time(timestamp_ns, WritePrecision.NS)
-                points.append(point)
+        # Serialize columnar chunks straight to line protocol
+        line_buffer.clear()
+        for chunk in chunks:
+            line_buffer.add_columns(
+                get_channel_prefixes(chunk['channels']),
+                ('raw_ma', 'value'),
+                (chunk['raw_ma'], chunk['value']),
+                chunk['timestamps_ns']
+            )
         
-        # Write batch
-        influx_write_api.write(bucket=influx_bucket, record=points)
-        points_written += len(points)
+        # Write batch (with any rollup buckets closed since the last write)
+        data, points = line_buffer.getvalue(), line_buffer.points
+        if rollups:
+            rollup_data, rollup_points = rollups.take()
+            data, points = data + rollup_data, points + rollup_points
+        influx_writer.submit(data, points)
         return True
     except Exception as e:
         print(f"[ERROR] InfluxDB write failed: {e}")
@@ -130,7 +195,8 @@ def write_to_influxdb(samples):
 
 def read_analog_inputs():
     """Continuously read analog inputs from NI cDAQ and write to InfluxDB"""
-    global sample_buffer, device_online, SAMPLE_RATE, BUFFER_SECONDS
+    global sample_ring, sample_clock, channel_names, output_groups, rollups, device_online
+    global SAMPLE_RATE, BUFFER_SECONDS
     
     config = load_config()
     labels_config = yaml.safe_load(open(CONFIG_PATH.parent / "sensor_labels.yaml"))
@@ -140,46 +206,60 @@ def read_analog_inputs():
     SAMPLE_RATE = bridge_config.get('sample_rate', 100)
     BUFFER_SECONDS = bridge_config.get('buffer_seconds', 2)
     
-    # Initialize ring buffer with max size
-    max_samples = SAMPLE_RATE * BUFFER_SECONDS
-    sample_buffer = deque(maxlen=max_samples)
-    
     device_name = config['devices']['NI_cDAQ']['name']
     slot1_config = config['modules']['NI_cDAQ_Analog']['slot_1']
     slot4_config = config['modules']['NI_cDAQ_Analog']['slot_4']
     ai_labels = labels_config.get('analog_inputs', {})
     
-    # Calculate samples per read (10 reads per second for responsive buffer)
-    samples_per_read = max(1, SAMPLE_RATE // 10)
+    # Task channel order: Slot 1 (AI01-AI08) then Slot 4 (AI09-AI16)
+    task_channels = [(1, ch_name, hw_config) for ch_name, hw_config in slot1_config.items()]
+    task_channels += [(4, ch_name, hw_config) for ch_name, hw_config in slot4_config.items()]
+    channel_names = tuple(ch_name for _, ch_name, _ in task_channels)
+    n_channels = len(channel_names)
+    scaling = build_scaling([(ch_name, hw_config) for _, ch_name, hw_config in task_channels], ai_labels)
+    output_groups = build_output_groups(channel_names, ai_labels, SAMPLE_RATE, scaling)
+    if bridge_config.get('rollups', False):
+        rollups = Rollups("ni_analog",
+                          [{'channel': ch_name, 'hardware': "ni_cdaq", 'location': "gen3_test_rig"}
+                           for ch_name in channel_names],
+                          ('raw_ma', 'value'),
+                          config.get('rollups', {}).get('resolutions', DEFAULT_RESOLUTIONS))
+    
+    # Calculate samples per read (reads_per_second sets live /stream latency)
+    reads_per_second = bridge_config.get('reads_per_second', 10)
+    samples_per_read = max(1, SAMPLE_RATE // reads_per_second)
+    
+    # Initialize preallocated ring buffer holding BUFFER_SECONDS of samples
+    # (optionally in shared memory so other processes can read it)
+    max_samples = SAMPLE_RATE * BUFFER_SECONDS
+    sample_ring = SampleRing(max_samples, 2 * n_channels, shm_name=bridge_config.get('shared_memory'))
+    
+    # Host-vs-hardware drift is re-estimated every correction interval
+    drift_interval = bridge_config.get('drift_correction_interval', 10.0)
     
     # Write batch size (write to InfluxDB every N samples)
     write_batch_size = SAMPLE_RATE  # Write every ~1 second
-    pending_samples = []
+    pending_chunks = []
+    pending_count = 0
     
     print(f"Sample rate: {SAMPLE_RATE} Hz")
     print(f"Samples per read: {samples_per_read}")
     print(f"Buffer size: {max_samples} samples ({BUFFER_SECONDS}s)")
     print(f"InfluxDB write batch: {write_batch_size} samples")
+    for group in output_groups:
+        print(f"  Stored at {SAMPLE_RATE / group.factor:g} Hz: {', '.join(group.channels)}")
+    if rollups:
+        print(f"Rollups: {', '.join(rollups.resolutions)} (full-rate count/mean/min/max/last)")
     
     while True:
         try:
             # Create task
             with nidaqmx.Task() as task:
-                # Add channels from Slot 1 (AI01-AI08)
-                for ch_name, ch_config in slot1_config.items():
-                    ch_num = ch_config['channel']
-                    task.ai_channels.add_ai_current_chan(
-                        f"{device_name}Mod1/ai{ch_num}",
-                        min_val=-0.020,
-                        max_val=0.020,
-                        name_to_assign_to_channel=ch_name
-                    )
-                
-                # Add channels from Slot 4 (AI09-AI16)
-                for ch_name, ch_config in slot4_config.items():
+                # Add channels from Slot 1 (AI01-AI08) and Slot 4 (AI09-AI16)
+                for slot, ch_name, ch_config in task_channels:
                     ch_num = ch_config['channel']
                     task.ai_channels.add_ai_current_chan(
-                        f"{device_name}Mod4/ai{ch_num}",
+                        f"{device_name}Mod{slot}/ai{ch_num}",
                         min_val=-0.020,
                         max_val=0.020,
                         name_to_assign_to_channel=ch_name
@@ -194,68 +274,56 @@ def read_analog_inputs():
                 # Set buffer to hold 1 second of data (prevents overflow)
                 task.in_stream.input_buf_size = int(SAMPLE_RATE * 16 * 1)
                 
+                # Stream reader fills a preallocated [channel][sample] array in place
+                reader = AnalogMultiChannelReader(task.in_stream)
+                read_buffer = np.zeros((n_channels, samples_per_read), dtype=np.float64)
+                
+                # Timestamps come from the sample index at the actual (coerced) clock rate
+                sample_clock = SampleClock(task.timing.samp_clk_rate, correction_interval=drift_interval)
+                samples_read = 0
+                for group in output_groups:
+                    if group.decimator:
+                        group.decimator.reset()
+                
+                task.start()
                 print(f"[OK] Connected to {device_name}")
+                print(f"  Sample clock: {sample_clock.rate} Hz")
                 device_online = True
                 
                 # Read loop - batch read for efficiency
                 while True:
-                    # Read batch of samples from all channels
-                    # Returns list of lists: [channel][sample]
-                    data = task.read(number_of_samples_per_channel=samples_per_read)
+                    # Read batch of samples from all channels (amps)
+                    reader.read_many_sample(
+                        read_buffer,
+                        number_of_samples_per_channel=samples_per_read
+                    )
+                    
+                    # Anchor/drift-check against host clock, then stamp by sample index
+                    sample_clock.observe(task.in_stream.total_samp_per_chan_acquired)
+                    timestamps_ns = sample_clock.timestamps(samples_read, samples_per_read)
+                    samples_read += samples_per_read
+                    
+                    # Convert whole block at once: A to mA, then engineering units
+                    raw_ma = read_buffer * 1000
+                    value = convert_to_engineering_units(raw_ma, scaling)
                     
-                    # Get base timestamp for this batch
-                    now_ns = time.time_ns()
-                    sample_interval_ns = int(1e9 / SAMPLE_RATE)
+                    # Add each output rate's chunk to pending chunks for InfluxDB write
+                    for group in output_groups:
+                        chunk = group.chunk(timestamps_ns, raw_ma)
+                        if chunk is not None:
+                            pending_chunks.append(chunk)
+                    pending_count += samples_per_read
+                    if rollups:
+                        rollups.add(timestamps_ns, (raw_ma, value))
                     
-                    # Process each sample in the batch
-                    for sample_idx in range(samples_per_read):
-                        # Calculate timestamp for this sample
-                        # Samples are evenly spaced, work backwards from now
-                        sample_offset = (samples_per_read - 1 - sample_idx) * sample_interval_ns
-                        timestamp_ns = now_ns - sample_offset
-                        
-                        # Build readings for all channels
-                        readings = {}
-                        ch_idx = 0
-                        
-                        # Process Slot 1
-                        for ch_name, hw_config in slot1_config.items():
-                            current_ma = data[ch_idx][sample_idx] * 1000  # Convert A to mA
-                            label_config = ai_labels.get(ch_name, {})
-                            eng_value = convert_to_engineering_units(current_ma, hw_config, label_config)
-                            readings[ch_name] = {
-                                'value': eng_value,
-                                'raw_ma': current_ma
-                            }
-                            ch_idx += 1
-                        
-                        # Process Slot 4
-                        for ch_name, hw_config in slot4_config.items():
-                            current_ma = data[ch_idx][sample_idx] * 1000
-                            label_config = ai_labels.get(ch_name, {})
-                            eng_value = convert_to_engineering_units(current_ma, hw_config, label_config)
-                            readings[ch_name] = {
-                                'value': eng_value,
-                                'raw_ma': current_ma
-                            }
-                            ch_idx += 1
-                        
-                        sample = {
-                            'timestamp_ns': timestamp_ns,
-                            'readings': readings
-                        }
-                        
-                        # Add to pending samples for InfluxDB write
-                        pending_samples.append(sample)
-                        
-                        # Also add to buffer for /metrics endpoint
-                        with data_lock:
-                            sample_buffer.append(sample)
+                    # Ring for /metrics and /stream keeps every channel at the full rate (lock-free single writer)
+                    sample_ring.append(timestamps_ns, np.concatenate((value, raw_ma)).T)
                     
                     # Write to InfluxDB when we have enough samples
-                    if len(pending_samples) >= write_batch_size:
-                        write_to_influxdb(pending_samples)
-                        pending_samples = []
+                    if pending_count >= write_batch_size:
+                        write_to_influxdb(pending_chunks)
+                        pending_chunks = []
+                        pending_count = 0
         
         except Exception as e:
             device_online = False
@@ -264,30 +332,140 @@ def read_analog_inputs():
             time.sleep(RECONNECT_DELAY)
 
 
-@app.route('/metrics')
-def metrics():
-    """Return all buffered metrics in InfluxDB line protocol format (for debugging)"""
+def format_metrics(timestamps, values):
+    """Format ring snapshot rows as InfluxDB line protocol - one line per channel per sample"""
+    n_channels = len(channel_names)
+    
+    # Format: measurement,tag=value field1=value1,field2=value2 timestamp
+    templates = [f"ni_analog,channel={ch_name} value=%.3f,raw_ma=%.3f %d" for ch_name in channel_names]
+    rows = values.tolist()
+    lines = [
+        templates[ch_idx] % (row[ch_idx], row[n_channels + ch_idx], timestamp_ns)
+        for row, timestamp_ns in zip(rows, timestamps.tolist())
+        for ch_idx in range(n_channels)
+    ]
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+def cursor_response(start_index=None, since_ns=None):
+    """Build /metrics or /latest response from the ring (seq = absolute sample index)"""
     if not device_online:
         return Response("# Device offline\n", status=503, mimetype='text/plain')
     
-    with data_lock:
-        if sample_buffer is None or len(sample_buffer) == 0:
-            return Response("# No data yet\n", status=503, mimetype='text/plain')
+    if sample_ring is None or len(sample_ring) == 0:
+        return Response("# No data yet\n", status=503, mimetype='text/plain')
+    
+    headers = cursor_headers(sample_ring.total - 1)
+    if etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+        return Response(status=304, headers=headers)
+    
+    # Snapshot copy of ring - never blocks the acquisition thread
+    first_index, timestamps, values = sample_ring.snapshot(start_index)
+    headers['X-Last-Seq'] = str(first_index + len(timestamps) - 1)
+    if since_ns is not None:
+        mask = timestamps > since_ns
+        timestamps, values = timestamps[mask], values[mask]
+    
+    return Response(format_metrics(timestamps, values), mimetype='text/plain', headers=headers)
+
+
+@app.route('/metrics')
+def metrics():
+    """Return buffered metrics in InfluxDB line protocol format (?since=<seq> / ?since_ns=<ns> for new samples only)"""
+    try:
+        since_seq, since_ns = parse_cursor(request.args)
+    except ValueError:
+        return Response("# since/since_ns must be integers\n", status=400, mimetype='text/plain')
+    
+    return cursor_response(since_seq + 1 if since_seq is not None else None, since_ns)
+
+
+@app.route('/latest')
+def latest():
+    """Return only the most recent sample in InfluxDB line protocol format"""
+    return cursor_response(sample_ring.total - 1 if sample_ring else None)
+
+
+def stream_frames(ch_indices, decimation):
+    """Generate binary frames of new ring samples for one /stream subscriber"""
+    global stream_clients
+    
+    with stream_lock:
+        stream_clients += 1
+    try:
+        # Start at the next decimation boundary after the newest sample
+        cursor = -(-sample_ring.total // decimation) * decimation
+        period_ns = decimation * 1e9 / (sample_clock.rate if sample_clock else SAMPLE_RATE)
         
-        # Return copy of buffer (don't clear - direct write handles this now)
-        samples = list(sample_buffer)
+        while True:
+            time.sleep(STREAM_POLL_INTERVAL)
+            if sample_ring.total - cursor < decimation:
+                continue
+            
+            first_index, timestamps, values = sample_ring.snapshot(cursor)
+            if first_index > cursor:
+                # Subscriber fell behind the ring - skip to the next aligned block
+                skip = -(-(first_index - cursor) // decimation) * decimation
+                cursor += skip
+                timestamps = timestamps[cursor - first_index:]
+                values = values[cursor - first_index:]
+            
+            n_use = (len(timestamps) // decimation) * decimation
+            if n_use == 0:
+                continue
+            
+            # Boxcar-average each decimation block, keep selected columns only
+            block = values[:n_use, ch_indices].reshape(-1, decimation, len(ch_indices)).mean(axis=1)
+            block_ts = timestamps[:n_use].reshape(-1, decimation).mean(axis=1)
+            frame = np.ascontiguousarray(block.T, dtype='<f4')
+            
+            header = STREAM_HEADER.pack(
+                STREAM_MAGIC, len(ch_indices), decimation, frame.shape[1],
+                cursor, int(block_ts[0]), period_ns
+            )
+            cursor += n_use
+            yield header + frame.tobytes()
+    finally:
+        with stream_lock:
+            stream_clients -= 1
+
+
+@app.route('/stream')
+def stream():
+    """Push stream of binary frames: ?channels=AI01,AI03&decimation=10&field=value|raw_ma"""
+    if not device_online or sample_ring is None:
+        return Response("# Device offline\n", status=503, mimetype='text/plain')
+    
+    field = request.args.get('field', 'value')
+    if field not in ('value', 'raw_ma'):
+        return Response("# field must be value or raw_ma\n", status=400, mimetype='text/plain')
     
-    # Build InfluxDB line protocol - one line per channel per sample
-    lines = []
-    for sample in samples:
-        timestamp_ns = sample['timestamp_ns']
-        for ch_name, data in sample['readings'].items():
-            # Format: measurement,tag=value field1=value1,field2=value2 timestamp
-            line = f"ni_analog,channel={ch_name} value={data['value']:.3f},raw_ma={data['raw_ma']:.3f} {timestamp_ns}"
-            lines.append(line)
+    selected = request.args.get('channels')
+    selected = [ch.strip() for ch in selected.split(',')] if selected else list(channel_names)
+    unknown = [ch for ch in selected if ch not in channel_names]
+    if unknown:
+        return Response(f"# Unknown channels: {','.join(unknown)}\n", status=400, mimetype='text/plain')
     
-    output = '\n'.join(lines) + '\n'
-    return Response(output, mimetype='text/plain')
+    try:
+        decimation = int(request.args.get('decimation', 1))
+    except ValueError:
+        decimation = 0
+    if not 1 <= decimation <= 65535:
+        return Response("# decimation must be an integer 1-65535\n", status=400, mimetype='text/plain')
+    
+    # Ring columns: value AI01-16, then raw_ma AI01-16
+    offset = len(channel_names) if field == 'raw_ma' else 0
+    ch_indices = [offset + channel_names.index(ch) for ch in selected]
+    
+    headers = {
+        'X-Channels': ','.join(selected),
+        'X-Field': field,
+        'X-Frame-Header': 'magic:4s,n_channels:u16,decimation:u16,n_samples:u32,'
+                          'first_seq:u64,first_timestamp_ns:i64,period_ns:f64',
+        'Cache-Control': 'no-cache'
+    }
+    return Response(stream_frames(ch_indices, decimation),
+                    mimetype='application/octet-stream', headers=headers)
 
 
 @app.route('/health')
@@ -295,9 +473,8 @@ def health():
     """Health check endpoint with buffer stats"""
     status = "online" if device_online else "offline"
     
-    with data_lock:
-        buffer_size = len(sample_buffer) if sample_buffer else 0
-        buffer_max = sample_buffer.maxlen if sample_buffer else 0
+    buffer_size = len(sample_ring) if sample_ring else 0
+    buffer_max = sample_ring.capacity if sample_ring else 0
     
     response = {
         'status': status,
@@ -307,8 +484,16 @@ def health():
         'buffer_size': buffer_size,
         'buffer_max': buffer_max,
         'buffer_pct': round(100 * buffer_size / buffer_max, 1) if buffer_max > 0 else 0,
-        'influxdb_enabled': influx_write_api is not None,
-        'points_written': points_written
+        'shared_memory': sample_ring.shm_name if sample_ring else None,
+        'stream_clients': stream_clients,
+        'output_rates': {ch_name: SAMPLE_RATE / group.factor
+                         for group in output_groups for ch_name in group.channels},
+        'rollups': rollups.stats() if rollups else None,
+        'stored_points_per_s': sum(len(group.channels) * SAMPLE_RATE / group.factor for group in output_groups),
+        'influxdb_enabled': influx_writer is not None,
+        'sample_clock': sample_clock.stats() if sample_clock else None,
+        'points_written': influx_writer.points_written if influx_writer else 0,
+        'influxdb_writer': influx_writer.stats() if influx_writer else None
     }
     
     import json
@@ -325,7 +510,7 @@ def main():
     print("NI cDAQ Analog Input HTTP Bridge")
     print(f"Config: {CONFIG_PATH}")
     print(f"Configured rate: {sample_rate} Hz (hardware max: {hw_max} Hz)")
-    print(f"Endpoints: http://localhost:8881/metrics, /health")
+    print(f"Endpoints: http://localhost:8881/metrics, /latest, /stream, /health")
     print()
     
     # Setup InfluxDB direct writes
@@ -336,7 +521,7 @@ def main():
     reader_thread.start()
     
     # Start HTTP server
-    app.run(host='0.0.0.0', port=8881, debug=False)
+    app.run(host='0.0.0.0', port=8881, debug=False, threaded=True)
 
 
 if __name__ == "__main__":
@@ -3,113 +3,68 @@
 Pico TC-08 Thermocouple HTTP Bridge
 Reads 8 thermocouple channels and writes directly to InfluxDB
 Also exposes /metrics endpoint for debugging
+
+The unit runs in streaming mode; each drain copies every buffered reading
+per channel into preallocated buffers in one usb_tc08_get_temp call and
+timestamps samples with the device's own sample times.
 """
 
 import ctypes
-import yaml
 import time
-import os
 import threading
 from collections import deque
-from flask import Flask, Response
-from pathlib import Path
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
+from flask import Flask, Response, request
+from bridge_common import CONFIG_PATH, load_config, get_influx_writer
+from line_protocol import LineProtocolBuffer, tag_prefix
+from metrics_cursor import parse_cursor, etag_matches, select_samples, cursor_headers
+from poll_scheduler import DeadlineScheduler
 
 # Configuration
-CONFIG_PATH = Path(__file__).parent.parent / "config" / "devices.yaml"
 RECONNECT_DELAY = 5  # seconds
+READ_BUFFER = 600  # readings per channel per drain (driver buffers up to 600 per channel)
+USBTC08LINE_BATCH_AND_SERIAL = 4  # usb_tc08_get_unit_info2 line
 
 app = Flask(__name__)
 
 # Global state
-sample_buffer = None  # Will be initialized as deque
-device_online = False
+sample_buffer = None  # Will be initialized as deque (samples from every unit)
 data_lock = threading.Lock()
+sample_seq = 0  # Sequence number of newest buffered sample (cursor for /metrics?since=)
+units = []  # TC08Unit per configured logger
+claimed_serials = set()  # serials configured for a specific unit
+open_lock = threading.Lock()  # open/enumerate one unit at a time
 tc08 = None
-influx_write_api = None
+influx_writer = None
 influx_bucket = None
-points_written = 0
+channel_prefixes = {}  # (unit, channel, type) -> line protocol tag prefix
 
 # Config values loaded at startup
 SAMPLE_RATE = 1
 BUFFER_SECONDS = 2
 
 
-def load_config():
-    """Load configuration from devices.yaml"""
-    with open(CONFIG_PATH, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
-
-
 def setup_influxdb():
-    """Setup InfluxDB client for direct writes"""
-    global influx_write_api, influx_bucket
-    
-    config = load_config()
-    system_config = config.get('system', {})
-    
-    influx_url = system_config.get('influxdb_url', 'http://localhost:8086')
-    influx_org = system_config.get('influxdb_org', 'electrolyzer')
-    influx_bucket = system_config.get('influxdb_bucket', 'electrolyzer_data')
-    
-    # Get token from environment
-    influx_token = os.environ.get('INFLUXDB_ADMIN_TOKEN', '')
+    """Setup InfluxDB writer for direct writes (shared writer when run by bridge_daemon.py)"""
+    global influx_writer, influx_bucket
     
-    if not influx_token:
-        # Try loading from .env file
-        env_path = CONFIG_PATH.parent.parent.parent / ".env"
-        if env_path.exists():
-            with open(env_path) as f:
-                for line in f:
-                    if line.startswith('INFLUXDB_ADMIN_TOKEN='):
-                        influx_token = line.strip().split('=', 1)[1]
-                        break
-    
-    if not influx_token:
-        print("[WARN] INFLUXDB_ADMIN_TOKEN not set - direct writes disabled")
-        return False
-    
-    try:
-        client = InfluxDBClient(url=influx_url, token=influx_token, org=influx_org)
-        influx_write_api = client.write_api(write_options=SYNCHRONOUS)
-        print(f"[OK] Connected to InfluxDB at {influx_url}")
-        return True
-    except Exception as e:
-        print(f"[ERROR] Failed to connect to InfluxDB: {e}")
-        return False
+    influx_writer, influx_bucket = get_influx_writer("pico_tc08_writer")
+    return influx_writer is not None
 
 
-def write_to_influxdb(samples):
-    """Write batch of samples directly to InfluxDB"""
-    global points_written
-    
-    if not influx_write_api or not influx_bucket:
-        return False
-    
-    try:
-        points = []
-        for sample in samples:
-            timestamp_ns = sample['timestamp_ns']
-            for ch_name, data in sample['readings'].items():
-                if data['valid']:
-                    point = Point("tc08") \
-                        .tag("channel", ch_name) \
-                        .tag("type", data['type']) \
-                        .tag("hardware", "pico_tc08") \
-                        .tag("location", "gen3_test_rig") \
-                        .field("temp_c", float(data['value'])) \
-                        .time(timestamp_ns, WritePrecision.NS)
-                    points.append(point)
-        
-        if points:
-            influx_write_api.write(bucket=influx_bucket, record=points)
-            points_written += len(points)
-        return True
-    except Exception as e:
-        print(f"[ERROR] InfluxDB write failed: {e}")
-        return False
+def get_channel_prefix(unit, ch_name, tc_type):
+    """Get (cached) line protocol tag prefix for a thermocouple channel"""
+    key = (unit, ch_name, tc_type)
+    prefix = channel_prefixes.get(key)
+    if prefix is None:
+        prefix = tag_prefix("tc08", {
+            'channel': ch_name,
+            'type': tc_type,
+            'unit': unit,
+            'hardware': "pico_tc08",
+            'location': "gen3_test_rig"
+        })
+        channel_prefixes[key] = prefix
+    return prefix
 
 
 def setup_dll(dll_path):
@@ -150,171 +105,382 @@ def setup_dll(dll_path):
     dll.usb_tc08_close_unit.argtypes = [ctypes.c_int16]
     dll.usb_tc08_close_unit.restype = ctypes.c_int16
     
+    dll.usb_tc08_get_unit_info2.argtypes = [
+        ctypes.c_int16,    # handle
+        ctypes.c_char_p,   # string
+        ctypes.c_int16,    # string length
+        ctypes.c_int16     # line
+    ]
+    dll.usb_tc08_get_unit_info2.restype = ctypes.c_int16
+    
     return dll
 
 
+class ChannelBuffers:
+    """Reusable ctypes buffers for draining one channel"""
+    
+    def __init__(self, length=READ_BUFFER):
+        self.length = length
+        self.temps = (ctypes.c_float * length)()
+        self.times = (ctypes.c_int32 * length)()  # ms since usb_tc08_run
+        self.overflow = ctypes.c_int16(0)
+
+
+def drain_channel(handle, ch_num, buffers):
+    """Copy every buffered reading of one channel into its buffers
+
+    Args:
+        handle: TC-08 unit handle
+        ch_num: Channel number (0 = cold junction, 1-8 thermocouples)
+        buffers: ChannelBuffers for this channel
+
+    Returns:
+        (number of readings, overflow flag)
+    """
+    count = tc08.usb_tc08_get_temp(
+        handle,
+        buffers.temps,
+        buffers.times,
+        buffers.length,
+        ctypes.byref(buffers.overflow),
+        ctypes.c_int16(ch_num),
+        ctypes.c_int16(0),  # 0 = Celsius
+        ctypes.c_int16(0)   # no trigger
+    )
+    if count < 0:
+        raise RuntimeError(f"usb_tc08_get_temp failed on channel {ch_num}")
+    return count, bool(buffers.overflow.value)
+
+
+class TC08Unit:
+    """One TC-08 logger driven by its own acquisition worker"""
+    
+    def __init__(self, name, serial, channels_config, sample_interval_ms, drain_interval, align_timestamps):
+        self.name = name
+        self.serial = serial  # configured serial ("" = first unclaimed unit)
+        self.channels_config = channels_config
+        self.sample_interval_ms = sample_interval_ms
+        self.drain_interval = drain_interval
+        self.align_ns = sample_interval_ms * 1_000_000 if align_timestamps else None
+        self.scheduler = DeadlineScheduler(1.0 / drain_interval)
+        self.channel_buffers = {ch_name: ChannelBuffers() for ch_name in channels_config}
+        self.line_buffer = LineProtocolBuffer()  # per unit - workers write concurrently
+        
+        self.handle = None
+        self.unit_serial = None  # serial reported by the opened unit
+        self.online = False
+        self.overflows = {ch_name: 0 for ch_name in channels_config}
+        self.readings_drained = 0
+        self.samples = 0
+        self._sample_times = deque(maxlen=64)  # device sample times (ns) for throughput
+    
+    def open(self):
+        """Open this unit (matched by serial) and start streaming"""
+        self.handle, self.unit_serial = open_unit(self.serial)
+        print(f"[OK] Connected to Pico TC-08 {self.name} (serial={self.unit_serial}, handle={self.handle})")
+        
+        # Configure cold junction (channel 0)
+        tc08.usb_tc08_set_channel(self.handle, 0, ctypes.c_char(b'C'))
+        
+        # Configure thermocouple channels
+        for ch_name, ch_config in self.channels_config.items():
+            ch_num = ch_config['channel']
+            tc_type = ch_config['type'].encode('ascii')
+            tc08.usb_tc08_set_channel(self.handle, ch_num, ctypes.c_char(tc_type))
+        
+        # Start streaming - device sample times are ms since this call
+        run_start_ns = time.time_ns()
+        actual_interval = tc08.usb_tc08_run(self.handle, self.sample_interval_ms)
+        if actual_interval <= 0:
+            raise RuntimeError("Failed to start streaming")
+        self.run_start_ns = (run_start_ns + time.time_ns()) // 2
+        
+        print(f"  {self.name}: sampling at {actual_interval} ms intervals, draining every {self.drain_interval}s")
+    
+    def close(self):
+        """Stop streaming and release the unit"""
+        if self.handle and self.handle > 0:
+            try:
+                tc08.usb_tc08_stop(self.handle)
+                tc08.usb_tc08_close_unit(self.handle)
+            except:
+                pass
+        self.handle = None
+    
+    def drain(self):
+        """Drain every channel once; returns samples ordered by device time"""
+        by_time = {}  # device time (ms) -> readings
+        
+        for ch_name, ch_config in self.channels_config.items():
+            buffers = self.channel_buffers[ch_name]
+            count, overflow = drain_channel(self.handle, ch_config['channel'], buffers)
+            self.readings_drained += count
+            if overflow:
+                self.overflows[ch_name] += 1
+                print(f"[WARN] TC-08 {self.name} buffer overflow on {ch_name} - readings lost")
+            
+            for i in range(count):
+                temp_c = buffers.temps[i]
+                
+                # Filter invalid readings
+                # TC-08 returns large negative values for open/failed thermocouples
+                valid = -200 < temp_c < 1500  # Valid range for K-type
+                by_time.setdefault(buffers.times[i], {})[ch_name] = {
+                    'value': temp_c if valid else None,
+                    'type': ch_config['type'],
+                    'valid': valid
+                }
+        
+        samples = []
+        for time_ms in sorted(by_time):
+            timestamp_ns = self.run_start_ns + time_ms * 1_000_000
+            self._sample_times.append(timestamp_ns)
+            if self.align_ns:
+                # Snap to the sample grid so every unit's readings share timestamps
+                timestamp_ns = (timestamp_ns + self.align_ns // 2) // self.align_ns * self.align_ns
+            samples.append({
+                'timestamp_ns': timestamp_ns,
+                'unit': self.name,
+                'readings': by_time[time_ms]
+            })
+        self.samples += len(samples)
+        return samples
+    
+    def write_to_influxdb(self, samples):
+        """Write batch of this unit's samples directly to InfluxDB"""
+        if not influx_writer:
+            return False
+        
+        try:
+            self.line_buffer.clear()
+            for sample in samples:
+                timestamp_ns = sample['timestamp_ns']
+                for ch_name, data in sample['readings'].items():
+                    if data['valid']:
+                        self.line_buffer.add_point(
+                            get_channel_prefix(sample['unit'], ch_name, data['type']),
+                            {'temp_c': data['value']},
+                            timestamp_ns
+                        )
+            
+            if self.line_buffer.points:
+                influx_writer.submit(self.line_buffer.getvalue(), self.line_buffer.points)
+            return True
+        except Exception as e:
+            print(f"[ERROR] InfluxDB write failed: {e}")
+            return False
+    
+    def run(self):
+        """Acquisition worker: open, drain and publish until the unit fails, then reopen"""
+        global sample_seq
+        
+        write_batch_size = max(1, SAMPLE_RATE)  # Write every ~1 second
+        pending_samples = []
+        
+        while True:
+            try:
+                self.open()
+                self.online = True
+                
+                # Drain loop (one scheduler slot per drain)
+                self.scheduler.reset()
+                while True:
+                    self.scheduler.wait()
+                    self.scheduler.begin_io()
+                    samples = self.drain()
+                    self.scheduler.end_io()
+                    
+                    # Add to pending samples for InfluxDB write
+                    pending_samples.extend(samples)
+                    
+                    # Add to buffer for /metrics endpoint
+                    with data_lock:
+                        for sample in samples:
+                            sample_seq += 1
+                            sample['seq'] = sample_seq
+                            sample_buffer.append(sample)
+                    
+                    # Write to InfluxDB when we have enough samples
+                    if len(pending_samples) >= write_batch_size:
+                        self.write_to_influxdb(pending_samples)
+                        pending_samples = []
+            
+            except Exception as e:
+                self.online = False
+                print(f"[ERROR] TC-08 {self.name} offline: {e}")
+                self.close()
+                print(f"  Retrying in {RECONNECT_DELAY}s...")
+                time.sleep(RECONNECT_DELAY)
+    
+    def sample_rate(self):
+        """Samples per second over recent device sample times"""
+        times = self._sample_times
+        if len(times) < 2 or times[-1] <= times[0]:
+            return None
+        return (len(times) - 1) * 1e9 / (times[-1] - times[0])
+    
+    def health(self):
+        """Per-unit status and throughput"""
+        rate = self.sample_rate()
+        return {
+            'status': 'online' if self.online else 'offline',
+            'serial': self.unit_serial or self.serial or None,
+            'handle': self.handle,
+            'channels': list(self.channels_config),
+            'samples': self.samples,
+            'sample_rate': round(rate, 3) if rate else None,
+            'readings_drained': self.readings_drained,
+            'overflows': self.overflows,
+            'scheduler': self.scheduler.stats()
+        }
+
+
+def unit_serial(handle):
+    """Batch/serial string of an open unit"""
+    info = ctypes.create_string_buffer(256)
+    tc08.usb_tc08_get_unit_info2(handle, info, len(info), USBTC08LINE_BATCH_AND_SERIAL)
+    return info.value.decode('ascii', 'replace').strip()
+
+
+def open_unit(serial):
+    """Open the TC-08 with the given serial ("" = first unit not claimed by another config entry)
+
+    usb_tc08_open_unit() returns the next unopened unit, so units are opened
+    in turn until the match is found; the others are closed again.
+
+    Returns:
+        (handle, serial)
+    """
+    with open_lock:
+        others = []
+        try:
+            while True:
+                handle = tc08.usb_tc08_open_unit()
+                if handle <= 0:
+                    raise RuntimeError(f"TC-08 {serial or '(any)'} not found")
+                found = unit_serial(handle)
+                if found == serial or (not serial and found not in claimed_serials):
+                    return handle, found
+                others.append(handle)
+        finally:
+            for handle in others:
+                tc08.usb_tc08_close_unit(handle)
+
+
+def configured_units(config):
+    """Unit list from devices.Pico_TC08.units (default: one unit with Pico_TC08_Channels)"""
+    pico_config = config['devices']['Pico_TC08']
+    units = pico_config.get('units') or [{'name': "TC08_1", 'serial': "", 'channels': "Pico_TC08_Channels"}]
+    return [(unit['name'], str(unit.get('serial') or ""), config['modules'][unit['channels']])
+            for unit in units]
+
+
 def read_thermocouples():
-    """Continuously read thermocouples from Pico TC-08 and write to InfluxDB"""
-    global sample_buffer, device_online, tc08, SAMPLE_RATE, BUFFER_SECONDS
+    """Start one acquisition worker per TC-08 unit and write to InfluxDB"""
+    global sample_buffer, tc08, units, claimed_serials, SAMPLE_RATE, BUFFER_SECONDS
     
     config = load_config()
     dll_path = config['devices']['Pico_TC08']['dll_path']
-    channels_config = config['modules']['Pico_TC08_Channels']
     
     # Load bridge config
     bridge_config = config.get('bridges', {}).get('pico_tc08', {})
     SAMPLE_RATE = bridge_config.get('sample_rate', 1)
     BUFFER_SECONDS = bridge_config.get('buffer_seconds', 2)
     
-    # Initialize ring buffer with max size
-    max_samples = SAMPLE_RATE * BUFFER_SECONDS
-    sample_buffer = deque(maxlen=max_samples)
-    
-    # Write batch size (write to InfluxDB every N samples)
-    write_batch_size = max(1, SAMPLE_RATE)  # Write every ~1 second
-    pending_samples = []
-    
     # Calculate sample interval in ms (hardware minimum is 1000ms)
     sample_interval_ms = max(1000, int(1000 / SAMPLE_RATE))
     
+    # Drain each unit's driver buffer every drain_interval seconds (samples keep device times)
+    drain_interval = bridge_config.get('drain_interval', 1.0)
+    align_timestamps = bridge_config.get('align_timestamps', True)
+    units = [TC08Unit(name, serial, channels, sample_interval_ms, drain_interval, align_timestamps)
+             for name, serial, channels in configured_units(config)]
+    claimed_serials = {unit.serial for unit in units if unit.serial}
+    
+    # Initialize ring buffer with max size (all units share it)
+    max_samples = SAMPLE_RATE * BUFFER_SECONDS * len(units)
+    sample_buffer = deque(maxlen=max_samples)
+    
     print(f"Sample rate: {SAMPLE_RATE} Hz")
+    print(f"Units: {', '.join(unit.name + ' (' + (unit.serial or 'first found') + ')' for unit in units)}")
     print(f"Buffer size: {max_samples} samples ({BUFFER_SECONDS}s)")
-    print(f"InfluxDB write batch: {write_batch_size} samples")
     
     tc08 = setup_dll(dll_path)
     
-    while True:
-        handle = None
-        try:
-            # Open device
-            handle = tc08.usb_tc08_open_unit()
-            if handle <= 0:
-                raise RuntimeError("TC-08 not found")
-            
-            print(f"[OK] Connected to Pico TC-08 (handle={handle})")
-            
-            # Configure cold junction (channel 0)
-            tc08.usb_tc08_set_channel(handle, 0, ctypes.c_char(b'C'))
-            
-            # Configure thermocouple channels
-            for ch_name, ch_config in channels_config.items():
-                ch_num = ch_config['channel']
-                tc_type = ch_config['type'].encode('ascii')
-                tc08.usb_tc08_set_channel(handle, ch_num, ctypes.c_char(tc_type))
-            
-            # Start streaming
-            actual_interval = tc08.usb_tc08_run(handle, sample_interval_ms)
-            if actual_interval <= 0:
-                raise RuntimeError("Failed to start streaming")
-            
-            print(f"  Sampling at {actual_interval} ms intervals")
-            device_online = True
-            
-            # Read loop
-            while True:
-                readings = {}
-                overflow = ctypes.c_int16(0)
-                
-                for ch_name, ch_config in channels_config.items():
-                    ch_num = ch_config['channel']
-                    
-                    # Prepare buffers
-                    temp_buffer = (ctypes.c_float * 1)()
-                    time_buffer = (ctypes.c_int32 * 1)()
-                    
-                    # Read temperature
-                    result = tc08.usb_tc08_get_temp(
-                        handle,
-                        temp_buffer,
-                        time_buffer,
-                        1,  # one reading
-                        ctypes.byref(overflow),
-                        ctypes.c_int16(ch_num),
-                        ctypes.c_int16(0),  # 0 = Celsius
-                        ctypes.c_int16(0)   # no trigger
-                    )
-                    
-                    temp_c = temp_buffer[0]
-                    
-                    # Filter invalid readings
-                    # TC-08 returns large negative values for open/failed thermocouples
-                    if -200 < temp_c < 1500:  # Valid range for K-type
-                        readings[ch_name] = {
-                            'value': temp_c,
-                            'type': ch_config['type'],
-                            'valid': True
-                        }
-                    else:
-                        readings[ch_name] = {
-                            'value': None,
-                            'type': ch_config['type'],
-                            'valid': False
-                        }
-                
-                sample = {
-                    'timestamp_ns': time.time_ns(),
-                    'readings': readings
-                }
-                
-                # Add to pending samples for InfluxDB write
-                pending_samples.append(sample)
-                
-                # Add to buffer for /metrics endpoint
-                with data_lock:
-                    sample_buffer.append(sample)
-                
-                # Write to InfluxDB when we have enough samples
-                if len(pending_samples) >= write_batch_size:
-                    write_to_influxdb(pending_samples)
-                    pending_samples = []
-                
-                time.sleep(sample_interval_ms / 1000.0)
-        
-        except Exception as e:
-            device_online = False
-            print(f"[ERROR] Device offline: {e}")
-            
-            # Clean up
-            if handle and handle > 0:
-                try:
-                    tc08.usb_tc08_stop(handle)
-                    tc08.usb_tc08_close_unit(handle)
-                except:
-                    pass
-            
-            print(f"  Retrying in {RECONNECT_DELAY}s...")
-            time.sleep(RECONNECT_DELAY)
+    workers = [threading.Thread(target=unit.run, name=f"tc08_{unit.name}", daemon=True) for unit in units]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
 
 
-@app.route('/metrics')
-def metrics():
-    """Return buffered metrics in InfluxDB line protocol format (for debugging)"""
-    if not device_online:
-        return Response("# Device offline\n", status=503, mimetype='text/plain')
-    
-    with data_lock:
-        if sample_buffer is None or len(sample_buffer) == 0:
-            return Response("# No data yet\n", status=503, mimetype='text/plain')
-        
-        samples = list(sample_buffer)
-    
-    # Build InfluxDB line protocol - one line per channel per sample
+def format_metrics(samples):
+    """Format samples as InfluxDB line protocol - one line per channel per sample"""
     lines = []
     for sample in samples:
         timestamp_ns = sample['timestamp_ns']
         for ch_name, data in sample['readings'].items():
             if data['valid']:
-                line = f"tc08,channel={ch_name},type={data['type']} temp_c={data['value']:.2f} {timestamp_ns}"
+                line = f"tc08,channel={ch_name},type={data['type']},unit={sample['unit']} temp_c={data['value']:.2f} {timestamp_ns}"
                 lines.append(line)
+    return lines
+
+
+def cursor_response(since_seq=None, since_ns=None, latest_only=False):
+    """Build /metrics or /latest response from the sample buffer"""
+    if not any(unit.online for unit in units):
+        return Response("# Device offline\n", status=503, mimetype='text/plain')
     
-    output = '\n'.join(lines) + '\n' if lines else "# No valid readings\n"
-    return Response(output, mimetype='text/plain')
+    with data_lock:
+        if sample_buffer is None or len(sample_buffer) == 0:
+            return Response("# No data yet\n", status=503, mimetype='text/plain')
+        
+        headers = cursor_headers(sample_buffer[-1]['seq'])
+        if etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+            return Response(status=304, headers=headers)
+        
+        if latest_only:
+            # Newest sample of each unit, in buffer order
+            newest = {}
+            for sample in reversed(sample_buffer):
+                newest.setdefault(sample['unit'], sample)
+                if len(newest) == len(units):
+                    break
+            samples = sorted(newest.values(), key=lambda sample: sample['seq'])
+        else:
+            samples = list(sample_buffer)
+    
+    lines = format_metrics(select_samples(samples, since_seq, since_ns))
+    if lines:
+        output = '\n'.join(lines) + '\n'
+    else:
+        output = "# No valid readings\n" if since_seq is None and since_ns is None else ''
+    return Response(output, mimetype='text/plain', headers=headers)
+
+
+@app.route('/metrics')
+def metrics():
+    """Return buffered metrics in InfluxDB line protocol format (?since=<seq> / ?since_ns=<ns> for new samples only)"""
+    try:
+        since_seq, since_ns = parse_cursor(request.args)
+    except ValueError:
+        return Response("# since/since_ns must be integers\n", status=400, mimetype='text/plain')
+    
+    return cursor_response(since_seq, since_ns)
+
+
+@app.route('/latest')
+def latest():
+    """Return only the most recent sample of each unit in InfluxDB line protocol format"""
+    return cursor_response(latest_only=True)
 
 
 @app.route('/health')
 def health():
     """Health check endpoint with buffer stats"""
-    status = "online" if device_online else "offline"
+    online = sum(1 for unit in units if unit.online)
+    status = "online" if online else "offline"
+    rates = [unit.sample_rate() for unit in units]
     
     with data_lock:
         buffer_size = len(sample_buffer) if sample_buffer else 0
@@ -322,14 +488,18 @@ def health():
     
     response = {
         'status': status,
-        'device_online': device_online,
+        'device_online': online > 0,
+        'units_online': online,
         'sample_rate': SAMPLE_RATE,
         'buffer_seconds': BUFFER_SECONDS,
         'buffer_size': buffer_size,
         'buffer_max': buffer_max,
         'buffer_pct': round(100 * buffer_size / buffer_max, 1) if buffer_max > 0 else 0,
-        'influxdb_enabled': influx_write_api is not None,
-        'points_written': points_written
+        'units': {unit.name: unit.health() for unit in units},
+        'combined_samples_per_s': round(sum(rate for rate in rates if rate), 3),
+        'influxdb_enabled': influx_writer is not None,
+        'points_written': influx_writer.points_written if influx_writer else 0,
+        'influxdb_writer': influx_writer.stats() if influx_writer else None
     }
     
     import json
@@ -346,7 +516,7 @@ def main():
     print("Pico TC-08 Thermocouple HTTP Bridge (Direct InfluxDB)")
     print(f"Config: {CONFIG_PATH}")
     print(f"Configured rate: {sample_rate} Hz (hardware max: {hw_max} Hz)")
-    print(f"Endpoints: http://localhost:8882/metrics, /health")
+    print(f"Endpoints: http://localhost:8882/metrics, /latest, /health")
     print()
     
     # Setup InfluxDB direct writes
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Deadline Scheduler for Polled Bridges
+Fires poll slots on absolute deadlines (start + n * period) instead of
+sleeping a fixed period after the I/O, so the achieved rate matches the
+configured rate regardless of I/O latency. Slots that have already passed
+are skipped and counted, never bunched up. Samples are stamped at the
+midpoint of their I/O window.
+
+    scheduler = DeadlineScheduler(SAMPLE_RATE)
+    while True:
+        scheduler.wait()
+        scheduler.begin_io()
+        ...read hardware...
+        timestamp_ns = scheduler.end_io()
+"""
+
+import time
+from collections import deque
+
+WINDOW = 256  # slots kept for rate / jitter percentiles
+OVERRUN_BUCKETS = (0.25, 0.5, 0.75, 1.0)  # I/O duration as a fraction of the period
+
+
+class DeadlineScheduler:
+    """Absolute-deadline poll pacing with jitter and overrun stats"""
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.period = 1.0 / self.rate
+        self._next = None  # monotonic deadline of the next slot
+        self._io_start_ns = None
+        self._io_start = None
+
+        # Stats
+        self._fire_times = deque(maxlen=WINDOW)
+        self._jitter = deque(maxlen=WINDOW)     # s late vs deadline
+        self._io_times = deque(maxlen=WINDOW)   # s per I/O window
+        self.slots = 0
+        self.missed_slots = 0
+        self.overrun_histogram = [0] * (len(OVERRUN_BUCKETS) + 1)
+
+    def reset(self):
+        """Restart the slot grid (call after a reconnect)"""
+        self._next = None
+
+    def wait(self, wake=None):
+        """Sleep until the next slot deadline, skipping slots already missed
+
+        Args:
+            wake: Optional threading.Event (e.g. CommandLane.pending); if it is
+                  set before the deadline, returns early without firing the slot
+
+        Returns:
+            True when the slot fired, False if woken early
+        """
+        now = time.monotonic()
+        if self._next is None:
+            self._next = now
+        elif now >= self._next + self.period:
+            # At least one whole slot passed during the last I/O - drop it
+            missed = int((now - self._next) // self.period)
+            self.missed_slots += missed
+            self._next += missed * self.period
+
+        delay = self._next - now
+        if delay > 0:
+            if wake is None:
+                time.sleep(delay)
+            elif wake.wait(delay):
+                return False
+
+        fired = time.monotonic()
+        self._jitter.append(max(0.0, fired - self._next))
+        self._fire_times.append(fired)
+        self.slots += 1
+        self._next += self.period
+        return True
+
+    def begin_io(self):
+        """Mark the start of the slot's hardware I/O"""
+        self._io_start_ns = time.time_ns()
+        self._io_start = time.perf_counter()
+
+    def end_io(self):
+        """Mark the end of the I/O window
+
+        Returns:
+            Sample timestamp (ns) - midpoint of the I/O window
+        """
+        elapsed = time.perf_counter() - self._io_start
+        self._io_times.append(elapsed)
+
+        fraction = elapsed / self.period
+        for i, limit in enumerate(OVERRUN_BUCKETS):
+            if fraction < limit:
+                self.overrun_histogram[i] += 1
+                break
+        else:
+            self.overrun_histogram[-1] += 1
+
+        return self._io_start_ns + int(elapsed * 5e8)
+
+    def achieved_rate(self):
+        """Slots fired per second over the stats window"""
+        times = self._fire_times
+        if len(times) < 2 or times[-1] <= times[0]:
+            return None
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def stats(self):
+        """Rate, jitter and overrun stats for /health"""
+        jitter = sorted(self._jitter)
+        io_times = sorted(self._io_times)
+        rate = self.achieved_rate()
+
+        def pct_ms(values, pct):
+            if not values:
+                return None
+            return round(values[min(len(values) - 1, int(len(values) * pct / 100))] * 1000, 2)
+
+        labels = [f"<{int(limit * 100)}%" for limit in OVERRUN_BUCKETS] + [f">={int(OVERRUN_BUCKETS[-1] * 100)}%"]
+        return {
+            'target_rate': self.rate,
+            'achieved_rate': round(rate, 3) if rate else None,
+            'slots': self.slots,
+            'missed_slots': self.missed_slots,
+            'jitter_p50_ms': pct_ms(jitter, 50),
+            'jitter_p95_ms': pct_ms(jitter, 95),
+            'jitter_max_ms': round(jitter[-1] * 1000, 2) if jitter else None,
+            'io_p50_ms': pct_ms(io_times, 50),
+            'io_p95_ms': pct_ms(io_times, 95),
+            'overrun_histogram': dict(zip(labels, self.overrun_histogram))
+        }
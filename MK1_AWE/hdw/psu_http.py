@@ -5,21 +5,16 @@ Reads PSU data via RS485/USB and writes directly to InfluxDB
 Also exposes /metrics endpoint for debugging and /command for control
 """
 
-import minimalmodbus
-import yaml
 import time
-import os
 import threading
-import queue
 from collections import deque
 from flask import Flask, Response, request, jsonify
-from pathlib import Path
-from influxdb_client import InfluxDBClient, Point, WritePrecision
-from influxdb_client.client.write_api import SYNCHRONOUS
-
-# Configuration
-CONFIG_PATH = Path(__file__).parent.parent / "config" / "devices.yaml"
-RECONNECT_DELAY = 5  # seconds
+from bridge_common import CONFIG_PATH, load_config, get_influx_writer
+from line_protocol import LineProtocolBuffer, tag_prefix
+from metrics_cursor import parse_cursor, etag_matches, select_samples, cursor_headers
+from poll_scheduler import DeadlineScheduler
+from modbus_rtu import RTUSession
+from command_lane import CommandLane
 
 app = Flask(__name__)
 
@@ -27,105 +22,127 @@ app = Flask(__name__)
 sample_buffer = None  # Will be initialized as deque
 device_online = False
 data_lock = threading.Lock()
-command_queue = queue.Queue()
-influx_write_api = None
+sample_seq = 0  # Sequence number of newest buffered sample (cursor for /metrics?since=)
+scheduler = None  # DeadlineScheduler pacing the read loop
+rtu_session = None  # RTUSession - persistent PSU serial port
+command_lane = CommandLane("psu")  # /command -> device thread, ahead of the next read
+influx_writer = None
 influx_bucket = None
-points_written = 0
+line_buffer = LineProtocolBuffer()
+PSU_PREFIX = tag_prefix("psu", {'hardware': "psu", 'location': "gen3_test_rig"})
+PSU_FIELDS = ('voltage', 'current', 'power', 'capacity', 'runtime', 'battery_v',
+              'temperature', 'status', 'set_voltage_rb', 'set_current_rb',
+              'output_enable', 'sys_fault', 'mod_fault')
 
 # Config values loaded at startup
 SAMPLE_RATE = 8
 BUFFER_SECONDS = 2
-
-
-def load_config():
-    """Load configuration from devices.yaml"""
-    with open(CONFIG_PATH, 'r') as f:
-        config = yaml.safe_load(f)
-    return config
+MULTI_REGISTER_WRITE = False  # setpoints in one function-16 write instead of three
+WRITE_GAP = 0.1  # seconds between single-register setpoint writes
+VERIFY_RETRIES = 3  # readback attempts before a command is reported unverified
+VERIFY_DELAY = 0.05  # seconds between readback attempts
 
 
 def setup_influxdb():
-    """Setup InfluxDB client for direct writes"""
-    global influx_write_api, influx_bucket
-    
-    config = load_config()
-    system_config = config.get('system', {})
-    
-    influx_url = system_config.get('influxdb_url', 'http://localhost:8086')
-    influx_org = system_config.get('influxdb_org', 'electrolyzer')
-    influx_bucket = system_config.get('influxdb_bucket', 'electrolyzer_data')
-    
-    # Get token from environment
-    influx_token = os.environ.get('INFLUXDB_ADMIN_TOKEN', '')
-    
-    if not influx_token:
-        # Try loading from .env file
-        env_path = CONFIG_PATH.parent.parent.parent / ".env"
-        if env_path.exists():
-            with open(env_path) as f:
-                for line in f:
-                    if line.startswith('INFLUXDB_ADMIN_TOKEN='):
-                        influx_token = line.strip().split('=', 1)[1]
-                        break
-    
-    if not influx_token:
-        print("[WARN] INFLUXDB_ADMIN_TOKEN not set - direct writes disabled")
-        return False
+    """Setup InfluxDB writer for direct writes (shared writer when run by bridge_daemon.py)"""
+    global influx_writer, influx_bucket
     
-    try:
-        client = InfluxDBClient(url=influx_url, token=influx_token, org=influx_org)
-        influx_write_api = client.write_api(write_options=SYNCHRONOUS)
-        print(f"[OK] Connected to InfluxDB at {influx_url}")
-        return True
-    except Exception as e:
-        print(f"[ERROR] Failed to connect to InfluxDB: {e}")
-        return False
+    influx_writer, influx_bucket = get_influx_writer("psu_writer")
+    return influx_writer is not None
 
 
 def write_to_influxdb(samples):
     """Write batch of samples directly to InfluxDB"""
-    global points_written
-    
-    if not influx_write_api or not influx_bucket:
+    if not influx_writer:
         return False
     
     try:
-        points = []
+        line_buffer.clear()
         for sample in samples:
-            timestamp_ns = sample['timestamp_ns']
             readings = sample['readings']
-            
             # All fields as float to match existing InfluxDB schema
-            point = Point("psu") \
-                .tag("hardware", "psu") \
-                .tag("location", "gen3_test_rig") \
-                .field("voltage", float(readings['voltage'])) \
-                .field("current", float(readings['current'])) \
-                .field("power", float(readings['power'])) \
-                .field("capacity", float(readings['capacity'])) \
-                .field("runtime", float(readings['runtime'])) \
-                .field("battery_v", float(readings['battery_v'])) \
-                .field("temperature", float(readings['temperature'])) \
-                .field("status", float(readings['status'])) \
-                .field("set_voltage_rb", float(readings['set_voltage_rb'])) \
-                .field("set_current_rb", float(readings['set_current_rb'])) \
-                .field("output_enable", float(readings['output_enable'])) \
-                .field("sys_fault", float(readings['sys_fault'])) \
-                .field("mod_fault", float(readings['mod_fault'])) \
-                .time(timestamp_ns, WritePrecision.NS)
-            points.append(point)
+            line_buffer.add_point(
+                PSU_PREFIX,
+                {field: readings[field] for field in PSU_FIELDS},
+                sample['timestamp_ns']
+            )
         
-        influx_write_api.write(bucket=influx_bucket, record=points)
-        points_written += len(points)
+        influx_writer.submit(line_buffer.getvalue(), line_buffer.points)
         return True
     except Exception as e:
         print(f"[ERROR] InfluxDB write failed: {e}")
         return False
 
 
+def verify_setpoints(psu, expected):
+    """Read back setpoint registers (0x000B-0x000D) and compare to written values
+
+    Args:
+        psu: RTUSession
+        expected: Dict of readback index (0=voltage, 1=current, 2=enable) -> raw value
+
+    Returns:
+        (readback dict, verified) - raw values within 1 LSB count as verified
+    """
+    for attempt in range(VERIFY_RETRIES):
+        raw = psu.read_registers(0x000B, 3)
+        verified = all(abs(raw[index] - value) <= 1 for index, value in expected.items())
+        if verified or attempt == VERIFY_RETRIES - 1:
+            break
+        time.sleep(VERIFY_DELAY)
+    
+    readback = {
+        'set_voltage_rb': raw[0] * 0.1,
+        'set_current_rb': raw[1] * 0.1,
+        'output_enable': raw[2]
+    }
+    return readback, verified
+
+
+def execute_command(psu, cmd):
+    """Execute one /command payload on the device thread
+
+    Args:
+        psu: RTUSession
+        cmd: Command dict ({'type': 'set_voltage_current'|'enable'|'disable', ...})
+
+    Returns:
+        (readback dict, verified)
+    """
+    cmd_type = cmd.get('type')
+    
+    if cmd_type == 'set_voltage_current':
+        voltage = cmd['voltage']
+        current = cmd['current']
+        enable = int(cmd['enable'])
+        values = [int(round(voltage / 0.1)), int(round(current / 0.1)), enable]
+        if MULTI_REGISTER_WRITE:
+            psu.write_registers(0x0101, values)
+        else:
+            for offset, value in enumerate(values):
+                if offset:
+                    time.sleep(WRITE_GAP)
+                psu.write_register(0x0101 + offset, value)
+        readback, verified = verify_setpoints(psu, dict(enumerate(values)))
+        print(f"[OK] Set: {voltage:.1f}V, {current:.1f}A, {'ON' if enable else 'OFF'}"
+              f"{'' if verified else ' [WARN] readback mismatch'}")
+    
+    elif cmd_type in ('enable', 'disable'):
+        enable = 1 if cmd_type == 'enable' else 0
+        psu.write_register(0x0103, enable)
+        readback, verified = verify_setpoints(psu, {2: enable})
+        print(f"[OK] Output {cmd_type}d{'' if verified else ' [WARN] readback mismatch'}")
+    
+    else:
+        raise ValueError(f"Unknown command type: {cmd_type}")
+    
+    return readback, verified
+
+
 def read_psu_data():
     """Continuously read PSU data via Modbus RTU and write to InfluxDB"""
-    global sample_buffer, device_online, SAMPLE_RATE, BUFFER_SECONDS
+    global sample_buffer, sample_seq, device_online, scheduler, rtu_session, SAMPLE_RATE, BUFFER_SECONDS
+    global MULTI_REGISTER_WRITE, WRITE_GAP
     
     config = load_config()
     psu_config = config['devices']['PSU']
@@ -134,10 +151,13 @@ def read_psu_data():
     bridge_config = config.get('bridges', {}).get('psu', {})
     SAMPLE_RATE = bridge_config.get('sample_rate', 8)
     BUFFER_SECONDS = bridge_config.get('buffer_seconds', 2)
+    MULTI_REGISTER_WRITE = bridge_config.get('multi_register_write', False)
+    WRITE_GAP = bridge_config.get('write_gap', 0.1)
     
     # Initialize ring buffer with max size
     max_samples = SAMPLE_RATE * BUFFER_SECONDS
     sample_buffer = deque(maxlen=max_samples)
+    scheduler = DeadlineScheduler(SAMPLE_RATE)
     
     # Write batch size (write to InfluxDB every N samples)
     write_batch_size = SAMPLE_RATE  # Write every ~1 second
@@ -153,111 +173,91 @@ def read_psu_data():
     print(f"Buffer size: {max_samples} samples ({BUFFER_SECONDS}s)")
     print(f"InfluxDB write batch: {write_batch_size} samples")
     
+    # Port stays open between calls; USB adapter failures reopen it with backoff
+    reuse_port = bridge_config.get('reuse_port', True)
+    rtu_session = RTUSession(com_port, psu_config['slave_id'], psu_config['baud_rate'],
+                             psu_config['timeout'], reuse_port, bridge_config.get('rtu_session', {}))
+    psu = rtu_session
+    print(f"Serial port: {'persistent' if reuse_port else 'reopened per call'}")
+    
+    print(f"Attempting connection to PSU on {com_port}...")
+    
+    # Read loop (one scheduler slot per sample); commands wake the
+    # wait and run immediately instead of waiting for the next slot.
+    # The session absorbs transient errors (single no-response, slave
+    # exceptions) and owns reopen timing: the PSU only goes offline while
+    # it reports the port down, and retries follow its backoff.
+    scheduler.reset()
     while True:
-        psu = None
         try:
-            # Connect to PSU
-            psu = minimalmodbus.Instrument(com_port, psu_config['slave_id'])
-            psu.serial.baudrate = psu_config['baud_rate']
-            psu.mode = minimalmodbus.MODE_RTU
-            psu.serial.timeout = psu_config['timeout']
-            psu.close_port_after_each_call = True  # Essential for USB adapters
+            if not scheduler.wait(command_lane.pending):
+                command_lane.run_pending(lambda cmd: execute_command(psu, cmd))
+                continue
+            command_lane.run_pending(lambda cmd: execute_command(psu, cmd))
+            
+            # Read all 13 registers at once (0x0001-0x000D)
+            scheduler.begin_io()
+            raw_values = psu.read_registers(0x0001, 13)
+            timestamp_ns = scheduler.end_io()
+            
+            # Mark as online only after successful read
+            if not device_online:
+                print(f"[OK] Connected to PSU on {com_port}")
+                device_online = True
+            
+            # Parse registers according to map
+            readings = {
+                'voltage': raw_values[0] * 0.1,      # V
+                'current': raw_values[1] * 0.1,      # A
+                'power': raw_values[2] * 0.1,        # W
+                'capacity': raw_values[3] * 0.1,     # Ah
+                'runtime': raw_values[4],            # s
+                'battery_v': raw_values[5] * 0.1,    # V
+                'sys_fault': raw_values[6],          # fault code
+                'mod_fault': raw_values[7],          # fault code
+                'temperature': raw_values[8],        # C
+                'status': raw_values[9],             # status word
+                'set_voltage_rb': raw_values[10] * 0.1,  # V
+                'set_current_rb': raw_values[11] * 0.1,  # A
+                'output_enable': raw_values[12]      # 1=ON, 0=OFF
+            }
+            
+            sample = {
+                'timestamp_ns': timestamp_ns,
+                'readings': readings
+            }
             
-            print(f"Attempting connection to PSU on {com_port}...")
+            # Add to pending samples for InfluxDB write
+            pending_samples.append(sample)
             
-            # Read loop with command processing
-            while True:
-                # Process pending commands
-                while not command_queue.empty():
-                    try:
-                        cmd = command_queue.get_nowait()
-                        cmd_type = cmd.get('type')
-                        
-                        if cmd_type == 'set_voltage_current':
-                            voltage = cmd['voltage']
-                            current = cmd['current']
-                            psu.write_register(0x0101, int(voltage / 0.1))
-                            time.sleep(0.1)
-                            psu.write_register(0x0102, int(current / 0.1))
-                            time.sleep(0.1)
-                            psu.write_register(0x0103, cmd['enable'])
-                            print(f"[OK] Set: {voltage:.1f}V, {current:.1f}A, {'ON' if cmd['enable'] else 'OFF'}")
-                        
-                        elif cmd_type == 'enable':
-                            psu.write_register(0x0103, 1)
-                            print("[OK] Output enabled")
-                        
-                        elif cmd_type == 'disable':
-                            psu.write_register(0x0103, 0)
-                            print("[OK] Output disabled")
-                        
-                        command_queue.task_done()
-                    except Exception as e:
-                        print(f"[ERROR] Command failed: {e}")
-                
-                # Read all 13 registers at once (0x0001-0x000D)
-                raw_values = psu.read_registers(0x0001, 13)
-                
-                # Mark as online only after successful read
-                if not device_online:
-                    print(f"[OK] Connected to PSU on {com_port}")
-                    device_online = True
-                
-                # Parse registers according to map
-                readings = {
-                    'voltage': raw_values[0] * 0.1,      # V
-                    'current': raw_values[1] * 0.1,      # A
-                    'power': raw_values[2] * 0.1,        # W
-                    'capacity': raw_values[3] * 0.1,     # Ah
-                    'runtime': raw_values[4],            # s
-                    'battery_v': raw_values[5] * 0.1,    # V
-                    'sys_fault': raw_values[6],          # fault code
-                    'mod_fault': raw_values[7],          # fault code
-                    'temperature': raw_values[8],        # C
-                    'status': raw_values[9],             # status word
-                    'set_voltage_rb': raw_values[10] * 0.1,  # V
-                    'set_current_rb': raw_values[11] * 0.1,  # A
-                    'output_enable': raw_values[12]      # 1=ON, 0=OFF
-                }
-                
-                sample = {
-                    'timestamp_ns': time.time_ns(),
-                    'readings': readings
-                }
-                
-                # Add to pending samples for InfluxDB write
-                pending_samples.append(sample)
-                
-                # Also add to buffer for /metrics endpoint
-                with data_lock:
-                    sample_buffer.append(sample)
-                
-                # Write to InfluxDB when we have enough samples
-                if len(pending_samples) >= write_batch_size:
-                    write_to_influxdb(pending_samples)
-                    pending_samples = []
-                
-                time.sleep(1.0 / SAMPLE_RATE)
+            # Also add to buffer for /metrics endpoint
+            with data_lock:
+                sample_seq += 1
+                sample['seq'] = sample_seq
+                sample_buffer.append(sample)
+            
+            # Write to InfluxDB when we have enough samples
+            if len(pending_samples) >= write_batch_size:
+                write_to_influxdb(pending_samples)
+                pending_samples = []
         
         except Exception as e:
+            if not psu.port_down:
+                print(f"[WARN] PSU read failed (port still open): {e}")
+                continue
+            
+            if device_online:
+                print(f"[ERROR] PSU offline: {e}")
             device_online = False
-            print(f"[ERROR] PSU offline: {e}")
-            print(f"  Retrying in {RECONNECT_DELAY}s...")
-            time.sleep(RECONNECT_DELAY)
+            command_lane.fail_pending(f"PSU offline: {e}")
+            retry_in = psu.retry_in()
+            print(f"  Retrying in {retry_in:.1f}s...")
+            time.sleep(retry_in)
+            scheduler.reset()
 
 
-@app.route('/metrics')
-def metrics():
-    """Return buffered metrics in InfluxDB line protocol format (for debugging)"""
-    if not device_online:
-        return Response("# Device offline\n", status=503, mimetype='text/plain')
-    
-    with data_lock:
-        if sample_buffer is None or len(sample_buffer) == 0:
-            return Response("# No data yet\n", status=503, mimetype='text/plain')
-        
-        samples = list(sample_buffer)
-    
+def format_metrics(samples):
+    """Format samples as InfluxDB line protocol - one line per sample"""
     lines = []
     for sample in samples:
         readings = sample['readings']
@@ -280,8 +280,44 @@ def metrics():
                 f"{timestamp_ns}")
         lines.append(line)
     
-    output = '\n'.join(lines) + '\n'
-    return Response(output, mimetype='text/plain')
+    return lines
+
+
+def cursor_response(since_seq=None, since_ns=None, latest_only=False):
+    """Build /metrics or /latest response from the sample buffer"""
+    if not device_online:
+        return Response("# Device offline\n", status=503, mimetype='text/plain')
+    
+    with data_lock:
+        if sample_buffer is None or len(sample_buffer) == 0:
+            return Response("# No data yet\n", status=503, mimetype='text/plain')
+        
+        headers = cursor_headers(sample_buffer[-1]['seq'])
+        if etag_matches(request.headers.get('If-None-Match'), headers['ETag']):
+            return Response(status=304, headers=headers)
+        
+        samples = [sample_buffer[-1]] if latest_only else list(sample_buffer)
+    
+    lines = format_metrics(select_samples(samples, since_seq, since_ns))
+    output = '\n'.join(lines) + '\n' if lines else ''
+    return Response(output, mimetype='text/plain', headers=headers)
+
+
+@app.route('/metrics')
+def metrics():
+    """Return buffered metrics in InfluxDB line protocol format (?since=<seq> / ?since_ns=<ns> for new samples only)"""
+    try:
+        since_seq, since_ns = parse_cursor(request.args)
+    except ValueError:
+        return Response("# since/since_ns must be integers\n", status=400, mimetype='text/plain')
+    
+    return cursor_response(since_seq, since_ns)
+
+
+@app.route('/latest')
+def latest():
+    """Return only the most recent sample in InfluxDB line protocol format"""
+    return cursor_response(latest_only=True)
 
 
 @app.route('/health')
@@ -301,17 +337,28 @@ def health():
         'buffer_size': buffer_size,
         'buffer_max': buffer_max,
         'buffer_pct': round(100 * buffer_size / buffer_max, 1) if buffer_max > 0 else 0,
-        'influxdb_enabled': influx_write_api is not None,
-        'points_written': points_written
+        'scheduler': scheduler.stats() if scheduler else None,
+        'rtu_session': rtu_session.stats() if rtu_session else None,
+        'command_lane': command_lane.stats(),
+        'influxdb_enabled': influx_writer is not None,
+        'points_written': influx_writer.points_written if influx_writer else 0,
+        'influxdb_writer': influx_writer.stats() if influx_writer else None
     }
     
     import json
     return Response(json.dumps(response, indent=2), mimetype='application/json')
 
 
+def command_response(entry):
+    """JSON body for a command record (500 if it failed)"""
+    body = entry.to_dict()
+    body['success'] = entry.status != "failed"
+    return jsonify(body), 500 if entry.status == "failed" else 200
+
+
 @app.route('/command', methods=['POST'])
 def command():
-    """Accept PSU control commands via HTTP POST"""
+    """Accept PSU control commands via HTTP POST (?wait=<s> blocks until executed and verified)"""
     if not device_online:
         return jsonify({'success': False, 'error': 'PSU offline'}), 503
     
@@ -320,13 +367,25 @@ def command():
         if not cmd_data:
             return jsonify({'success': False, 'error': 'No JSON data'}), 400
         
-        command_queue.put(cmd_data)
-        return jsonify({'success': True, 'message': 'Command queued'})
+        entry = command_lane.submit(cmd_data)
+        wait = request.args.get('wait', type=float)
+        if wait:
+            command_lane.wait(entry, wait)
+        return command_response(entry)
     
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/command/<command_id>')
+def command_status(command_id):
+    """Status, readback and latency of a recent command"""
+    entry = command_lane.get(command_id)
+    if entry is None:
+        return jsonify({'success': False, 'error': f'Unknown command: {command_id}'}), 404
+    return command_response(entry)
+
+
 def main():
     """Main entry point"""
     config = load_config()
@@ -337,7 +396,7 @@ def main():
     print("PSU Modbus RTU HTTP Bridge (Direct InfluxDB)")
     print(f"Config: {CONFIG_PATH}")
     print(f"Configured rate: {sample_rate} Hz (hardware max: {hw_max} Hz)")
-    print(f"Endpoints: http://localhost:8883/metrics, /health, /command")
+    print(f"Endpoints: http://localhost:8883/metrics, /latest, /health, /command, /command/<id>")
     print()
     
     # Setup InfluxDB direct writes
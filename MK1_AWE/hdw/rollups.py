@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Streaming Multi-Resolution Rollups
+Bridges feed every acquired block through Rollups, which keeps count,
+mean, min, max and last per channel for fixed time buckets at several
+resolutions and emits one point per channel per closed bucket to
+<measurement>_<resolution> (e.g. ni_analog_100ms, ni_analog_1s, ni_analog_1m):
+    ni_analog_1s,channel=AI03,... value_mean=..,value_min=..,value_max=..,value_last=..,count=1000i <bucket start>
+Buckets are aligned to the wall clock (floor(timestamp / period)), so
+dashboards and export can read a long range from a coarse measurement
+instead of aggregating raw points on every query.
+"""
+
+import math
+import re
+import numpy as np
+from line_protocol import tag_prefix
+
+STATS = ('mean', 'min', 'max', 'last')
+DEFAULT_RESOLUTIONS = ("100ms", "1s", "1m")
+DURATION_UNITS = {'ms': 1_000_000, 's': 1_000_000_000, 'm': 60_000_000_000, 'h': 3_600_000_000_000}
+
+
+def parse_duration(text):
+    """Duration string ('100ms', '1s', '1m', '1h') to nanoseconds"""
+    match = re.fullmatch(r'(\d+)(ms|s|m|h)', str(text).strip())
+    if not match:
+        raise ValueError(f"Invalid rollup resolution: {text}")
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+
+class RollupSeries:
+    """Bucket accumulators for one resolution (all rows share timestamps)"""
+
+    def __init__(self, period_ns, n_rows):
+        self.period_ns = period_ns
+        self.n_rows = n_rows
+        self.bucket = None  # id of the open bucket (timestamp // period)
+        self.count = 0
+        self.sum = np.zeros(n_rows)
+        self.min = np.zeros(n_rows)
+        self.max = np.zeros(n_rows)
+        self.last = np.zeros(n_rows)
+
+    def add(self, timestamps_ns, values):
+        """Accumulate one block; returns the buckets it closed
+
+        Args:
+            timestamps_ns: int64 array, shape [n] (non-decreasing)
+            values: float array, shape [n_rows, n]
+
+        Returns:
+            (bucket_start_ns, count, mean, min, max, last) with stats of shape
+            [n_rows, k] for the k closed buckets, or None
+        """
+        n = len(timestamps_ns)
+        if n == 0:
+            return None
+
+        # Segment the block by bucket and reduce each segment in one pass
+        ids = np.asarray(timestamps_ns, dtype=np.int64) // self.period_ns
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        ends = np.r_[starts[1:], n]
+        seg_ids = ids[starts]
+        counts = ends - starts
+        sums = np.add.reduceat(values, starts, axis=1)
+        mins = np.minimum.reduceat(values, starts, axis=1)
+        maxs = np.maximum.reduceat(values, starts, axis=1)
+        lasts = values[:, ends - 1]
+
+        # Merge the open bucket into the first segment, or close it
+        closed_open = None
+        if self.bucket is not None:
+            if seg_ids[0] == self.bucket:
+                counts[0] += self.count
+                sums[:, 0] += self.sum
+                np.minimum(mins[:, 0], self.min, out=mins[:, 0])
+                np.maximum(maxs[:, 0], self.max, out=maxs[:, 0])
+            else:
+                closed_open = (self.bucket, self.count, self.sum, self.min, self.max, self.last)
+
+        # Every segment but the last is complete; the last stays open
+        self.bucket = seg_ids[-1]
+        self.count = int(counts[-1])
+        self.sum = sums[:, -1].copy()
+        self.min = mins[:, -1].copy()
+        self.max = maxs[:, -1].copy()
+        self.last = lasts[:, -1].copy()
+
+        bucket_ids = seg_ids[:-1]
+        counts, sums, mins, maxs, lasts = counts[:-1], sums[:, :-1], mins[:, :-1], maxs[:, :-1], lasts[:, :-1]
+        if closed_open is not None:
+            bucket, count, total, low, high, last = closed_open
+            bucket_ids = np.r_[bucket, bucket_ids]
+            counts = np.r_[count, counts]
+            sums = np.column_stack((total, sums))
+            mins = np.column_stack((low, mins))
+            maxs = np.column_stack((high, maxs))
+            lasts = np.column_stack((last, lasts))
+
+        if len(bucket_ids) == 0:
+            return None
+        return bucket_ids * self.period_ns, counts, sums / counts, mins, maxs, lasts
+
+
+class Rollups:
+    """Multi-resolution rollups for one bridge measurement"""
+
+    def __init__(self, measurement, row_tags, field_names, resolutions=DEFAULT_RESOLUTIONS):
+        """
+        Args:
+            measurement: Raw measurement name (rollups go to <measurement>_<resolution>)
+            row_tags: Tag dict per row (e.g. one per channel)
+            field_names: Raw field names, one per column passed to add()
+            resolutions: Resolution strings, e.g. ("100ms", "1s", "1m")
+        """
+        self.field_names = tuple(field_names)
+        self.n_rows = len(row_tags)
+        self.resolutions = tuple(resolutions)
+        self.series = {}
+        self.templates = {}
+        self.prefixes = {}
+        self.stat_names = [f"{field}_{stat}" for field in self.field_names for stat in STATS]
+        fields = ','.join(f"{field}_{stat}=%r" for field in self.field_names for stat in STATS)
+        for resolution in self.resolutions:
+            self.series[resolution] = RollupSeries(parse_duration(resolution), self.n_rows * len(self.field_names))
+            self.prefixes[resolution] = [tag_prefix(f"{measurement}_{resolution}", tags) for tags in row_tags]
+            self.templates[resolution] = [prefix + fields + ",count=%di %d\n"
+                                          for prefix in self.prefixes[resolution]]
+
+        self._buf = bytearray()
+        self.points = 0
+        self.points_total = {resolution: 0 for resolution in self.resolutions}
+
+    def add(self, timestamps_ns, columns):
+        """Accumulate one block
+
+        Args:
+            timestamps_ns: Sample timestamps (ns), shared by all rows
+            columns: One [row][sample] array per field (same order as field_names)
+        """
+        values = np.concatenate([np.asarray(column, dtype=np.float64) for column in columns])
+        n_fields = len(self.field_names)
+
+        for resolution, series in self.series.items():
+            closed = series.add(timestamps_ns, values)
+            if closed is None:
+                continue
+            bucket_ns, counts, mean, low, high, last = closed
+            k = len(counts)
+
+            # [stat][field][row][bucket] -> [bucket][row][field, stat]
+            stats = np.stack((mean, low, high, last)).reshape(len(STATS), n_fields, self.n_rows, k)
+            rows = stats.transpose(3, 2, 1, 0).reshape(k, self.n_rows, -1).tolist()
+            templates = self.templates[resolution]
+            if np.isfinite(stats).all():
+                lines = [templates[row] % (*row_values[row], count, timestamp_ns)
+                         for row_values, count, timestamp_ns in zip(rows, counts.tolist(), bucket_ns.tolist())
+                         for row in range(self.n_rows)]
+            else:
+                # NaN/inf in the input: drop those stats (InfluxDB rejects the batch for them)
+                prefixes = self.prefixes[resolution]
+                lines = [self._line(prefixes[row], row_values[row], count, timestamp_ns)
+                         for row_values, count, timestamp_ns in zip(rows, counts.tolist(), bucket_ns.tolist())
+                         for row in range(self.n_rows)]
+            self._buf += ''.join(lines).encode()
+            self.points += len(lines)
+            self.points_total[resolution] += len(lines)
+
+    def _line(self, prefix, values, count, timestamp_ns):
+        """One rollup line with non-finite stats left out"""
+        fields = ''.join(f"{name}={value!r}," for name, value in zip(self.stat_names, values)
+                         if math.isfinite(value))
+        return f"{prefix}{fields}count={count}i {timestamp_ns}\n"
+
+    def take(self):
+        """Return (line protocol bytes, points) emitted since the last take"""
+        data, points = bytes(self._buf), self.points
+        del self._buf[:]
+        self.points = 0
+        return data, points
+
+    def stats(self):
+        """Rollup points written per resolution for /health"""
+        return dict(self.points_total)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Hardware Sample Clock Timestamps
+Derives every sample time from the hardware sample index and the sample
+clock rate, anchored once to the host wall clock. Host-vs-hardware drift
+is tracked from periodic observations and corrected in two parts, so
+timestamps never jump, overlap or leave gaps between reads:
+    - rate: the drift slope between estimates is the timebase error
+      (e.g. +/-50 ppm crystal tolerance); the sample period is corrected
+      by it, re-basing the mapping at the current index
+    - phase: the remaining offset is slewed out by a bounded anchor step
+An offset beyond reanchor_ns (host clock stepped, missed estimates) is
+removed in one step instead, counted in stats as a re-anchor.
+"""
+
+import time
+import numpy as np
+
+# Defaults
+DEFAULT_CORRECTION_INTERVAL = 10.0  # seconds of observations per drift estimate
+DEFAULT_CORRECTION_GAIN = 0.5       # fraction of measured phase offset removed per correction
+DEFAULT_MAX_STEP_NS = 100_000       # max anchor slew per correction (0.1 ms - well under one sample period)
+DEFAULT_MAX_RATE_PPM = 200.0        # clamp on the total period correction (timebase tolerance is ~50 ppm)
+DEFAULT_REANCHOR_NS = 5_000_000     # offset (5 ms) removed in one step instead of slewed
+
+
+class SampleClock:
+    """Map hardware sample indices to wall-clock timestamps (ns)"""
+
+    def __init__(self, rate, correction_interval=DEFAULT_CORRECTION_INTERVAL,
+                 correction_gain=DEFAULT_CORRECTION_GAIN, max_step_ns=DEFAULT_MAX_STEP_NS,
+                 max_rate_ppm=DEFAULT_MAX_RATE_PPM, reanchor_ns=DEFAULT_REANCHOR_NS):
+        self.rate = float(rate)
+        self.nominal_period_ns = 1e9 / self.rate
+        self.period_ns = self.nominal_period_ns  # corrected for the measured rate error
+        self.correction_interval = correction_interval
+        self.correction_gain = correction_gain
+        self.max_step_ns = max_step_ns
+        self.max_rate_ppm = max_rate_ppm
+        self.reanchor_ns = reanchor_ns
+        self.anchor_ns = None  # wall-clock time of sample index base_index
+        self.base_index = 0
+
+        # Drift tracking
+        self._window_min_ns = None
+        self._window_start = None
+        self._acquired = 0
+        self._prev_drift_ns = None  # offset left after the previous correction
+        self._prev_index = None
+        self.last_drift_ns = None
+        self.max_abs_drift_ns = 0
+        self.total_correction_ns = 0
+        self.corrections = 0
+        self.reanchors = 0
+
+    def reset(self):
+        """Forget the anchor (call when the hardware task restarts)"""
+        self.anchor_ns = None
+        self.base_index = 0
+        self._window_min_ns = None
+        self._window_start = None
+        self._prev_drift_ns = None
+        self._prev_index = None
+
+    def _time_ns(self, index):
+        """Wall-clock time (float ns) of a sample index under the current mapping"""
+        return self.anchor_ns + (index - self.base_index) * self.period_ns
+
+    def observe(self, acquired, host_ns=None):
+        """Record host time at which the hardware reported `acquired` samples
+
+        The first observation sets the anchor. Later observations measure
+        host_ns minus the hardware time of the newest sample; transfer
+        latency only ever adds to that, so the minimum over each window
+        is the drift estimate.
+
+        Args:
+            acquired: Total samples per channel acquired by the hardware
+            host_ns: Host wall-clock time (defaults to time.time_ns())
+        """
+        if host_ns is None:
+            host_ns = time.time_ns()
+
+        if self.anchor_ns is None:
+            self.base_index = 0
+            self.anchor_ns = host_ns - int(round(acquired * self.period_ns))
+            self._window_start = time.monotonic()
+            return
+
+        offset_ns = host_ns - self._time_ns(acquired)
+        if self._window_min_ns is None or offset_ns < self._window_min_ns:
+            self._window_min_ns = offset_ns
+        self._acquired = acquired
+
+        if time.monotonic() - self._window_start >= self.correction_interval:
+            self._correct()
+
+    def _correct(self):
+        """Correct the sample period for the measured rate error, then slew the phase"""
+        drift_ns = int(self._window_min_ns)
+        index = self._acquired
+        self.last_drift_ns = drift_ns
+        self.max_abs_drift_ns = max(self.max_abs_drift_ns, abs(drift_ns))
+
+        # Re-base at the current index so changing the period moves no past timestamp
+        self.anchor_ns = int(round(self._time_ns(index)))
+        self.base_index = index
+
+        # Rate: offset growth per sample since the last estimate is residual period error
+        if self._prev_drift_ns is not None and index > self._prev_index:
+            slope = (drift_ns - self._prev_drift_ns) / (index - self._prev_index)
+            limit = self.nominal_period_ns * self.max_rate_ppm * 1e-6
+            self.period_ns = self.nominal_period_ns + max(-limit, min(limit, self.period_ns + slope
+                                                                      - self.nominal_period_ns))
+
+        # Phase: bounded slew, or one step if the offset is too large to slew out
+        if abs(drift_ns) >= self.reanchor_ns:
+            step_ns = drift_ns
+            self.reanchors += 1
+        else:
+            step_ns = int(max(-self.max_step_ns, min(self.max_step_ns, drift_ns * self.correction_gain)))
+        if step_ns:
+            self.anchor_ns += step_ns
+            self.total_correction_ns += step_ns
+            self.corrections += 1
+
+        self._prev_drift_ns = drift_ns - step_ns
+        self._prev_index = index
+        self._window_min_ns = None
+        self._window_start = time.monotonic()
+
+    def timestamps(self, first_index, count):
+        """Timestamps (int64 ns) for samples first_index .. first_index + count - 1"""
+        indices = np.arange(first_index - self.base_index, first_index - self.base_index + count,
+                            dtype=np.float64)
+        return self.anchor_ns + np.round(indices * self.period_ns).astype(np.int64)
+
+    def stats(self):
+        """Clock and drift-correction stats for /health"""
+        return {
+            'rate': self.rate,
+            'anchor_ns': self.anchor_ns,
+            'rate_error_ppm': round((self.period_ns / self.nominal_period_ns - 1) * 1e6, 2),
+            'last_drift_us': round(self.last_drift_ns / 1000, 1) if self.last_drift_ns is not None else None,
+            'max_abs_drift_us': round(self.max_abs_drift_ns / 1000, 1),
+            'total_correction_us': round(self.total_correction_ns / 1000, 1),
+            'corrections': self.corrections,
+            'reanchors': self.reanchors
+        }
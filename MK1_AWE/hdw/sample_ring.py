@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Preallocated Sample Ring Buffer (single writer, seqlock readers)
+Replaces deque-of-dicts + data_lock for bridge /metrics buffers.
+The acquisition thread writes without taking a lock; readers (HTTP
+endpoints, GUI, other processes via shared memory) retry if a write
+overlapped their copy instead of blocking the writer.
+
+Layout (one contiguous buffer, optionally multiprocessing.shared_memory):
+    header      int64[2]                [sequence, total samples written]
+    timestamps  int64[capacity]         ns
+    values      float64[capacity, width]
+
+Shared-memory blocks are named <shm_name>_<pid>_<n>, unique per ring, so a
+new bridge run never collides with a block an old run or a reader still
+holds open (on Windows a block lives until its last handle closes and
+cannot be unlinked). Readers get the current name from the bridge's
+/health (shared_memory). On POSIX, blocks left by bridge processes that
+died without unlinking are removed when a new ring is created.
+"""
+
+import itertools
+import os
+import time
+from pathlib import Path
+import numpy as np
+from multiprocessing import shared_memory
+
+HEADER_WORDS = 2
+MAX_READ_RETRIES = 100
+POSIX_SHM_DIR = Path("/dev/shm")
+
+_ring_ids = itertools.count()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def remove_stale_blocks(base_name):
+    """Unlink <base_name>_<pid>_* blocks of dead processes (POSIX only; no-op on Windows)"""
+    if os.name != 'posix' or not POSIX_SHM_DIR.is_dir():
+        return
+    for path in POSIX_SHM_DIR.glob(f"{base_name}_*_*"):
+        pid = path.name[len(base_name) + 1:].split('_')[0]
+        if pid.isdigit() and int(pid) != os.getpid() and not _pid_alive(int(pid)):
+            path.unlink(missing_ok=True)
+
+
+class SampleRing:
+    """Fixed-capacity ring of (timestamp, value row) samples"""
+
+    def __init__(self, capacity, width, shm_name=None, create=True):
+        """
+        Args:
+            capacity: Samples kept
+            width: Values per sample
+            shm_name: Shared-memory base name (create) or full block name
+                      from /health (attach); None = private buffer
+            create: Create the ring (writer) instead of attaching to it
+        """
+        self.capacity = int(capacity)
+        self.width = int(width)
+        self.shm_name = shm_name
+        self._shm = None
+
+        nbytes = 8 * (HEADER_WORDS + self.capacity + self.capacity * self.width)
+        if shm_name:
+            if create:
+                remove_stale_blocks(shm_name)
+                self.shm_name = f"{shm_name}_{os.getpid()}_{next(_ring_ids)}"
+                self._shm = shared_memory.SharedMemory(name=self.shm_name, create=True, size=nbytes)
+            else:
+                self._shm = shared_memory.SharedMemory(name=shm_name)
+            buf = self._shm.buf
+        else:
+            buf = bytearray(nbytes)
+
+        offset = 0
+        self._header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8 * HEADER_WORDS
+        self._timestamps = np.ndarray((self.capacity,), dtype=np.int64, buffer=buf, offset=offset)
+        offset += 8 * self.capacity
+        self._values = np.ndarray((self.capacity, self.width), dtype=np.float64, buffer=buf, offset=offset)
+        if create:
+            self._header[:] = 0
+
+    @classmethod
+    def attach(cls, shm_name, capacity, width):
+        """Attach to a ring created by another process (read-only use)
+
+        Args:
+            shm_name: Full block name as reported by the writer's /health
+        """
+        return cls(capacity, width, shm_name=shm_name, create=False)
+
+    def append(self, timestamps_ns, values):
+        """Append a block of samples (single writer only)
+
+        Args:
+            timestamps_ns: int64 array, shape [n]
+            values: float64 array, shape [n, width]
+        """
+        n = len(timestamps_ns)
+        if n == 0:
+            return
+        if n > self.capacity:
+            timestamps_ns = timestamps_ns[-self.capacity:]
+            values = values[-self.capacity:]
+            skipped = n - self.capacity
+            n = self.capacity
+        else:
+            skipped = 0
+
+        header = self._header
+        total = int(header[1]) + skipped
+        start = total % self.capacity
+        first = min(n, self.capacity - start)
+
+        header[0] += 1  # odd: write in progress
+        self._timestamps[start:start + first] = timestamps_ns[:first]
+        self._values[start:start + first] = values[:first]
+        if first < n:
+            self._timestamps[:n - first] = timestamps_ns[first:]
+            self._values[:n - first] = values[first:]
+        header[1] = total + n
+        header[0] += 1  # even: consistent
+
+    @property
+    def total(self):
+        """Total samples ever written (absolute index of the next sample)"""
+        return int(self._header[1])
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def snapshot(self, start_index=None):
+        """Copy buffered samples without blocking the writer
+
+        Args:
+            start_index: Only return samples with absolute index >= start_index
+                         (None = everything still buffered)
+
+        Returns:
+            (first_index, timestamps_ns, values) - copies; empty arrays if no data
+        """
+        header = self._header
+        for _ in range(MAX_READ_RETRIES):
+            seq = int(header[0])
+            if seq & 1:
+                time.sleep(0)
+                continue
+
+            total = int(header[1])
+            first_index = max(total - self.capacity, 0)
+            if start_index is not None:
+                first_index = max(first_index, min(int(start_index), total))
+            positions = np.arange(first_index, total) % self.capacity
+            timestamps = self._timestamps[positions]
+            values = self._values[positions]
+
+            if int(header[0]) == seq:
+                return first_index, timestamps, values
+            time.sleep(0)
+
+        raise RuntimeError("SampleRing snapshot kept colliding with writer")
+
+    def stats(self):
+        """Ring occupancy for /health"""
+        size = len(self)
+        return {
+            'capacity': self.capacity,
+            'width': self.width,
+            'size': size,
+            'total_written': self.total,
+            'shared_memory': self.shm_name
+        }
+
+    def close(self, unlink=False):
+        """Release shared memory (creator should unlink on shutdown)"""
+        if self._shm is not None:
+            self._header = self._timestamps = self._values = None
+            self._shm.close()
+            if unlink:
+                self._shm.unlink()
+            self._shm = None
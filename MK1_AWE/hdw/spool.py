@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Write-Ahead Spool for Bridge InfluxDB Writes
+Append-only, segment-rotated line protocol files on local disk.
+InfluxWriter spools batches here while InfluxDB is unreachable and
+replays them oldest-first once it recovers.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+# Spool directories are relative to MK1_AWE/ unless absolute
+BASE_DIR = Path(__file__).parent.parent
+
+# Defaults (override in devices.yaml system.influxdb_spool)
+DEFAULT_PATH = "spool"
+DEFAULT_SEGMENT_BYTES = 8 * 1024 * 1024         # rotate segments at 8 MB
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024      # 2 GB cap per bridge (oldest dropped)
+DEFAULT_FSYNC = "interval"                      # "always", "interval" or "never"
+DEFAULT_FSYNC_INTERVAL = 1.0                    # seconds (fsync: interval)
+DEFAULT_REJECTED_MAX_BYTES = 64 * 1024 * 1024   # cap on quarantined (rejected) batches
+SEGMENT_SUFFIX = ".lp"
+REJECTED_DIR = "rejected"                       # never replayed - kept for inspection
+
+
+class WriteSpool:
+    """Segment-rotated line protocol spool for one bridge"""
+
+    def __init__(self, name, spool_config=None):
+        spool_config = spool_config or {}
+        path = Path(spool_config.get('path', DEFAULT_PATH))
+        if not path.is_absolute():
+            path = BASE_DIR / path
+        self.path = path / name
+        self.segment_bytes = spool_config.get('segment_bytes', DEFAULT_SEGMENT_BYTES)
+        self.max_bytes = spool_config.get('max_bytes', DEFAULT_MAX_BYTES)
+        self.fsync = spool_config.get('fsync', DEFAULT_FSYNC)
+        self.fsync_interval = spool_config.get('fsync_interval', DEFAULT_FSYNC_INTERVAL)
+        self.rejected_path = self.path / REJECTED_DIR
+        self.rejected_max_bytes = spool_config.get('rejected_max_bytes', DEFAULT_REJECTED_MAX_BYTES)
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._active = None         # open file object of active segment
+        self._active_path = None
+        self._active_bytes = 0
+        self._last_fsync = 0.0
+
+        # Segments left over from a previous run are replayed too
+        self._segments = sorted(self.path.glob(f"*{SEGMENT_SUFFIX}"))
+        self._total_bytes = sum(seg.stat().st_size for seg in self._segments)
+
+        # Counters
+        self.spooled_batches = 0
+        self.spooled_points = 0
+        self.dropped_segments = 0
+        self.dropped_bytes = 0
+        self.rejected_bytes = sum(seg.stat().st_size for seg in self.rejected_path.glob(f"*{SEGMENT_SUFFIX}"))
+
+    def append(self, payload, points):
+        """Append a line protocol payload (ends with newline)"""
+        with self._lock:
+            if self._active is None or self._active_bytes >= self.segment_bytes:
+                self._rotate()
+
+            self._active.write(payload)
+            self._active_bytes += len(payload)
+            self._total_bytes += len(payload)
+            self.spooled_batches += 1
+            self.spooled_points += points
+
+            now = time.monotonic()
+            if self.fsync == "always" or (
+                    self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval):
+                self._active.flush()
+                os.fsync(self._active.fileno())
+                self._last_fsync = now
+            elif self.fsync == "never":
+                self._active.flush()
+
+            self._enforce_cap()
+
+    def _rotate(self):
+        """Close active segment and open a new one (caller holds lock)"""
+        self._close_active()
+        # Name by creation time so lexical order == spool order
+        self._active_path = self.path / f"{time.time_ns():020d}{SEGMENT_SUFFIX}"
+        self._active = open(self._active_path, 'ab')
+        self._active_bytes = 0
+        self._segments.append(self._active_path)
+
+    def _close_active(self):
+        """Flush, fsync and close active segment (caller holds lock)"""
+        if self._active is not None:
+            self._active.flush()
+            if self.fsync != "never":
+                os.fsync(self._active.fileno())
+            self._active.close()
+            self._active = None
+            self._active_path = None
+            self._active_bytes = 0
+
+    def _enforce_cap(self):
+        """Drop oldest closed segments while over the disk cap (caller holds lock)"""
+        while self._total_bytes > self.max_bytes and len(self._segments) > 1:
+            oldest = self._segments.pop(0)
+            try:
+                size = oldest.stat().st_size
+                oldest.unlink()
+            except OSError:
+                size = 0
+            self._total_bytes -= size
+            self.dropped_segments += 1
+            self.dropped_bytes += size
+            print(f"[WARN] Spool over {self.max_bytes} bytes - dropped {oldest.name}")
+
+    def quarantine(self, payload, reason):
+        """Keep a batch InfluxDB rejected outright (bad line, field type conflict)
+
+        Written to rejected/ beside the spool, which replay never reads, so one
+        poison batch cannot block the segments behind it.
+
+        Returns:
+            True if kept, False if dropped because rejected/ is over its cap
+        """
+        with self._lock:
+            if self.rejected_bytes + len(payload) > self.rejected_max_bytes:
+                return False
+            self.rejected_path.mkdir(exist_ok=True)
+            name = f"{time.time_ns():020d}"
+            (self.rejected_path / f"{name}{SEGMENT_SUFFIX}").write_bytes(payload)
+            (self.rejected_path / f"{name}.err").write_text(f"{reason}\n")
+            self.rejected_bytes += len(payload)
+            return True
+
+    def seal(self):
+        """Close the active segment so everything spooled so far can be replayed
+
+        Returns:
+            List of closed segment paths, oldest first
+        """
+        with self._lock:
+            self._close_active()
+            return list(self._segments)
+
+    def remove(self, segment):
+        """Delete a segment after it has been replayed"""
+        with self._lock:
+            if segment in self._segments:
+                self._segments.remove(segment)
+            try:
+                self._total_bytes -= segment.stat().st_size
+                segment.unlink()
+            except OSError:
+                pass
+
+    def is_empty(self):
+        with self._lock:
+            return not self._segments
+
+    def run_if_empty(self, callback):
+        """Call callback under the spool lock if nothing is spooled (no append can interleave)
+
+        Returns:
+            True if the spool was empty and callback ran
+        """
+        with self._lock:
+            if self._segments:
+                return False
+            callback()
+            return True
+
+    def stats(self):
+        """Spool disk usage for /health"""
+        with self._lock:
+            return {
+                'path': str(self.path),
+                'segments': len(self._segments),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'pct': round(100 * self._total_bytes / self.max_bytes, 1) if self.max_bytes > 0 else 0,
+                'spooled_batches': self.spooled_batches,
+                'spooled_points': self.spooled_points,
+                'dropped_segments': self.dropped_segments,
+                'dropped_bytes': self.dropped_bytes,
+                'rejected_bytes': self.rejected_bytes
+            }
+
+
+def read_segment(segment, max_bytes):
+    """Read a spool segment as payload chunks split on line boundaries
+
+    Args:
+        segment: Segment path
+        max_bytes: Max chunk size (bytes) per write request
+
+    Returns:
+        List of (payload bytes, points) tuples
+    """
+    with open(segment, 'rb') as f:
+        data = f.read()
+    
+    # Drop a trailing partial line (bridge stopped mid-append)
+    data = data[:data.rfind(b'\n') + 1]
+
+    chunks = []
+    start = 0
+    while start < len(data):
+        end = min(len(data), start + max_bytes)
+        if end < len(data):
+            newline = data.rfind(b'\n', start, end)
+            end = newline + 1 if newline >= start else data.find(b'\n', end) + 1
+        payload = data[start:end]
+        chunks.append((payload, payload.count(b'\n')))
+        start = end
+    return chunks
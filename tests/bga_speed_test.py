@@ -1,29 +1,40 @@
 #!/usr/bin/env python3
 """
 BGA244 Serial Speed Test
-Measures maximum achievable sample rate for BGA readings
+Benchmarks the bridge protocol engine (hdw/bga_protocol.py) against the old
+fixed-delay cmd() loop: full 6-query poll cycle per mode, per-command
+latency and sustained purity-only throughput.
+Usage: python bga_speed_test.py [COM_PORT] [BAUD_RATE]
 """
 
+import sys
 import serial
 import time
-import statistics 
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "MK1_AWE" / "hdw"))
+from bga_protocol import BGAProtocol, MODES
 
 # Configuration - match your working setup
-COM_PORT = "COM3"  # Change to COM8 or COM10 as needed
-BAUD_RATE = 9600
+COM_PORT = sys.argv[1] if len(sys.argv) > 1 else "COM3"  # COM8 or COM10 for BGA02/03
+BAUD_RATE = int(sys.argv[2]) if len(sys.argv) > 2 else 9600
+POLL_QUERIES = ("GASP?", "GASS?", "RATO? 1%", "UNCT?%", "TCEL? C", "PRES?")
+CYCLES = 50
+HW_MAX_RATE = 5  # Hz - devices.yaml bridges.bgaNN.hw_max_rate
+
 
-def cmd(ser, text, read=True):
-    """Send command and optionally read response"""
+def legacy_cmd(ser, text):
+    """Old bridge cmd(): fixed 50 ms sleep, then read whatever arrived"""
     ser.write((text + "\r").encode())
-    time.sleep(0.02)  # Reduced from 0.05 for speed test
-    if not read:
-        return None
+    time.sleep(0.05)
     try:
         data = ser.read(ser.in_waiting or 1024).decode().strip()
         return data.split('\n')[-1] if data else None
     except:
         return None
 
+
 def get_num(text):
     """Extract number from response"""
     if not text:
@@ -35,140 +46,97 @@ def get_num(text):
             pass
     return None
 
+
+def report(name, cycle_times, total):
+    """Print cycle time stats for one test"""
+    if not cycle_times:
+        print(f"\n  {name}: no successful cycles")
+        return None
+    avg_time = statistics.mean(cycle_times)
+    print(f"\n  {name}: {len(cycle_times)}/{total} successful")
+    print(f"  Min cycle time:  {min(cycle_times)*1000:.1f} ms")
+    print(f"  Max cycle time:  {max(cycle_times)*1000:.1f} ms")
+    print(f"  Avg cycle time:  {avg_time*1000:.1f} ms")
+    print(f"  Full poll max rate: {1/avg_time:.1f} Hz (hw_max_rate {HW_MAX_RATE} Hz)")
+    return avg_time
+
+
 print(f"BGA Speed Test")
 print(f"Port: {COM_PORT}, Baud: {BAUD_RATE}")
 print("=" * 50)
 
 # Connect
-ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=0.2)
+ser = serial.Serial(COM_PORT, BAUD_RATE, timeout=0.5)
 print(f"Connected to {COM_PORT}")
 
 # Verify connection
-pg = cmd(ser, "GASP?")
-print(f"Primary gas: {pg}")
-
-# Test 1: Single command timing
-print("\n" + "=" * 50)
-print("Test 1: Single command timing (RATO? 1%)...")
-read_times = []
+protocol = BGAProtocol(ser, "sequential")
+print(f"Primary gas: {protocol.query('GASP?')}")
 
-for i in range(100):
-    start = time.perf_counter()
-    result = cmd(ser, "RATO? 1%")
-    elapsed = time.perf_counter() - start
-    if result is not None:
-        read_times.append(elapsed)
-
-if read_times:
-    avg_time = statistics.mean(read_times)
-    min_time = min(read_times)
-    max_time = max(read_times)
-    std_dev = statistics.stdev(read_times) if len(read_times) > 1 else 0
-    
-    print(f"\n  Samples: {len(read_times)}/100 successful")
-    print(f"  Min time:  {min_time*1000:.1f} ms")
-    print(f"  Max time:  {max_time*1000:.1f} ms")
-    print(f"  Avg time:  {avg_time*1000:.1f} ms")
-    print(f"  Std dev:   {std_dev*1000:.1f} ms")
-    print(f"\n  Single command max rate: {1/avg_time:.1f} Hz")
-
-# Test 2: Full poll cycle (all 6 commands like in ws_rs422_bga.py)
+# Test 1: Old fixed-delay loop (baseline)
 print("\n" + "=" * 50)
-print("Test 2: Full poll cycle (6 commands: GASP?, GASS?, RATO?, UNCT?, TCEL?, PRES?)...")
+print("Test 1: Legacy cmd() poll cycle (50 ms sleep per query)...")
+ser.reset_input_buffer()
 cycle_times = []
-
-for i in range(50):
+for i in range(CYCLES):
     start = time.perf_counter()
-    pg = cmd(ser, "GASP?")
-    sg = cmd(ser, "GASS?")
-    pur = get_num(cmd(ser, "RATO? 1%"))
-    unc = get_num(cmd(ser, "UNCT?%"))
-    tc = get_num(cmd(ser, "TCEL? C"))
-    ps = get_num(cmd(ser, "PRES?"))
+    replies = [legacy_cmd(ser, query) for query in POLL_QUERIES]
     elapsed = time.perf_counter() - start
-    
-    if pur is not None:  # At least purity should work
+    if get_num(replies[2]) is not None:
         cycle_times.append(elapsed)
-
-if cycle_times:
-    avg_time = statistics.mean(cycle_times)
-    min_time = min(cycle_times)
-    max_time = max(cycle_times)
-    
-    print(f"\n  Samples: {len(cycle_times)}/50 successful")
-    print(f"  Min cycle time:  {min_time*1000:.1f} ms")
-    print(f"  Max cycle time:  {max_time*1000:.1f} ms")
-    print(f"  Avg cycle time:  {avg_time*1000:.1f} ms")
-    print(f"\n  Full poll max rate: {1/avg_time:.1f} Hz")
-
-# Test 3: Purity-only polling (just RATO? for fastest updates)
+baseline = report("legacy", cycle_times, CYCLES)
+
+# Test 2: Protocol engine, each transaction mode
+results = {}
+for mode in MODES:
+    print("\n" + "=" * 50)
+    print(f"Test 2 ({mode}): full poll cycle via BGAProtocol...")
+    ser.reset_input_buffer()
+    protocol = BGAProtocol(ser, mode)
+    cycle_times = []
+    for i in range(CYCLES):
+        start = time.perf_counter()
+        replies = protocol.transaction(POLL_QUERIES)
+        elapsed = time.perf_counter() - start
+        if get_num(replies[2]) is not None:
+            cycle_times.append(elapsed)
+    results[mode] = report(mode, cycle_times, CYCLES)
+
+    stats = protocol.stats()
+    print(f"  Timeouts: {stats['timeouts']}, resyncs: {stats['resyncs']}")
+    for command, latency in stats['commands'].items():
+        print(f"    {command:10s} p50 {latency['p50_ms']:6.1f} ms   p95 {latency['p95_ms']:6.1f} ms")
+
+# Test 3: Purity-only sustained throughput
 print("\n" + "=" * 50)
-print("Test 3: Purity-only sustained throughput (10 seconds)...")
-
+print("Test 3: Purity-only sustained throughput (10 seconds, sequential)...")
+protocol = BGAProtocol(ser, "sequential")
 successful = 0
 failed = 0
 start_time = time.perf_counter()
 duration = 10.0
 
 while (time.perf_counter() - start_time) < duration:
-    result = get_num(cmd(ser, "RATO? 1%"))
-    if result is not None:
+    if get_num(protocol.query("RATO? 1%")) is not None:
         successful += 1
     else:
         failed += 1
 
 elapsed = time.perf_counter() - start_time
-actual_rate = successful / elapsed
-
-print(f"\n  Duration: {elapsed:.1f} s")
-print(f"  Successful reads: {successful}")
+print(f"\n  Successful reads: {successful}")
 print(f"  Failed reads: {failed}")
-print(f"  Purity-only rate: {actual_rate:.1f} Hz")
+print(f"  Purity-only rate: {successful / elapsed:.1f} Hz")
 
-# Test 4: Minimum viable poll (purity + temp only)
+# Summary
 print("\n" + "=" * 50)
-print("Test 4: Minimal poll (RATO? + TCEL? only)...")
-min_cycle_times = []
-
-for i in range(50):
-    start = time.perf_counter()
-    pur = get_num(cmd(ser, "RATO? 1%"))
-    tc = get_num(cmd(ser, "TCEL? C"))
-    elapsed = time.perf_counter() - start
-    
-    if pur is not None:
-        min_cycle_times.append(elapsed)
-
-if min_cycle_times:
-    avg_time = statistics.mean(min_cycle_times)
-    print(f"\n  Avg cycle time: {avg_time*1000:.1f} ms")
-    print(f"  2-command poll rate: {1/avg_time:.1f} Hz")
-
-# Test 5: Command delay sensitivity
-print("\n" + "=" * 50)
-print("Test 5: Command delay sensitivity...")
-
-delays = [0.01, 0.02, 0.03, 0.05, 0.1]
-
-for delay in delays:
-    times = []
-    for _ in range(20):
-        start = time.perf_counter()
-        ser.write(("RATO? 1%" + "\r").encode())
-        time.sleep(delay)
-        try:
-            data = ser.read(ser.in_waiting or 1024).decode().strip()
-            if data:
-                times.append(time.perf_counter() - start)
-        except:
-            pass
-    
-    if times:
-        avg = statistics.mean(times)
-        success = len(times)
-        print(f"  Delay {delay*1000:4.0f}ms: {success}/20 success, avg {avg*1000:.1f} ms, ~{1/avg:.1f} Hz")
+print("Summary (full 6-query poll):")
+if baseline:
+    print(f"  legacy      {1/baseline:5.1f} Hz")
+for mode, avg_time in results.items():
+    if avg_time:
+        speedup = f"  ({baseline/avg_time:.1f}x legacy)" if baseline else ""
+        print(f"  {mode:11s} {1/avg_time:5.1f} Hz{speedup}")
 
 ser.close()
 print("\n" + "=" * 50)
 print("Done!")
-
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Line Protocol Serializer Benchmark
+Compares influxdb_client.Point serialization against hdw/line_protocol.py
+for one second of NI analog data (16 channels x SAMPLE_RATE samples)
+No hardware or InfluxDB needed - serialization only
+"""
+
+import sys
+import time
+import statistics
+from pathlib import Path
+
+import numpy as np
+from influxdb_client import Point, WritePrecision
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "MK1_AWE" / "hdw"))
+from line_protocol import LineProtocolBuffer, tag_prefix
+
+# Configuration
+SAMPLE_RATE = 2500  # Hz - NI-9253 hw_max_rate
+N_CHANNELS = 16
+ROUNDS = 5
+
+channels = [f"AI{i:02d}" for i in range(1, N_CHANNELS + 1)]
+timestamps = time.time_ns() + np.arange(SAMPLE_RATE, dtype=np.int64) * int(1e9 / SAMPLE_RATE)
+raw_ma = np.random.uniform(4.0, 20.0, size=(N_CHANNELS, SAMPLE_RATE))
+values = (raw_ma - 4.0) * 100.0 / 16.0
+
+
+def point_path():
+    """Current bridge path: one Point per channel per sample"""
+    points = []
+    ts = timestamps.tolist()
+    vals = values.tolist()
+    raws = raw_ma.tolist()
+    for ch_idx, ch_name in enumerate(channels):
+        for sample_idx, timestamp_ns in enumerate(ts):
+            point = Point("ni_analog") \
+                .tag("channel", ch_name) \
+                .tag("hardware", "ni_cdaq") \
+                .tag("location", "gen3_test_rig") \
+                .field("value", vals[ch_idx][sample_idx]) \
+                .field("raw_ma", raws[ch_idx][sample_idx]) \
+                .time(timestamp_ns, WritePrecision.NS)
+            points.append(point)
+    # Write API serializes every point before sending
+    return '\n'.join(p.to_line_protocol() for p in points).encode()
+
+
+prefixes = [
+    tag_prefix("ni_analog", {'channel': ch, 'hardware': "ni_cdaq", 'location': "gen3_test_rig"})
+    for ch in channels
+]
+line_buffer = LineProtocolBuffer()
+
+
+def buffer_path():
+    """Serializer path: precomputed prefixes, columnar arrays, one buffer"""
+    line_buffer.clear()
+    line_buffer.add_columns(prefixes, ('raw_ma', 'value'), (raw_ma, values), timestamps)
+    return line_buffer.getvalue()
+
+
+def bench(name, fn):
+    times = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    avg = statistics.mean(times)
+    rate = N_CHANNELS * SAMPLE_RATE / avg
+    print(f"  {name:<20} avg {avg*1000:8.1f} ms  ->  {rate:12,.0f} points/s")
+    return rate
+
+
+print("Line Protocol Serializer Benchmark")
+print(f"{N_CHANNELS} channels x {SAMPLE_RATE} samples = {N_CHANNELS * SAMPLE_RATE} points per batch")
+print("=" * 60)
+
+# Sanity check: both paths produce the same lines
+expected = sorted(point_path().decode().splitlines())
+actual = sorted(buffer_path().decode().splitlines())
+print(f"Output identical: {expected == actual}")
+
+# Non-finite values: Point drops NaN/inf fields (InfluxDB rejects the batch for them)
+clean_values, clean_raw = values.copy(), raw_ma.copy()
+values[0, 0], values[1, 1], raw_ma[1, 1], values[2, 2] = np.nan, np.inf, -np.inf, -np.inf
+expected = sorted(line for line in point_path().decode().splitlines() if line)
+actual_bytes = buffer_path()
+actual = sorted(actual_bytes.decode().splitlines())
+print(f"Non-finite output identical: {expected == actual} "
+      f"(no nan/inf: {b'nan' not in actual_bytes and b'inf' not in actual_bytes}, "
+      f"points: {line_buffer.points})")
+values[:], raw_ma[:] = clean_values, clean_raw
+print()
+
+point_rate = bench("Point objects", point_path)
+buffer_rate = bench("LineProtocolBuffer", buffer_path)
+
+print()
+print(f"Speedup: {buffer_rate / point_rate:.1f}x")
+print(f"Core load at {SAMPLE_RATE} Hz x {N_CHANNELS} ch: "
+      f"Point {100 * N_CHANNELS * SAMPLE_RATE / point_rate:.0f}%, "
+      f"buffer {100 * N_CHANNELS * SAMPLE_RATE / buffer_rate:.0f}%")
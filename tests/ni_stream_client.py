@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+NI Analog /stream Client
+Subscribes to the NI analog bridge binary stream and prints frame rate,
+latency and latest values. Usage: python ni_stream_client.py [channels] [decimation]
+"""
+
+import sys
+import time
+import struct
+import requests
+import numpy as np
+
+# Configuration
+BRIDGE_URL = "http://localhost:8881"
+CHANNELS = sys.argv[1] if len(sys.argv) > 1 else "AI03,AI09"
+DECIMATION = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+HEADER = struct.Struct('<4sHHIQqd')
+
+
+def read_exact(raw, n):
+    """Read exactly n bytes from the response stream"""
+    data = b''
+    while len(data) < n:
+        chunk = raw.read(n - len(data))
+        if not chunk:
+            raise ConnectionError("Stream closed")
+        data += chunk
+    return data
+
+
+print(f"NI Stream Client: {BRIDGE_URL}/stream channels={CHANNELS} decimation={DECIMATION}")
+response = requests.get(f"{BRIDGE_URL}/stream",
+                        params={'channels': CHANNELS, 'decimation': DECIMATION},
+                        stream=True, timeout=5)
+response.raise_for_status()
+names = response.headers['X-Channels'].split(',')
+print(f"Channels: {names}")
+
+frames = 0
+samples = 0
+start = time.perf_counter()
+try:
+    while True:
+        magic, n_ch, dec, n_samples, first_seq, first_ts, period_ns = HEADER.unpack(
+            read_exact(response.raw, HEADER.size))
+        if magic != b'NIA1':
+            raise ValueError(f"Bad frame magic: {magic}")
+        matrix = np.frombuffer(read_exact(response.raw, 4 * n_ch * n_samples), dtype='<f4')
+        matrix = matrix.reshape(n_ch, n_samples)
+        
+        frames += 1
+        samples += n_samples
+        last_ts = first_ts + (n_samples - 1) * period_ns
+        latency_ms = (time.time_ns() - last_ts) / 1e6
+        elapsed = time.perf_counter() - start
+        latest = ', '.join(f"{name}={matrix[i, -1]:.3f}" for i, name in enumerate(names))
+        print(f"\r{frames / elapsed:5.1f} frames/s  {samples / elapsed:7.1f} samples/s  "
+              f"latency {latency_ms:6.1f} ms  seq {first_seq}  {latest}", end='', flush=True)
+except KeyboardInterrupt:
+    print("\nStopped by user.")
+finally:
+    response.close()
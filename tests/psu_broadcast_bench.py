@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+MK1 PSU Setpoint Broadcast Benchmark
+Compares one set-current broadcast to every PSU with a new executor and a
+new TCP connection per PSU per call (old psu_client) against the shared
+executor and pooled connections (gui/modbus_client.py).
+WARNING: sets the current setpoint of EVERY configured PSU to 0 A,
+repeatedly. On a live rig this drops the stack current - only run it with
+the PSUs idle. Requires --force.
+Usage: python psu_broadcast_bench.py --force [REPEATS]
+"""
+
+import sys
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from pymodbus.client import ModbusTcpClient
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "MK1_AWE" / "gui"))
+from config_loader import get_psu_config, get_psu_ips
+from modbus_client import get_pool
+from psu_client import _write_all_psus
+
+args = [arg for arg in sys.argv[1:] if arg != '--force']
+if '--force' not in sys.argv[1:]:
+    print("This benchmark sets every MK1 PSU to 0 A. Re-run with --force if the PSUs are idle.")
+    sys.exit(1)
+REPEATS = int(args[0]) if args else 20
+
+
+def legacy_write(ip, register, value):
+    """Old _write_psu_register(): connect, write, close"""
+    client = ModbusTcpClient(host=ip, port=502, timeout=0.5)
+    try:
+        if not client.connect():
+            return False
+        return not client.write_register(register, value).isError()
+    except Exception:
+        return False
+    finally:
+        client.close()
+
+
+def legacy_broadcast(psu_ips, register, value):
+    """Old _set_current_mk1() fan-out: executor and connections per call"""
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        futures = [executor.submit(legacy_write, ip, register, value) for ip in psu_ips]
+        return sum(1 for future in as_completed(futures) if future.result())
+
+
+def report(name, times, successes, total):
+    """Print latency stats for one test"""
+    avg_time = statistics.mean(times)
+    print(f"\n  {name}: {successes}/{total} PSUs")
+    print(f"  Min: {min(times)*1000:.1f} ms  Avg: {avg_time*1000:.1f} ms  Max: {max(times)*1000:.1f} ms")
+    return avg_time
+
+
+psu_ips = get_psu_ips()
+register = get_psu_config()['mk1']['psu_registers']['write']['set_current']['address']
+
+print("MK1 PSU Setpoint Broadcast Benchmark")
+print(f"PSUs: {len(psu_ips)}, register: {register}, repeats: {REPEATS}")
+print("=" * 50)
+
+# Test 1: Executor + connection per call (baseline)
+times = []
+for i in range(REPEATS):
+    start = time.perf_counter()
+    successes = legacy_broadcast(psu_ips, register, 0)
+    times.append(time.perf_counter() - start)
+baseline = report("executor + connections per call (set 0 A)", times, successes, len(psu_ips))
+
+# Test 2: Shared executor, pooled connections (first call opens them)
+_write_all_psus(psu_ips, register, 0)
+times = []
+for i in range(REPEATS):
+    start = time.perf_counter()
+    successes = _write_all_psus(psu_ips, register, 0)
+    times.append(time.perf_counter() - start)
+pooled = report("shared executor + pooled connections (set 0 A)", times, successes, len(psu_ips))
+
+print("\n" + "=" * 50)
+print(f"Broadcast speedup: {baseline / pooled:.1f}x")
+print(f"Pooled connects: {sum(conn['connects'] for conn in get_pool().stats().values())}")
+print("\nDone!")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+PSU Modbus RTU Read-Rate Benchmark
+Compares the PSU bridge read (13 registers from 0x0001) with the port
+reopened per call against the persistent RTUSession (hdw/modbus_rtu.py).
+Stop psu_http.py first - the COM port can only be open once.
+Usage: python psu_rtu_bench.py [COM_PORT] [READS]
+"""
+
+import sys
+import time
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "MK1_AWE" / "hdw"))
+from modbus_rtu import RTUSession
+
+# Configuration - match devices.yaml devices.PSU
+COM_PORT = sys.argv[1] if len(sys.argv) > 1 else "COM11"
+READS = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+SLAVE_ID = 1
+BAUD_RATE = 9600
+TIMEOUT = 0.5
+HW_MAX_RATE = 10  # Hz - devices.yaml bridges.psu.hw_max_rate
+
+
+def benchmark(reuse_port):
+    """Back-to-back register reads; returns list of read times (s)"""
+    session = RTUSession(COM_PORT, SLAVE_ID, BAUD_RATE, TIMEOUT, reuse_port)
+    times = []
+    failed = 0
+    for _ in range(READS):
+        start = time.perf_counter()
+        try:
+            session.read_registers(0x0001, 13)
+            times.append(time.perf_counter() - start)
+        except Exception as e:
+            failed += 1
+            print(f"  Read failed: {e}")
+    session.close()
+    return times, failed
+
+
+print("PSU Modbus RTU Read-Rate Benchmark")
+print(f"Port: {COM_PORT}, Baud: {BAUD_RATE}, Reads: {READS}")
+print("=" * 50)
+
+results = {}
+for label, reuse_port in (("reopen per call", False), ("persistent port", True)):
+    print(f"\n{label}...")
+    times, failed = benchmark(reuse_port)
+    if not times:
+        print("  No successful reads")
+        continue
+    avg_time = statistics.mean(times)
+    results[label] = avg_time
+    print(f"  Successful: {len(times)}/{READS} ({failed} failed)")
+    print(f"  Min: {min(times)*1000:.1f} ms  Avg: {avg_time*1000:.1f} ms  Max: {max(times)*1000:.1f} ms")
+    print(f"  Achievable read rate: {1/avg_time:.1f} Hz (hw_max_rate {HW_MAX_RATE} Hz)")
+
+if len(results) == 2:
+    print("\n" + "=" * 50)
+    print(f"Speedup from port reuse: {results['reopen per call'] / results['persistent port']:.1f}x")
+
+print("\nDone!")
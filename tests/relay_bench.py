@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+NI-9485 Relay Write Benchmark
+Compares set-all-relays latency with a task created per relay (old
+RelayClient) against the persistent bitmask task (gui/ni_relay_client.py).
+WARNING: switches EVERY relay OFF, repeatedly. On a live rig that closes
+the purge valves and drops the contactors, and the persistent DO task
+conflicts with the one a running GUI holds - only run it with the rig
+shut down and the GUI closed. Requires --force.
+Usage: python relay_bench.py --force [REPEATS]
+"""
+
+import sys
+import time
+import statistics
+from pathlib import Path
+import nidaqmx
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "MK1_AWE" / "gui"))
+from ni_relay_client import RelayClient
+
+args = [arg for arg in sys.argv[1:] if arg != '--force']
+if '--force' not in sys.argv[1:]:
+    print("This benchmark switches every relay OFF (purge valves, contactors) and needs the "
+          "GUI closed. Re-run with --force if the rig is shut down.")
+    sys.exit(1)
+REPEATS = int(args[0]) if args else 20
+
+
+def legacy_set_all(client, state):
+    """Old set_all_relays(): one nidaqmx.Task per relay"""
+    for slot, channel in client.relay_map.values():
+        with nidaqmx.Task() as task:
+            task.do_channels.add_do_chan(f"{client.device_name}Mod{slot}/port0/line{channel}")
+            task.write(state)
+
+
+def report(name, times):
+    """Print latency stats for one test"""
+    avg_time = statistics.mean(times)
+    print(f"\n  {name}:")
+    print(f"  Min: {min(times)*1000:.1f} ms  Avg: {avg_time*1000:.1f} ms  Max: {max(times)*1000:.1f} ms")
+    return avg_time
+
+
+client = RelayClient()
+if not client.is_device_online():
+    print("✗ NI cDAQ not found")
+    exit(1)
+
+print("NI-9485 Relay Write Benchmark")
+print(f"Device: {client.device_name}, relays: {len(client.relay_map)}, repeats: {REPEATS}")
+print("=" * 50)
+
+# Test 1: Task per relay (baseline)
+times = []
+for i in range(REPEATS):
+    start = time.perf_counter()
+    legacy_set_all(client, False)
+    times.append(time.perf_counter() - start)
+baseline = report("task per relay (set all OFF)", times)
+
+# Test 2: Persistent task, one bitmask write (first call creates the task)
+client.set_all_relays(False)
+times = []
+for i in range(REPEATS):
+    start = time.perf_counter()
+    client.set_all_relays(False)
+    times.append(time.perf_counter() - start)
+persistent = report("persistent task (set all OFF)", times)
+
+# Test 3: Read all states
+times = []
+for i in range(REPEATS):
+    start = time.perf_counter()
+    client.get_all_relay_states()
+    times.append(time.perf_counter() - start)
+report("persistent task (read all states)", times)
+
+print("\n" + "=" * 50)
+print(f"Set-all speedup: {baseline / persistent:.1f}x")
+
+client.close()
+print("\nDone!")